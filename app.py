@@ -1,29 +1,193 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, g, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
 import os
 import tempfile
 import json
 from io import BytesIO
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
 import traceback
+import time
+import uuid
 
 # Import existing utilities
-from doc_utils import extract_text_from_upload, escape_for_latex
-from prompt_engineering import generate_json_resume, tailor_resume
+from doc_utils import extract_text_from_upload, extract_text_and_layout_from_upload, escape_for_latex, compact_text, segment_resume_text, extract_contact_info, normalize_job_description, extract_uploads_from_zip
+from match_utils import ResumeIndex, match_score, matrix_cache, posting_index, rank_job_descriptions
+from prompt_engineering import (
+    generate_json_resume, tailor_resume, tailor_json_resume, iter_json_resume_sections, merge_sections, new_usage, finish_usage,
+    agenerate_json_resume, atailor_resume, atailor_json_resume,
+    is_json_answer, SECTION_MAX_WORKERS, SECTION_KEYS, EXTRACTION_STRATEGIES, TAILORING_MODES,
+    TAILORED_SECTIONS
+)
+from prompt_engineering.clients import close_async_clients
+from prompt_engineering.cache import CACHE_DIR, CACHE_TTL_SECONDS, ResponseCache, make_cache_key, response_cache
+from prompt_engineering.llm import achat_completion, chat_completion
+from prompt_engineering.hedging import hedger
+from prompt_engineering.job_analysis import ajob_description_context, job_analysis_cache, job_analysis_flights
+from prompt_engineering.parsing import parse_stats
+from prompt_engineering.providers import resolve_model
+from prompt_engineering.scheduler import Slots, scheduler
+from prompt_engineering.singleflight import SingleFlight
+from prompt_engineering.telemetry import TELEMETRY_LABELS, current_endpoint, telemetry
 from templates import generate_latex, template_commands
 from render import render_latex, render_cover_letter
 
-app = Flask(__name__)
+class ResumeAPI(Flask):
+    def async_to_sync(self, func):
+        """Run a coroutine view on a loop of its own, closing the loop's async clients before it ends
+
+        This is the ``flask run`` / ``python app.py`` path. Under uvicorn
+        (asgi:application) coroutine views are awaited on the server's loop
+        instead, and their clients stay pooled across requests.
+        """
+        @functools.wraps(func)
+        async def run_and_close_clients(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                await close_async_clients()
+
+        return super().async_to_sync(run_and_close_clients)
+
+
+app = ResumeAPI(__name__)
 CORS(app)  # Enable CORS for all routes
 
 # Directory to store resume JSON files
 RESUME_STORAGE_DIR = os.path.join(os.path.dirname(__file__), 'resume_storage')
 os.makedirs(RESUME_STORAGE_DIR, exist_ok=True)
 
+# Identical optimize / cover letter / AI enhance work in flight at the same time runs once
+pipeline_flights = SingleFlight()
+
+# Batch extraction limits: resumes per request, uncompressed archive size, and
+# resumes extracted at once across all batch requests of the process
+BATCH_MAX_FILES = int(os.environ.get("BATCH_MAX_FILES", 200))
+BATCH_MAX_ARCHIVE_BYTES = int(os.environ.get("BATCH_MAX_ARCHIVE_BYTES", 100 * 1024 * 1024))
+BATCH_MAX_CONCURRENT_ITEMS = int(os.environ.get("BATCH_MAX_CONCURRENT_ITEMS", 16))
+batch_slots = Slots(BATCH_MAX_CONCURRENT_ITEMS)
+
+# Optimize, cover letter and enhance results by request and posting id, so a
+# near-duplicate repost of the posting can be answered with them
+POSTING_RESULT_CACHE_DIR = os.environ.get(
+    "POSTING_RESULT_CACHE_DIR", os.path.join(os.path.dirname(CACHE_DIR), "posting_result_cache")
+)
+POSTING_RESULT_TTL_SECONDS = int(os.environ.get("POSTING_RESULT_TTL_SECONDS", CACHE_TTL_SECONDS))
+posting_results = ResponseCache(cache_dir=POSTING_RESULT_CACHE_DIR, ttl=POSTING_RESULT_TTL_SECONDS)
+
+# Most job descriptions /api/rank-jobs accepts in one request
+RANK_MAX_POSTINGS = int(os.environ.get("RANK_MAX_POSTINGS", 50000))
+
+# Numeric usage counters summed over a batch's resumes
+BATCH_USAGE_TOTALS = (
+    "calls", "prompt_tokens", "completion_tokens", "total_tokens", "cached_tokens", "cache_hits",
+    "retries", "hedged", "cost_usd", "queue_wait_seconds"
+)
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run blocking work (file parsing, resume storage, LaTeX rendering) on the default executor from an async view"""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        None, functools.partial(context.run, func, *args, **kwargs)
+    )
+
+
+@app.before_request
+def set_telemetry_endpoint():
+    """Attribute the request's LLM calls to its route in the telemetry"""
+    g.telemetry_token = current_endpoint.set(request.url_rule.rule if request.url_rule else request.path)
+
+
+@app.teardown_request
+def reset_telemetry_endpoint(error=None):
+    token = g.pop("telemetry_token", None)
+    if token is not None:
+        current_endpoint.reset(token)
+
+
+def job_analysis_header(report):
+    """Value of the X-Job-Analysis header: cached, fresh, or why the full posting was sent"""
+    if not report["used"]:
+        return report["reason"]
+    return "cached" if report["cached"] else "fresh"
+
+
+def posting_result_key(*parts):
+    """Return a function giving the stored-result key of a posting id for one request's resume and options"""
+    return lambda posting: make_cache_key("posting-result", *parts, posting)
+
+
+def find_posting_result(job_description, result_key, enabled):
+    """Return (result, report): a stored result of the same request for a near duplicate of this posting
+
+    The result is None when no near duplicate has one; the caller then runs
+    on its own posting and keeps the result with store_posting_result. report
+    is None when reuse is turned off, and otherwise has the posting's id and,
+    for a reused result, the posting it was made for and their similarity.
+    """
+    if not enabled:
+        return None, None
+    key, duplicates = posting_index.lookup(job_description)
+    for duplicate, similarity in duplicates:
+        result = posting_results.get(result_key(duplicate))
+        if result is not None:
+            return result, {"matched": True, "posting_id": key, "duplicate_of": duplicate, "similarity": similarity}
+    return None, {"matched": False, "posting_id": key}
+
+
+def store_posting_result(report, result_key, result):
+    """Keep a fresh result so near-duplicate reposts of its posting can reuse it"""
+    if report is not None and not report["matched"]:
+        posting_results.set(result_key(report["posting_id"]), result)
+
+
+def set_near_duplicate_headers(response, report):
+    if report and report["matched"]:
+        response.headers["X-Near-Duplicate-Of"] = report["duplicate_of"]
+        response.headers["X-Near-Duplicate-Similarity"] = str(report["similarity"])
+
+
+def parse_bool(value, default=True):
+    """Interpret a JSON or form value as a boolean flag"""
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() not in ("false", "0", "no", "off", "")
+
+
+def parse_prompt_layout(values):
+    """Return (warm_prefix, segment) from request values
+
+    Segmented prompts don't share the CV prefix that warm_prefix warms, so
+    the two are exclusive: warm_prefix turns segmentation off by default and
+    setting both raises ValueError.
+    """
+    warm_prefix = parse_bool(values.get('warm_prefix'), default=False)
+    segment = parse_bool(values.get('segment_sections'), default=not warm_prefix)
+    if warm_prefix and segment:
+        raise ValueError("warm_prefix and segment_sections can't be combined: segmented prompts don't share the CV prefix")
+    return warm_prefix, segment
+
 
 @app.route("/")
 def home():
     return "Hello, Flask is live on Render!"
 
+def iter_stored_resumes():
+    """Yield (file_id, resume_json) for every stored resume"""
+    for filename in sorted(os.listdir(RESUME_STORAGE_DIR)):
+        if filename.endswith('.json'):
+            resume_json = get_resume_data(filename[:-len('.json')])
+            if resume_json is not None:
+                yield filename[:-len('.json')], resume_json
+
+# Inverted index over the stored resumes, built from them the first time it is used
+resume_index = ResumeIndex(os.path.join(RESUME_STORAGE_DIR, '_index'), bootstrap=iter_stored_resumes)
+
 def save_resume_data(file_id, resume_json):
     """Save resume JSON data to file"""
     try:
@@ -31,10 +195,14 @@ def save_resume_data(file_id, resume_json):
         with open(file_path, 'w', encoding='utf-8') as f:
             json.dump(resume_json, f, indent=2, ensure_ascii=False)
         print(f"DEBUG: Saved resume data to file: {file_path}")
-        return True
     except Exception as e:
         print(f"DEBUG: Failed to save resume data for file_id {file_id}: {str(e)}")
         return False
+    try:
+        resume_index.update(file_id, resume_json)
+    except Exception as e:
+        print(f"DEBUG: Failed to index resume data for file_id {file_id}: {str(e)}")
+    return True
 
 def get_resume_data(file_id):
     """Get resume JSON data from file"""
@@ -65,6 +233,7 @@ def cleanup_old_files():
                 file_age = current_time - os.path.getmtime(file_path)
                 if file_age > max_age:
                     os.remove(file_path)
+                    resume_index.remove(filename[:-len('.json')])
                     print(f"DEBUG: Cleaned up old file: {file_path}")
     except Exception as e:
         print(f"DEBUG: Error during cleanup: {str(e)}")
@@ -110,15 +279,85 @@ COVER_LETTER_TEMPLATE = r"""
 \end{document}
 """
 
-def generate_cover_letter_content(api_key, job_description, position, company_name, location, resume_info, model="deepseek-chat", model_type="DeepSeek"):
-    """Generate cover letter content using AI"""
-    print(f"DEBUG: generate_cover_letter_content called with model_type={model_type}, model={model}")
+def resume_json_to_text(value):
+    """Join the string values of a resume JSON, depth first, one per line"""
+    if isinstance(value, dict):
+        return "\n".join(resume_json_to_text(item) for item in value.values())
+    if isinstance(value, list):
+        return "\n".join(resume_json_to_text(item) for item in value)
+    return str(value) if value else ""
+
+
+def fill_personal_info(personal_info, resume_json):
+    """Fill missing name/email/phone/address/linkedin from the resume's basics, then from its text"""
+    personal_info = dict(personal_info or {})
+    basics = resume_json.get('basics') or {}
+    if not isinstance(basics, dict):
+        basics = {}
+    website = basics.get('website') or ''
+    candidates = dict(basics, linkedin=website if 'linkedin' in website.lower() else '')
+
+    # Contact details the basics section missed, e.g. when its extraction failed
+    extracted, confidence = extract_contact_info(resume_json_to_text(resume_json))
+    print(f"DEBUG: Contact details found in resume text (confidence {confidence}): {extracted}")
+    for field in ('name', 'email', 'phone', 'address'):
+        if not candidates.get(field) and extracted[field]:
+            candidates[field] = extracted[field]
+    if not candidates.get('linkedin') and 'linkedin' in extracted['website'].lower():
+        candidates['linkedin'] = extracted['website']
+
+    for field in ('name', 'email', 'phone', 'address', 'linkedin'):
+        if not personal_info.get(field) and candidates.get(field):
+            personal_info[field] = candidates[field]
+    return personal_info
+
+
+def read_resume_upload(file, file_id, compact=True, segment=True):
+    """Extract an uploaded resume's text, optionally compacted and split into sections
+
+    Returns (text, text_compaction, segments); text_compaction and segments are
+    None when the matching option is off. PDF segmentation uses the layout of
+    the page, other files are segmented from the text alone.
+    """
+    layout_lines = None
+    if segment:
+        text, layout_lines = extract_text_and_layout_from_upload(file)
+    else:
+        text = extract_text_from_upload(file)
+
+    text_compaction = None
+    if compact:
+        text, text_compaction = compact_text(text)
+        print(f"DEBUG: [File ID: {file_id}] Compacted text: {text_compaction}")
+
+    segments = None
+    if segment:
+        segments = segment_resume_text(text, layout_lines)
+        print(f"DEBUG: [File ID: {file_id}] Segmented text: confidence {segments['confidence']}, sections {list(segments['sections'])}")
+    return text, text_compaction, segments
+
+
+def segmentation_summary(segments):
+    """Return the part of the segmentation result reported back to clients"""
+    if segments is None:
+        return None
+    return {
+        "confidence": segments["confidence"],
+        "columns": segments["columns"],
+        "sections": list(segments["sections"]),
+        "headings": [heading["text"] for heading in segments["headings"]],
+    }
+
+
+COVER_LETTER_SYSTEM_PROMPT = "You are an expert in writing professional cover letters."
+
+
+def cover_letter_prompt(job_description, position, company_name, location, resume_info):
+    """Build the cover letter body prompt"""
     print(f"DEBUG: Position: {position}, Company: {company_name}, Location: {location}")
     print(f"DEBUG: Job description length: {len(job_description)}")
     print(f"DEBUG: Resume info length: {len(resume_info)}")
     
-    from openai import OpenAI
-    
     prompt = f"""
     Write a professional cover letter for the following job details:
     - Job Title: {position}
@@ -132,29 +371,24 @@ def generate_cover_letter_content(api_key, job_description, position, company_na
     """
     
     print(f"DEBUG: Generated prompt length: {len(prompt)}")
+    return prompt
+
+
+def generate_cover_letter_content(api_key, job_description, position, company_name, location, resume_info, model="deepseek-chat", model_type="DeepSeek", use_cache=True):
+    """Generate cover letter content using AI"""
+    print(f"DEBUG: generate_cover_letter_content called with model_type={model_type}, model={model}")
+    prompt = cover_letter_prompt(job_description, position, company_name, location, resume_info)
     
-    if model_type == "OpenAI":
-        print("DEBUG: Using OpenAI for cover letter generation")
-        client = OpenAI(api_key=api_key)
-    elif model_type == "DeepSeek":
-        print("DEBUG: Using DeepSeek for cover letter generation")
-        client = OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
-    else:
-        print(f"DEBUG: Unsupported model type: {model_type}, falling back to DeepSeek")
-        model_type = "DeepSeek"
-        model = "deepseek-chat"
-        client = OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
+    model_type, model = resolve_model(model_type, model)
+    print(f"DEBUG: Using {model_type} for cover letter generation")
         
     try:
         print(f"DEBUG: Making {model_type} API call with model {model}...")
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are an expert in writing professional cover letters."},
-                {"role": "user", "content": prompt},
-            ],
+        result, _ = chat_completion(
+            model_type, api_key, model, COVER_LETTER_SYSTEM_PROMPT, prompt, use_cache=use_cache,
+            prompt_name="cover_letter",
         )
-        result = response.choices[0].message.content.strip()
+        result = result.strip()
         print(f"DEBUG: API response received, length: {len(result)}")
         print(f"DEBUG: Cover letter content preview: {result[:200]}...")
         return result
@@ -162,8 +396,28 @@ def generate_cover_letter_content(api_key, job_description, position, company_na
         print(f"DEBUG: API error: {str(e)}")
         raise Exception(f"API error: {str(e)}")
 
+
+async def agenerate_cover_letter_content(api_key, job_description, position, company_name, location, resume_info, model="deepseek-chat", model_type="DeepSeek", use_cache=True):
+    """Coroutine version of generate_cover_letter_content"""
+    print(f"DEBUG: agenerate_cover_letter_content called with model_type={model_type}, model={model}")
+    prompt = cover_letter_prompt(job_description, position, company_name, location, resume_info)
+    model_type, model = resolve_model(model_type, model)
+
+    try:
+        print(f"DEBUG: Making async {model_type} API call with model {model}...")
+        result, _ = await achat_completion(
+            model_type, api_key, model, COVER_LETTER_SYSTEM_PROMPT, prompt, use_cache=use_cache,
+            prompt_name="cover_letter",
+        )
+        result = result.strip()
+        print(f"DEBUG: API response received, length: {len(result)}")
+        return result
+    except Exception as e:
+        print(f"DEBUG: API error: {str(e)}")
+        raise Exception(f"API error: {str(e)}")
+
 @app.route('/api/extract-resume-json', methods=['POST'])
-def extract_resume_json():
+async def extract_resume_json():
     """Extract JSON structure from uploaded resume PDF/DOCX"""
     import traceback
     try:
@@ -195,8 +449,17 @@ def extract_resume_json():
         api_key = request.form.get('api_key')
         model_type = request.form.get('model_type', 'DeepSeek')
         model = request.form.get('model', 'deepseek-chat')
+        max_workers = request.form.get('max_workers', SECTION_MAX_WORKERS, type=int)
+        strategy = request.form.get('strategy', 'sections')
+        use_cache = parse_bool(request.form.get('use_cache'))
+        compact = parse_bool(request.form.get('compact_text'))
+        local_basics = parse_bool(request.form.get('local_basics'))
+        try:
+            warm_prefix, segment = parse_prompt_layout(request.form)
+        except ValueError as e:
+            return jsonify({"error": str(e), "file_id": file_id}), 400
         
-        print(f"DEBUG: [File ID: {file_id}] API parameters - model_type: {model_type}, model: {model}")
+        print(f"DEBUG: [File ID: {file_id}] API parameters - model_type: {model_type}, model: {model}, max_workers: {max_workers}, strategy: {strategy}")
         print(f"DEBUG: [File ID: {file_id}] API key present: {bool(api_key)}")
         print(f"DEBUG: [File ID: {file_id}] API key length: {len(api_key) if api_key else 0}")
         
@@ -204,11 +467,15 @@ def extract_resume_json():
             print(f"DEBUG: [File ID: {file_id}] No API key provided")
             return jsonify({"error": "API key is required", "file_id": file_id}), 400
         
+        if strategy not in EXTRACTION_STRATEGIES:
+            print(f"DEBUG: [File ID: {file_id}] Invalid strategy '{strategy}' requested")
+            return jsonify({"error": f"Invalid strategy. Available strategies: {list(EXTRACTION_STRATEGIES)}", "file_id": file_id}), 400
+        
         print(f"DEBUG: [File ID: {file_id}] Starting text extraction...")
         # Extract text from file
         try:
-            print(f"DEBUG: [File ID: {file_id}] Calling extract_text_from_upload...")
-            text = extract_text_from_upload(file)
+            print(f"DEBUG: [File ID: {file_id}] Calling read_resume_upload...")
+            text, text_compaction, segments = await run_blocking(read_resume_upload, file, file_id, compact=compact, segment=segment)
             print(f"DEBUG: [File ID: {file_id}] Text extracted successfully, length: {len(text)}")
             print(f"DEBUG: [File ID: {file_id}] First 200 chars: {text[:200]}...")
             print(f"DEBUG: [File ID: {file_id}] Last 200 chars: {text[-200:]}")
@@ -230,12 +497,11 @@ def extract_resume_json():
         
         # Generate JSON resume
         try:
-            print(f"DEBUG: [File ID: {file_id}] Importing generate_json_resume function...")
-            from prompt_engineering import generate_json_resume
-            print(f"DEBUG: [File ID: {file_id}] Successfully imported generate_json_resume")
-            
-            print(f"DEBUG: [File ID: {file_id}] Calling generate_json_resume...")
-            json_resume = generate_json_resume(text, api_key, model, model_type)
+            print(f"DEBUG: [File ID: {file_id}] Calling agenerate_json_resume...")
+            json_resume, usage = await agenerate_json_resume(
+                text, api_key, model, model_type, max_workers=max_workers, strategy=strategy, return_usage=True,
+                use_cache=use_cache, warm_prefix=warm_prefix, segments=segments, local_basics=local_basics
+            )
             print(f"DEBUG: [File ID: {file_id}] JSON resume generation completed")
             print(f"DEBUG: [File ID: {file_id}] JSON resume type: {type(json_resume)}")
             print(f"DEBUG: [File ID: {file_id}] JSON resume keys: {list(json_resume.keys()) if isinstance(json_resume, dict) else 'Not a dict'}")
@@ -259,6 +525,7 @@ def extract_resume_json():
                     "error": "Generated resume JSON is empty. Please check your API key and try again.",
                     "extracted_text_length": len(text),
                     "resume_json": {},
+                    "usage": usage,
                     "file_id": file_id
                 }), 500
             
@@ -277,11 +544,14 @@ def extract_resume_json():
             "success": True,
             "resume_json": json_resume,
             "extracted_text_length": len(text),
+            "text_compaction": text_compaction,
+            "segmentation": segmentation_summary(segments),
+            "usage": usage,
             "file_id": file_id
         }
         
         # Save resume data to file
-        if save_resume_data(file_id, json_resume):
+        if await run_blocking(save_resume_data, file_id, json_resume):
             print(f"DEBUG: [File ID: {file_id}] Resume data saved successfully")
         else:
             print(f"DEBUG: [File ID: {file_id}] Warning: Failed to save resume data")
@@ -300,8 +570,282 @@ def extract_resume_json():
             "file_id": file_id
         }), 500
 
+def batch_file_ids(count, batch_id):
+    """Return the file ids for a batch's resumes: the given ``file_ids`` or ``{batch_id}-{index}``
+
+    file_ids may be repeated form fields or one comma-separated field, in
+    the order of the uploaded files followed by the archive members.
+    """
+    file_ids = request.form.getlist('file_ids')
+    if len(file_ids) == 1:
+        file_ids = file_ids[0].split(',')
+    file_ids = [file_id.strip() for file_id in file_ids if file_id.strip()]
+    if not file_ids:
+        return [f"{batch_id}-{index}" for index in range(count)]
+    if len(file_ids) != count:
+        raise ValueError(f"Got {len(file_ids)} file_ids for {count} resumes")
+    return file_ids
+
+
+async def extract_batch_item(index, file, file_id, options, request_slots):
+    """Extract one resume of a batch, returning its result or error instead of raising"""
+    item = {"index": index, "file_id": file_id, "filename": file.filename, "success": False}
+    async with request_slots:
+        await batch_slots.acquire_async()
+        started = time.time()
+        try:
+            text, text_compaction, segments = await run_blocking(
+                read_resume_upload, file, file_id, compact=options["compact"], segment=options["segment"]
+            )
+            item["extracted_text_length"] = len(text)
+            if len(text.strip()) < 50:
+                item["error"] = "Extracted text is too short. Please check the file."
+                return item
+
+            json_resume, usage = await agenerate_json_resume(
+                text, options["api_key"], options["model"], options["model_type"], max_workers=options["max_workers"],
+                strategy=options["strategy"], return_usage=True, use_cache=options["use_cache"],
+                warm_prefix=options["warm_prefix"], segments=segments, local_basics=options["local_basics"]
+            )
+            item["usage"] = usage
+            if not json_resume:
+                item["error"] = "Generated resume JSON is empty. Please check your API key and try again."
+                return item
+
+            await run_blocking(save_resume_data, file_id, json_resume)
+            item.update(
+                success=True, resume_json=json_resume, text_compaction=text_compaction,
+                segmentation=segmentation_summary(segments)
+            )
+        except Exception as e:
+            print(f"DEBUG: [File ID: {file_id}] Batch item failed: {str(e)}")
+            item["error"] = str(e)
+        finally:
+            batch_slots.release()
+            item["elapsed_seconds"] = round(time.time() - started, 3)
+    print(f"DEBUG: [File ID: {file_id}] Batch item done - success: {item['success']}, {item['elapsed_seconds']}s")
+    return item
+
+
+def batch_stats(items, skipped, concurrency, started):
+    """Aggregate throughput and usage over a batch's results"""
+    elapsed = time.time() - started
+    item_seconds = [item["elapsed_seconds"] for item in items]
+    stats = {
+        "items": len(items),
+        "succeeded": sum(1 for item in items if item["success"]),
+        "failed": sum(1 for item in items if not item["success"]),
+        "skipped": len(skipped),
+        "concurrency": concurrency,
+        "elapsed_seconds": round(elapsed, 3),
+        "items_per_second": round(len(items) / elapsed, 3) if elapsed > 0 else None,
+        "avg_item_seconds": round(sum(item_seconds) / len(item_seconds), 3) if item_seconds else None,
+        "max_item_seconds": max(item_seconds) if item_seconds else None,
+    }
+    for counter in BATCH_USAGE_TOTALS:
+        stats[counter] = sum(item.get("usage", {}).get(counter, 0) for item in items)
+    stats["cost_usd"] = round(stats["cost_usd"], 6)
+    stats["queue_wait_seconds"] = round(stats["queue_wait_seconds"], 3)
+    return stats
+
+
+@app.route('/api/extract-resume-json/batch', methods=['POST'])
+async def extract_resume_json_batch():
+    """Extract JSON resumes from many uploaded files and/or a zip archive in one request
+
+    Resumes are extracted concurrently, at most ``concurrency`` at a time for
+    this request and BATCH_MAX_CONCURRENT_ITEMS across the process. Every
+    resume gets its own result or error, in upload order.
+    """
+    started = time.time()
+    batch_id = request.form.get('batch_id') or uuid.uuid4().hex[:12]
+    print(f"=== DEBUG: Starting extract_resume_json_batch [Batch ID: {batch_id}] ===")
+
+    api_key = request.form.get('api_key')
+    if not api_key:
+        return jsonify({"error": "API key is required", "batch_id": batch_id}), 400
+
+    strategy = request.form.get('strategy', 'sections')
+    if strategy not in EXTRACTION_STRATEGIES:
+        return jsonify({"error": f"Invalid strategy. Available strategies: {list(EXTRACTION_STRATEGIES)}", "batch_id": batch_id}), 400
+
+    files = [file for file in request.files.getlist('files') if file.filename]
+    skipped = []
+    archive = request.files.get('archive')
+    if archive is not None and archive.filename:
+        try:
+            members, skipped = await run_blocking(
+                extract_uploads_from_zip, archive, BATCH_MAX_FILES, BATCH_MAX_ARCHIVE_BYTES
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e), "batch_id": batch_id}), 400
+        files.extend(members)
+
+    if not files:
+        return jsonify({"error": "No files uploaded. Send 'files' and/or a zip 'archive'", "batch_id": batch_id}), 400
+    if len(files) > BATCH_MAX_FILES:
+        return jsonify({"error": f"Too many resumes: {len(files)} (max {BATCH_MAX_FILES})", "batch_id": batch_id}), 400
+
+    try:
+        file_ids = batch_file_ids(len(files), batch_id)
+    except ValueError as e:
+        return jsonify({"error": str(e), "batch_id": batch_id}), 400
+
+    try:
+        warm_prefix, segment = parse_prompt_layout(request.form)
+    except ValueError as e:
+        return jsonify({"error": str(e), "batch_id": batch_id}), 400
+
+    concurrency = request.form.get('concurrency', BATCH_MAX_CONCURRENT_ITEMS, type=int)
+    concurrency = max(1, min(concurrency, BATCH_MAX_CONCURRENT_ITEMS))
+    options = {
+        "api_key": api_key,
+        "model_type": request.form.get('model_type', 'DeepSeek'),
+        "model": request.form.get('model', 'deepseek-chat'),
+        "max_workers": request.form.get('max_workers', SECTION_MAX_WORKERS, type=int),
+        "strategy": strategy,
+        "use_cache": parse_bool(request.form.get('use_cache')),
+        "warm_prefix": warm_prefix,
+        "compact": parse_bool(request.form.get('compact_text')),
+        "segment": segment,
+        "local_basics": parse_bool(request.form.get('local_basics')),
+    }
+    print(f"DEBUG: [Batch ID: {batch_id}] {len(files)} resumes, {len(skipped)} skipped archive entries, concurrency {concurrency}, model_type: {options['model_type']}, strategy: {strategy}")
+
+    request_slots = asyncio.Semaphore(concurrency)
+    items = await asyncio.gather(*[
+        extract_batch_item(index, file, file_id, options, request_slots)
+        for index, (file, file_id) in enumerate(zip(files, file_ids))
+    ])
+
+    stats = batch_stats(items, skipped, concurrency, started)
+    print(f"DEBUG: [Batch ID: {batch_id}] Batch done - {stats['succeeded']} succeeded, {stats['failed']} failed in {stats['elapsed_seconds']}s")
+    return jsonify({
+        "success": stats["failed"] == 0,
+        "batch_id": batch_id,
+        "results": items,
+        "skipped": skipped,
+        "stats": stats
+    })
+
+@app.route('/api/extract-resume-json/stream', methods=['POST'])
+def extract_resume_json_stream():
+    """Stream JSON resume sections from an uploaded resume as each one is generated
+
+    Takes the same form data as /api/extract-resume-json. The response is
+    NDJSON by default, or Server-Sent Events with format=sse. Events are
+    "start", one "section" (or "section_failed") per section in completion
+    order, then "complete" with the merged resume, which is also saved under
+    the file_id. A failure after streaming has started is sent as an "error"
+    event.
+    """
+    file_id = request.form.get('file_id', 'unknown')
+    print(f"=== DEBUG: Starting extract_resume_json_stream [File ID: {file_id}] ===")
+
+    if 'file' not in request.files:
+        return jsonify({"error": "No file uploaded", "file_id": file_id}), 400
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({"error": "No file selected", "file_id": file_id}), 400
+
+    api_key = request.form.get('api_key')
+    if not api_key:
+        return jsonify({"error": "API key is required", "file_id": file_id}), 400
+
+    model_type = request.form.get('model_type', 'DeepSeek')
+    model = request.form.get('model', 'deepseek-chat')
+    max_workers = request.form.get('max_workers', SECTION_MAX_WORKERS, type=int)
+    strategy = request.form.get('strategy', 'sections')
+    use_cache = parse_bool(request.form.get('use_cache'))
+    stream_format = request.form.get('format', 'ndjson')
+    compact = parse_bool(request.form.get('compact_text'))
+    local_basics = parse_bool(request.form.get('local_basics'))
+    try:
+        warm_prefix, segment = parse_prompt_layout(request.form)
+    except ValueError as e:
+        return jsonify({"error": str(e), "file_id": file_id}), 400
+
+    if strategy not in EXTRACTION_STRATEGIES:
+        return jsonify({"error": f"Invalid strategy. Available strategies: {list(EXTRACTION_STRATEGIES)}", "file_id": file_id}), 400
+    if stream_format not in ('ndjson', 'sse'):
+        return jsonify({"error": "Invalid format. Available formats: ['ndjson', 'sse']", "file_id": file_id}), 400
+
+    try:
+        text, text_compaction, segments = read_resume_upload(file, file_id, compact=compact, segment=segment)
+    except Exception as text_error:
+        print(f"DEBUG: [File ID: {file_id}] Text extraction failed: {str(text_error)}")
+        return jsonify({
+            "error": f"Failed to extract text from file: {str(text_error)}",
+            "traceback": traceback.format_exc(),
+            "file_id": file_id
+        }), 500
+
+    if len(text.strip()) < 50:
+        return jsonify({"error": "Extracted text is too short. Please check the file.", "file_id": file_id}), 400
+
+    def format_event(event, payload):
+        payload = dict(payload, event=event, file_id=file_id)
+        data = json.dumps(payload, ensure_ascii=False)
+        if stream_format == 'sse':
+            return f"event: {event}\ndata: {data}\n\n"
+        return f"{data}\n"
+
+    def generate_events():
+        started = time.monotonic()
+        usage = new_usage(strategy)
+        results = {}
+        yield format_event("start", {
+            "extracted_text_length": len(text),
+            "text_compaction": text_compaction,
+            "segmentation": segmentation_summary(segments),
+            "strategy": strategy
+        })
+        try:
+            for prompt_name, section in iter_json_resume_sections(
+                text, api_key, model, model_type, max_workers=max_workers, strategy=strategy,
+                use_cache=use_cache, warm_prefix=warm_prefix, usage=usage, segments=segments,
+                local_basics=local_basics,
+            ):
+                results[prompt_name] = section
+                key = SECTION_KEYS[prompt_name]
+                elapsed = round(time.monotonic() - started, 3)
+                if section is None:
+                    print(f"DEBUG: [File ID: {file_id}] Streaming failure for section '{key}'")
+                    yield format_event("section_failed", {"section": key, "elapsed_seconds": elapsed})
+                else:
+                    print(f"DEBUG: [File ID: {file_id}] Streaming section '{key}' after {elapsed}s")
+                    yield format_event("section", {"section": key, "data": section.get(key), "elapsed_seconds": elapsed})
+
+            finish_usage(usage, started)
+            json_resume = merge_sections(results)
+            if not json_resume:
+                yield format_event("error", {
+                    "error": "Generated resume JSON is empty. Please check your API key and try again.",
+                    "usage": usage
+                })
+                return
+
+            saved = save_resume_data(file_id, json_resume)
+            yield format_event("complete", {
+                "success": True,
+                "resume_json": json_resume,
+                "extracted_text_length": len(text),
+                "usage": usage,
+                "saved": saved
+            })
+        except Exception as e:
+            print(f"DEBUG: [File ID: {file_id}] Error while streaming resume JSON: {str(e)}")
+            yield format_event("error", {"error": f"Failed to extract resume JSON: {str(e)}"})
+
+    mimetype = 'text/event-stream' if stream_format == 'sse' else 'application/x-ndjson'
+    return Response(
+        stream_with_context(generate_events()),
+        mimetype=mimetype,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.route('/api/generate-cover-letter', methods=['POST'])
-def generate_cover_letter_api():
+async def generate_cover_letter_api():
     """Generate cover letter from file_id OR resume_json and job description"""
     try:
         print("=== DEBUG: Starting generate_cover_letter_api ===")
@@ -323,7 +867,7 @@ def generate_cover_letter_api():
         if resume_json:
             print(f"DEBUG: [File ID: {file_id}] Using provided resume_json (old format)")
             # Save the resume data for potential future use
-            save_resume_data(file_id, resume_json)
+            await run_blocking(save_resume_data, file_id, resume_json)
         else:
             # New format: load from file_id
             required_fields = ['file_id', 'job_description', 'api_key']
@@ -337,7 +881,7 @@ def generate_cover_letter_api():
                 return jsonify({"error": f"Missing required fields: {', '.join(missing_fields)}", "file_id": file_id}), 400
             
             # Load resume JSON from file
-            resume_json = get_resume_data(file_id)
+            resume_json = await run_blocking(get_resume_data, file_id)
             if resume_json is None:
                 print(f"DEBUG: [File ID: {file_id}] Resume data not found")
                 return jsonify({"error": "Resume data not found. Please re-upload your resume.", "file_id": file_id}), 404
@@ -354,6 +898,9 @@ def generate_cover_letter_api():
         model_type = data.get('model_type', 'DeepSeek')
         model = data.get('model', 'deepseek-chat')
         include_additional_personal_info = data.get('include_additional_personal_info', False)
+        use_cache = parse_bool(data.get('use_cache'))
+        analyze_job = parse_bool(data.get('analyze_job_description'))
+        reuse_postings = parse_bool(data.get('reuse_similar_postings'), default=use_cache)
         
         # Extract personal information with intelligent fallbacks
         personal_info = data.get('personal_info', {})
@@ -363,19 +910,7 @@ def generate_cover_letter_api():
         if not personal_info or not any([personal_info.get('name'), personal_info.get('email'), personal_info.get('phone')]):
             print(f"DEBUG: [File ID: {file_id}] Extracting personal info from resume JSON...")
             if resume_json:
-                # Extract from personal section
-                resume_personal = resume_json.get('personal', {})
-                if not personal_info.get('name') and resume_personal.get('name'):
-                    personal_info['name'] = resume_personal['name']
-                if not personal_info.get('email') and resume_personal.get('email'):
-                    personal_info['email'] = resume_personal['email']
-                if not personal_info.get('phone') and resume_personal.get('phone'):
-                    personal_info['phone'] = resume_personal['phone']
-                if not personal_info.get('address') and resume_personal.get('address'):
-                    personal_info['address'] = resume_personal['address']
-                if not personal_info.get('linkedin') and resume_personal.get('linkedin'):
-                    personal_info['linkedin'] = resume_personal['linkedin']
-                    
+                personal_info = fill_personal_info(personal_info, resume_json)
                 print(f"DEBUG: [File ID: {file_id}] Extracted personal info from resume: {personal_info}")
         
         # Apply defaults for missing personal info
@@ -418,10 +953,29 @@ def generate_cover_letter_api():
         resume_info = json.dumps(resume_json, indent=2)
         print(f"DEBUG: [File ID: {file_id}] Resume info length: {len(resume_info)}")
         
-        print(f"DEBUG: [File ID: {file_id}] Calling generate_cover_letter_content...")
-        body_content = generate_cover_letter_content(
-            api_key, job_description, position, company_name, location, resume_info, model, model_type
+        result_key = posting_result_key(
+            "cover-letter", api_key, resume_info, position, company_name, location, model, model_type, analyze_job
         )
+        body_content, near_duplicate = find_posting_result(job_description, result_key, reuse_postings)
+        print(f"DEBUG: [File ID: {file_id}] Near-duplicate posting: {near_duplicate}")
+        body_coalesced = False
+        job_analysis = None
+        if body_content is None:
+            job_context, job_analysis = await ajob_description_context(
+                job_description, api_key, model, model_type, use_cache, enabled=analyze_job
+            )
+            print(f"DEBUG: [File ID: {file_id}] Job description context: {job_analysis_header(job_analysis)}, {len(job_context)} chars")
+            
+            print(f"DEBUG: [File ID: {file_id}] Calling generate_cover_letter_content...")
+            body_key = make_cache_key(
+                "cover-letter", api_key, normalize_job_description(job_context), position, company_name,
+                location, resume_info, model, model_type, use_cache
+            )
+            body_content, body_coalesced = await pipeline_flights.ado(body_key, lambda: agenerate_cover_letter_content(
+                api_key, job_context, position, company_name, location, resume_info, model, model_type,
+                use_cache=use_cache
+            ))
+            store_posting_result(near_duplicate, result_key, body_content)
         print(f"DEBUG: [File ID: {file_id}] Generated body content length: {len(body_content)}")
         print(f"DEBUG: [File ID: {file_id}] Body content preview: {body_content[:300]}...")
         
@@ -522,18 +1076,26 @@ def generate_cover_letter_api():
         
         # Render to PDF
         print(f"DEBUG: [File ID: {file_id}] Calling render_cover_letter...")
-        pdf_bytes = render_cover_letter(["pdflatex", "cover_letter.tex"], latex_content, "cover_letter.pdf")
+        pdf_bytes, pdf_coalesced = await pipeline_flights.ado(
+            make_cache_key("render-cover-letter", latex_content),
+            lambda: run_blocking(render_cover_letter, ["pdflatex", "cover_letter.tex"], latex_content, "cover_letter.pdf")
+        )
         print(f"DEBUG: [File ID: {file_id}] PDF generation result: {type(pdf_bytes)}")
         print(f"DEBUG: [File ID: {file_id}] PDF size: {len(pdf_bytes) if pdf_bytes else 0} bytes")
         
         if pdf_bytes:
             print(f"DEBUG: [File ID: {file_id}] Returning PDF file...")
-            return send_file(
+            response = send_file(
                 BytesIO(pdf_bytes),
                 as_attachment=True,
                 download_name=f"cover_letter_{file_id}.pdf",
                 mimetype="application/pdf"
             )
+            response.headers["X-Coalesced"] = str(body_coalesced or pdf_coalesced).lower()
+            if job_analysis is not None:
+                response.headers["X-Job-Analysis"] = job_analysis_header(job_analysis)
+            set_near_duplicate_headers(response, near_duplicate)
+            return response
         else:
             print(f"DEBUG: [File ID: {file_id}] PDF generation failed - no bytes returned")
             return jsonify({"error": "Failed to generate PDF", "file_id": file_id}), 500
@@ -549,7 +1111,7 @@ def generate_cover_letter_api():
         }), 500
 
 @app.route('/api/optimize-resume', methods=['POST'])
-def optimize_resume():
+async def optimize_resume():
     """Generate optimized resume from file_id OR resume_json, job description, and template preference"""
     try:
         print("=== DEBUG: Starting optimize_resume ===")
@@ -568,7 +1130,7 @@ def optimize_resume():
         if resume_json:
             print(f"DEBUG: [File ID: {file_id}] Using provided resume_json (old format)")
             # Save the resume data for potential future use
-            save_resume_data(file_id, resume_json)
+            await run_blocking(save_resume_data, file_id, resume_json)
         else:
             # New format: load from file_id
             required_fields = ['file_id', 'job_description', 'template', 'api_key']
@@ -582,7 +1144,7 @@ def optimize_resume():
                 return jsonify({"error": f"Missing required fields: {', '.join(missing_fields)}", "file_id": file_id}), 400
             
             # Load resume JSON from file
-            resume_json = get_resume_data(file_id)
+            resume_json = await run_blocking(get_resume_data, file_id)
             if resume_json is None:
                 print(f"DEBUG: [File ID: {file_id}] Resume data not found")
                 return jsonify({"error": "Resume data not found. Please re-upload your resume.", "file_id": file_id}), 404
@@ -604,6 +1166,10 @@ def optimize_resume():
         model = data.get('model', 'deepseek-chat')
         section_ordering = data.get('section_ordering', ['education', 'work', 'skills', 'projects', 'awards'])
         improve_resume = data.get('improve_resume', True)
+        tailoring_mode = data.get('tailoring_mode', 'sections')
+        use_cache = parse_bool(data.get('use_cache'))
+        analyze_job = parse_bool(data.get('analyze_job_description'))
+        reuse_postings = parse_bool(data.get('reuse_similar_postings'), default=use_cache)
         
         print(f"DEBUG: [File ID: {file_id}] Extracted data summary:")
         print(f"  - Template: {template}")
@@ -613,6 +1179,7 @@ def optimize_resume():
         print(f"  - Model: {model}")
         print(f"  - Section ordering: {section_ordering}")
         print(f"  - Improve resume: {improve_resume}")
+        print(f"  - Tailoring mode: {tailoring_mode}")
         print(f"  - API key present: {bool(api_key)}")
         
         # Validate template
@@ -623,24 +1190,59 @@ def optimize_resume():
         
         print(f"DEBUG: [File ID: {file_id}] Template '{template}' is valid")
         
+        if tailoring_mode not in TAILORING_MODES:
+            print(f"DEBUG: [File ID: {file_id}] Invalid tailoring mode '{tailoring_mode}' requested")
+            return jsonify({"error": f"Invalid tailoring_mode. Available modes: {list(TAILORING_MODES)}", "file_id": file_id}), 400
+        
         # Convert resume JSON to text for tailoring
         print(f"DEBUG: [File ID: {file_id}] Converting resume JSON to text...")
         resume_text = json.dumps(resume_json, indent=2)
-        combined_text = f"{resume_text}\n\nOptimize this resume for the following job:\n{job_description}"
-        print(f"DEBUG: [File ID: {file_id}] Combined text length: {len(combined_text)}")
         
         # Improve resume if requested
+        json_coalesced = False
+        tailoring_usage = None
+        job_analysis = near_duplicate = None
         if improve_resume:
-            print(f"DEBUG: [File ID: {file_id}] Improving resume with AI...")
-            print(f"DEBUG: [File ID: {file_id}] Calling tailor_resume...")
-            optimized_text = tailor_resume(combined_text, api_key, model, model_type)
-            print(f"DEBUG: [File ID: {file_id}] Optimized text length: {len(optimized_text)}")
-            print(f"DEBUG: [File ID: {file_id}] Optimized text preview: {optimized_text[:300]}...")
+            result_key = posting_result_key(
+                "optimize-resume", api_key, resume_text, model, model_type, tailoring_mode, analyze_job
+            )
+            optimized_json, near_duplicate = find_posting_result(job_description, result_key, reuse_postings)
+            print(f"DEBUG: [File ID: {file_id}] Near-duplicate posting: {near_duplicate}")
+        if improve_resume and optimized_json is None:
+            job_context, job_analysis = await ajob_description_context(
+                job_description, api_key, model, model_type, use_cache, enabled=analyze_job
+            )
+            print(f"DEBUG: [File ID: {file_id}] Job description context: {job_analysis_header(job_analysis)}, {len(job_context)} chars")
+            combined_text = f"{resume_text}\n\nOptimize this resume for the following job:\n{job_context}"
+            print(f"DEBUG: [File ID: {file_id}] Combined text length: {len(combined_text)}")
             
-            # Re-generate JSON from optimized text
-            print(f"DEBUG: [File ID: {file_id}] Re-generating JSON from optimized text...")
-            optimized_json = generate_json_resume(optimized_text, api_key, model, model_type)
+            async def run_optimization():
+                print(f"DEBUG: [File ID: {file_id}] Improving resume with AI...")
+                if tailoring_mode != 'text':
+                    print(f"DEBUG: [File ID: {file_id}] Calling atailor_json_resume...")
+                    return await atailor_json_resume(
+                        resume_json, job_context, api_key, model, model_type, mode=tailoring_mode,
+                        use_cache=use_cache, return_usage=True
+                    )
+
+                print(f"DEBUG: [File ID: {file_id}] Calling atailor_resume...")
+                optimized_text = await atailor_resume(combined_text, api_key, model, model_type, use_cache=use_cache)
+                print(f"DEBUG: [File ID: {file_id}] Optimized text length: {len(optimized_text)}")
+                print(f"DEBUG: [File ID: {file_id}] Optimized text preview: {optimized_text[:300]}...")
+
+                # Re-generate JSON from optimized text
+                print(f"DEBUG: [File ID: {file_id}] Re-generating JSON from optimized text...")
+                return await agenerate_json_resume(optimized_text, api_key, model, model_type, use_cache=use_cache), None
+
+            optimize_key = make_cache_key(
+                "optimize-resume", api_key, resume_text, normalize_job_description(job_context), model, model_type,
+                tailoring_mode, use_cache
+            )
+            (optimized_json, tailoring_usage), json_coalesced = await pipeline_flights.ado(optimize_key, run_optimization)
+            store_posting_result(near_duplicate, result_key, optimized_json)
             print(f"DEBUG: [File ID: {file_id}] Optimized JSON keys: {list(optimized_json.keys()) if isinstance(optimized_json, dict) else 'Not a dict'}")
+        elif improve_resume:
+            print(f"DEBUG: [File ID: {file_id}] Reusing the resume optimized for near-duplicate posting {near_duplicate['duplicate_of']}")
         else:
             print(f"DEBUG: [File ID: {file_id}] Using original resume JSON (no improvement requested)")
             optimized_json = resume_json
@@ -655,17 +1257,30 @@ def optimize_resume():
         # Render to PDF
         print(f"DEBUG: [File ID: {file_id}] Rendering LaTeX to PDF...")
         print(f"DEBUG: [File ID: {file_id}] Using template command: {template_commands[template]}")
-        resume_bytes = render_latex(template_commands[template], latex_resume)
+        resume_bytes, pdf_coalesced = await pipeline_flights.ado(
+            make_cache_key("render-resume", template, latex_resume),
+            lambda: run_blocking(render_latex, template_commands[template], latex_resume)
+        )
         print(f"DEBUG: [File ID: {file_id}] PDF generation result: {type(resume_bytes)}")
         print(f"DEBUG: [File ID: {file_id}] PDF size: {len(resume_bytes) if resume_bytes else 0} bytes")
         
         if resume_bytes:
-            return send_file(
+            response = send_file(
                 BytesIO(resume_bytes),
                 as_attachment=True,
                 download_name=f"optimized_resume_{file_id}.pdf",
                 mimetype="application/pdf"
             )
+            response.headers["X-Coalesced"] = str(json_coalesced or pdf_coalesced).lower()
+            if job_analysis is not None:
+                response.headers["X-Job-Analysis"] = job_analysis_header(job_analysis)
+            set_near_duplicate_headers(response, near_duplicate)
+            if tailoring_usage is not None:
+                response.headers["X-Tailoring-Cache-Hits"] = ",".join(tailoring_usage["cached_sections"])
+                response.headers["X-Tailored-Sections"] = ",".join(
+                    key for key in TAILORED_SECTIONS if optimized_json.get(key) and key not in tailoring_usage["failed_sections"]
+                )
+            return response
         else:
             return jsonify({"error": "Failed to generate PDF", "file_id": file_id}), 500
         
@@ -677,6 +1292,106 @@ def optimize_resume():
             "file_id": file_id
         }), 500
 
+@app.route('/api/match-score', methods=['POST'])
+def match_score_api():
+    """Score a resume against a job description locally (BM25 / tf-idf, no LLM call)"""
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "No data provided", "file_id": "unknown"}), 400
+
+    file_id = data.get('file_id', 'unknown')
+    resume_json = data.get('resume_json')
+    if not resume_json and file_id != 'unknown':
+        resume_json = get_resume_data(file_id)
+        if resume_json is None:
+            return jsonify({"error": "Resume data not found. Please provide resume_json or re-upload your resume.", "file_id": file_id}), 404
+
+    job_description = data.get('job_description', '')
+    if not resume_json or not job_description:
+        missing = [name for name, value in (('resume_json', resume_json), ('job_description', job_description)) if not value]
+        return jsonify({"error": f"Missing required fields: {', '.join(missing)}", "file_id": file_id}), 400
+
+    started = time.perf_counter()
+    scores = match_score(resume_json, job_description)
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+    print(f"DEBUG: [File ID: {file_id}] Local match score {scores['match_score']} in {elapsed_ms}ms")
+    return jsonify(dict(scores, success=True, file_id=file_id, elapsed_ms=elapsed_ms))
+
+@app.route('/api/rank-jobs', methods=['POST'])
+def rank_jobs():
+    """Rank many job descriptions for one resume locally and return the top_k"""
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "No data provided", "file_id": "unknown"}), 400
+
+    file_id = data.get('file_id', 'unknown')
+    resume_json = data.get('resume_json')
+    if not resume_json and file_id != 'unknown':
+        resume_json = get_resume_data(file_id)
+        if resume_json is None:
+            return jsonify({"error": "Resume data not found. Please provide resume_json or re-upload your resume.", "file_id": file_id}), 404
+    if not resume_json:
+        return jsonify({"error": "Missing required fields: resume_json or file_id", "file_id": file_id}), 400
+
+    postings = data.get('job_descriptions')
+    postings_key = data.get('postings_key')
+    if postings is None and not postings_key:
+        return jsonify({"error": "Missing required fields: job_descriptions or postings_key", "file_id": file_id}), 400
+
+    job_descriptions = ids = None
+    if postings is not None:
+        if not isinstance(postings, list) or len(postings) > RANK_MAX_POSTINGS:
+            return jsonify({"error": f"job_descriptions must be a list of at most {RANK_MAX_POSTINGS} postings", "file_id": file_id}), 400
+        # Postings are plain strings or {"id": ..., "job_description": ...} objects
+        job_descriptions = [
+            posting.get('job_description') or posting.get('description') or '' if isinstance(posting, dict) else str(posting)
+            for posting in postings
+        ]
+        if any(isinstance(posting, dict) and 'id' in posting for posting in postings):
+            ids = [posting.get('id') if isinstance(posting, dict) else index for index, posting in enumerate(postings)]
+
+    top_k = data.get('top_k', 10)
+    if not isinstance(top_k, int) or top_k < 0:
+        return jsonify({"error": "top_k must be a non-negative integer", "file_id": file_id}), 400
+
+    try:
+        ranking, stats = rank_job_descriptions(
+            resume_json, job_descriptions, top_k=top_k, rank_by=data.get('rank_by', 'score'), ids=ids, key=postings_key
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e), "file_id": file_id}), 400
+    except KeyError as e:
+        return jsonify({"error": e.args[0], "postings_key": postings_key, "file_id": file_id}), 404
+
+    for rank, posting in enumerate(ranking, 1):
+        posting["rank"] = rank
+    print(f"DEBUG: [File ID: {file_id}] Ranked {stats['postings']} postings in {stats['elapsed_ms']}ms (matrix cached: {stats['matrix_cached']})")
+    return jsonify({
+        "success": True,
+        "file_id": file_id,
+        "postings_key": stats["postings_key"],
+        "results": ranking,
+        "stats": stats
+    })
+
+@app.route('/api/search-resumes', methods=['POST'])
+def search_resumes():
+    """Return the stored resumes that best match a job description, from the resume index"""
+    data = request.get_json(silent=True)
+    if not data or not data.get('job_description'):
+        return jsonify({"error": "Missing required fields: job_description"}), 400
+
+    top_k = data.get('top_k', 10)
+    if not isinstance(top_k, int) or top_k < 0:
+        return jsonify({"error": "top_k must be a non-negative integer"}), 400
+
+    started = time.perf_counter()
+    results = resume_index.search(data['job_description'], top_k=top_k)
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+    stats = dict(resume_index.stats(), elapsed_ms=elapsed_ms)
+    print(f"DEBUG: Searched {stats['resumes']} indexed resumes in {elapsed_ms}ms, {len(results)} results")
+    return jsonify({"success": True, "results": results, "stats": stats})
+
 @app.route('/api/templates', methods=['GET'])
 def get_templates():
     """Get available resume templates"""
@@ -704,14 +1419,52 @@ def health_check():
         "message": "GenApply API is running",
         "endpoints": [
             "/api/extract-resume-json",
+            "/api/extract-resume-json/stream",
+            "/api/extract-resume-json/batch",
             "/api/generate-cover-letter", 
             "/api/optimize-resume",
             "/api/ai-enhance",
-            "/api/templates"
+            "/api/match-score",
+            "/api/rank-jobs",
+            "/api/search-resumes",
+            "/api/templates",
+            "/api/metrics",
+            "/api/metrics/llm"
         ]
     }
     return jsonify(response_data)
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Counters for the LLM call path"""
+    response_data = {
+        "llm_cache": response_cache.stats(),
+        "llm_scheduler": scheduler.stats(),
+        "llm_hedging": hedger.stats(),
+        "llm_parsing": parse_stats.stats(),
+        "coalescing": pipeline_flights.stats(),
+        "job_analysis_cache": job_analysis_cache.stats(),
+        "job_analysis_coalescing": job_analysis_flights.stats(),
+        "posting_index": posting_index.stats(),
+        "posting_results": posting_results.stats(),
+        "llm_telemetry": telemetry.stats(group_by=("endpoint",)),
+        "rank_matrix_cache": matrix_cache.stats(),
+        "resume_index": resume_index.stats()
+    }
+    return jsonify(response_data)
+
+
+@app.route('/api/metrics/llm', methods=['GET'])
+def get_llm_metrics():
+    """Per-call LLM latency, token and cost histograms, grouped and filtered by label"""
+    group_by = [label.strip() for label in request.args.get('group_by', 'endpoint,model').split(',') if label.strip()]
+    filters = {label: request.args.get(label) for label in TELEMETRY_LABELS if request.args.get(label)}
+    try:
+        series = telemetry.stats(group_by=group_by, **filters)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"group_by": group_by, "filters": filters, "series": series})
+
 @app.errorhandler(404)
 def not_found(error):
     print(f"DEBUG: 404 error - endpoint not found: {request.url}")
@@ -724,12 +1477,13 @@ def internal_error(error):
     return jsonify({"error": "Internal server error"}), 500
 
 @app.route('/api/ai-enhance', methods=['POST'])
-def ai_enhance():
+async def ai_enhance():
     """AI Enhancement API - analyze resume against job description and provide optimized content"""
     try:
         print("=== DEBUG: Starting ai_enhance ===")
         print(f"DEBUG: Request method: {request.method}")
         print(f"DEBUG: Request content type: {request.content_type}")
+        text_compaction = None
         
         # Handle both file upload and JSON input
         if request.content_type and 'multipart/form-data' in request.content_type:
@@ -750,15 +1504,23 @@ def ai_enhance():
             api_key = request.form.get('api_key')
             model_type = request.form.get('model_type', 'DeepSeek')
             model = request.form.get('model', 'deepseek-chat')
+            use_cache = parse_bool(request.form.get('use_cache'))
+            combined = parse_bool(request.form.get('combined'), default=False)
+            local_scores = parse_bool(request.form.get('local_scores'), default=False)
+            analyze_job = parse_bool(request.form.get('analyze_job_description'))
+            reuse_postings = parse_bool(request.form.get('reuse_similar_postings'), default=use_cache)
             
             print(f"DEBUG: [File ID: {file_id}] File upload mode - filename: {file.filename}")
             
             # Extract text from file
-            text = extract_text_from_upload(file)
+            text = await run_blocking(extract_text_from_upload, file)
             print(f"DEBUG: [File ID: {file_id}] Text extracted, length: {len(text)}")
+            if parse_bool(request.form.get('compact_text')):
+                text, text_compaction = compact_text(text)
+                print(f"DEBUG: [File ID: {file_id}] Compacted text: {text_compaction}")
             
             # Generate JSON resume
-            resume_json = generate_json_resume(text, api_key, model, model_type)
+            resume_json = await agenerate_json_resume(text, api_key, model, model_type, use_cache=use_cache)
             
         else:
             # JSON input mode - support both file_id and resume_json
@@ -773,7 +1535,7 @@ def ai_enhance():
             # Try to get resume from file_id first, fallback to direct resume_json
             resume_json = data.get('resume_json')
             if not resume_json and file_id != 'unknown':
-                resume_json = get_resume_data(file_id)
+                resume_json = await run_blocking(get_resume_data, file_id)
                 if resume_json is None:
                     return jsonify({"error": "Resume data not found. Please provide resume_json or re-upload your resume.", "file_id": file_id}), 404
             
@@ -781,6 +1543,11 @@ def ai_enhance():
             api_key = data.get('api_key')
             model_type = data.get('model_type', 'DeepSeek')
             model = data.get('model', 'deepseek-chat')
+            use_cache = parse_bool(data.get('use_cache'))
+            combined = parse_bool(data.get('combined'), default=False)
+            local_scores = parse_bool(data.get('local_scores'), default=False)
+            analyze_job = parse_bool(data.get('analyze_job_description'))
+            reuse_postings = parse_bool(data.get('reuse_similar_postings'), default=use_cache)
             
             print(f"DEBUG: [File ID: {file_id}] JSON input mode")
         
@@ -795,14 +1562,43 @@ def ai_enhance():
         print(f"DEBUG: [File ID: {file_id}] Job description length: {len(job_description)}")
         print(f"DEBUG: [File ID: {file_id}] Resume JSON keys: {list(resume_json.keys()) if isinstance(resume_json, dict) else 'Not a dict'}")
         
-        # Generate AI analysis and enhancement
-        enhancement_result = generate_ai_enhancement(resume_json, job_description, api_key, model, model_type)
+        result_key = posting_result_key("ai-enhance", api_key, resume_json, model, model_type, combined, analyze_job)
+        enhancement_result, near_duplicate = find_posting_result(job_description, result_key, reuse_postings)
+        print(f"DEBUG: [File ID: {file_id}] Near-duplicate posting: {near_duplicate}")
+        coalesced = False
+        job_analysis = None
+        if enhancement_result is None:
+            job_context, job_analysis = await ajob_description_context(
+                job_description, api_key, model, model_type, use_cache, enabled=analyze_job
+            )
+            print(f"DEBUG: [File ID: {file_id}] Job description context: {job_analysis_header(job_analysis)}, {len(job_context)} chars")
+            
+            # Generate AI analysis and enhancement
+            enhance_key = make_cache_key(
+                "ai-enhance", api_key, resume_json, normalize_job_description(job_context), model, model_type, use_cache,
+                combined
+            )
+            enhancement_result, coalesced = await pipeline_flights.ado(
+                enhance_key,
+                lambda: agenerate_ai_enhancement(
+                    resume_json, job_context, api_key, model, model_type, use_cache=use_cache, combined=combined
+                )
+            )
+            if enhancement_result.get("success") and not enhancement_result.get("partial"):
+                store_posting_result(near_duplicate, result_key, enhancement_result)
         
-        # Add file_id to response
-        enhancement_result['file_id'] = file_id
+        # Add file_id to response (a copy, since coalesced requests share the result)
+        enhancement_result = dict(
+            enhancement_result, file_id=file_id, job_analysis=job_analysis, near_duplicate=near_duplicate,
+            text_compaction=text_compaction
+        )
+        if local_scores and enhancement_result.get("success"):
+            enhancement_result = apply_local_scores(enhancement_result, resume_json, job_description)
         
         print(f"DEBUG: [File ID: {file_id}] Enhancement result keys: {list(enhancement_result.keys())}")
-        return jsonify(enhancement_result)
+        response = jsonify(enhancement_result)
+        response.headers["X-Coalesced"] = str(coalesced).lower()
+        return response
         
     except Exception as e:
         file_id = 'unknown'
@@ -819,10 +1615,51 @@ def ai_enhance():
             "file_id": file_id
         }), 500
 
-def generate_ai_enhancement(resume_json, job_description, api_key, model="deepseek-chat", model_type="DeepSeek"):
-    """Generate AI-powered enhancement analysis and content"""
-    from openai import OpenAI
-    
+AI_ANALYSIS_SYSTEM_PROMPT = "You are an expert career coach and resume analyst. Provide detailed, actionable feedback in valid JSON format only."
+AI_ENHANCEMENT_SYSTEM_PROMPT = "You are an expert resume writer. Generate enhanced, job-tailored content in valid JSON format only."
+AI_COMBINED_SYSTEM_PROMPT = "You are an expert career coach and resume writer. Analyze resumes and generate enhanced, job-tailored content in valid JSON format only."
+
+AI_ANALYSIS_FORMAT = """{
+        "match_score": <0-100 integer>,
+        "strengths": ["strength1", "strength2", "strength3"],
+        "gaps": ["gap1", "gap2", "gap3"],
+        "suggestions": ["suggestion1", "suggestion2", "suggestion3"],
+        "keyword_analysis": {
+            "missing_keywords": ["keyword1", "keyword2"],
+            "present_keywords": ["keyword1", "keyword2"],
+            "keyword_density_score": <0-100 integer>
+        },
+        "section_recommendations": {
+            "skills": "recommendation for skills section",
+            "experience": "recommendation for experience section",
+            "education": "recommendation for education section"
+        }
+    }"""
+
+AI_ENHANCEMENT_FORMAT = """{
+        "enhanced_summary": "An improved professional summary tailored to the job",
+        "enhanced_skills": ["skill1", "skill2", "skill3"],
+        "enhanced_experience_bullets": [
+            "Enhanced bullet point 1 with metrics and keywords",
+            "Enhanced bullet point 2 with impact and results",
+            "Enhanced bullet point 3 with relevant achievements"
+        ],
+        "cover_letter_outline": {
+            "opening": "Compelling opening paragraph",
+            "body": "Main body highlighting relevant experience",
+            "closing": "Strong closing paragraph"
+        }
+    }"""
+
+# Result key -> (system prompt, prompt name, temperature) of the two ai-enhance calls
+AI_ENHANCEMENT_PARTS = {
+    "analysis": (AI_ANALYSIS_SYSTEM_PROMPT, "ai_analysis", 0.3),
+    "enhancements": (AI_ENHANCEMENT_SYSTEM_PROMPT, "ai_enhancement", 0.4),
+}
+
+
+def ai_enhancement_prompts(resume_json, job_description):
+    """Build the (analysis, enhancement) prompts for a resume and job description"""
     # Convert resume to text for analysis
     resume_text = json.dumps(resume_json, indent=2)
     
@@ -837,22 +1674,7 @@ def generate_ai_enhancement(resume_json, job_description, api_key, model="deepse
     {job_description}
     
     Provide your analysis in the following JSON format:
-    {{
-        "match_score": <0-100 integer>,
-        "strengths": ["strength1", "strength2", "strength3"],
-        "gaps": ["gap1", "gap2", "gap3"],
-        "suggestions": ["suggestion1", "suggestion2", "suggestion3"],
-        "keyword_analysis": {{
-            "missing_keywords": ["keyword1", "keyword2"],
-            "present_keywords": ["keyword1", "keyword2"],
-            "keyword_density_score": <0-100 integer>
-        }},
-        "section_recommendations": {{
-            "skills": "recommendation for skills section",
-            "experience": "recommendation for experience section",
-            "education": "recommendation for education section"
-        }}
-    }}
+    {AI_ANALYSIS_FORMAT}
     
     Be specific and actionable in your recommendations.
     """
@@ -868,109 +1690,231 @@ def generate_ai_enhancement(resume_json, job_description, api_key, model="deepse
     {job_description}
     
     Generate enhanced versions in JSON format:
-    {{
-        "enhanced_summary": "An improved professional summary tailored to the job",
-        "enhanced_skills": ["skill1", "skill2", "skill3"],
-        "enhanced_experience_bullets": [
-            "Enhanced bullet point 1 with metrics and keywords",
-            "Enhanced bullet point 2 with impact and results",
-            "Enhanced bullet point 3 with relevant achievements"
-        ],
-        "cover_letter_outline": {{
-            "opening": "Compelling opening paragraph",
-            "body": "Main body highlighting relevant experience",
-            "closing": "Strong closing paragraph"
-        }}
-    }}
+    {AI_ENHANCEMENT_FORMAT}
     
     Focus on incorporating job-relevant keywords and quantifiable achievements.
     """
+    return analysis_prompt, enhancement_prompt
+
+
+def ai_combined_prompt(resume_json, job_description):
+    """Build the prompt asking for the analysis and the enhancements in one answer"""
+    resume_text = json.dumps(resume_json, indent=2)
+    return f"""
+    Analyze the following resume against the job description, then generate enhanced content for it.
+    
+    RESUME:
+    {resume_text}
     
-    print("DEBUG: Generating AI analysis...")
+    JOB DESCRIPTION:
+    {job_description}
     
-    if model_type == "OpenAI":
-        client = OpenAI(api_key=api_key)
-    elif model_type == "DeepSeek":
-        client = OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
-    else:
-        print(f"DEBUG: Unsupported model type: {model_type}, falling back to DeepSeek")
-        model_type = "DeepSeek"
-        model = "deepseek-chat"
-        client = OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
-        
+    Answer with one JSON object with two keys:
+    {{
+    "analysis": {AI_ANALYSIS_FORMAT},
+    "enhancements": {AI_ENHANCEMENT_FORMAT}
+    }}
+    
+    Be specific and actionable in your recommendations, and focus the enhanced content on job-relevant keywords and quantifiable achievements.
+    """
+
+
+def parse_ai_answer(text):
+    """Strip code fences from an analysis or enhancement answer and parse it"""
+    text = text.strip()
+    print(f"DEBUG: Response length: {len(text)}")
+    text = text.replace('```json', '').replace('```', '').strip()
+    return json.loads(text)
+
+
+def parse_ai_combined_answer(text):
+    """Split a combined answer into {part: (data, text, error)} for the parts it holds"""
     try:
-        # Get analysis
-        print(f"DEBUG: Making {model_type} API call for analysis with model {model}...")
-        analysis_response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are an expert career coach and resume analyst. Provide detailed, actionable feedback in valid JSON format only."},
-                {"role": "user", "content": analysis_prompt}
-            ],
-            temperature=0.3
-        )
-        
-        analysis_text = analysis_response.choices[0].message.content.strip()
-        print(f"DEBUG: Analysis response length: {len(analysis_text)}")
-        
-        # Clean and parse JSON
-        analysis_text = analysis_text.replace('```json', '').replace('```', '').strip()
-        analysis_data = json.loads(analysis_text)
-        
-        # Get enhancement
-        print(f"DEBUG: Making {model_type} API call for enhancement with model {model}...")
-        enhancement_response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are an expert resume writer. Generate enhanced, job-tailored content in valid JSON format only."},
-                {"role": "user", "content": enhancement_prompt}
-            ],
-            temperature=0.4
-        )
-        
-        enhancement_text = enhancement_response.choices[0].message.content.strip()
-        print(f"DEBUG: Enhancement response length: {len(enhancement_text)}")
-        
-        # Clean and parse JSON
-        enhancement_text = enhancement_text.replace('```json', '').replace('```', '').strip()
-        enhancement_data = json.loads(enhancement_text)
-        
-        # Combine results
-        result = {
-            "success": True,
-            "analysis": analysis_data,
-            "enhancements": enhancement_data,
-            "metadata": {
-                "model_used": model,
-                "model_type": model_type,
-                "timestamp": json.dumps({"timestamp": "2024-01-01T00:00:00Z"}),
-                "resume_sections_analyzed": list(resume_json.keys())
-            }
-        }
-        
-        print(f"DEBUG: Combined result keys: {list(result.keys())}")
-        return result
-            
-    except json.JSONDecodeError as e:
-        print(f"DEBUG: JSON decode error: {str(e)}")
-        return {
-            "success": False,
-            "error": "Failed to parse AI response as JSON",
-            "raw_analysis": analysis_text if 'analysis_text' in locals() else "",
-            "raw_enhancement": enhancement_text if 'enhancement_text' in locals() else ""
-        }
+        data = parse_ai_answer(text)
     except Exception as e:
-        print(f"DEBUG: OpenAI API error: {str(e)}")
-        return {
-            "success": False,
-            "error": f"OpenAI API error: {str(e)}"
+        print(f"DEBUG: Combined ai-enhance answer is not valid JSON: {str(e)}")
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {
+        part: (data[part], text, None)
+        for part in AI_ENHANCEMENT_PARTS if isinstance(data.get(part), dict)
+    }
+
+
+def ai_enhancement_result(resume_json, model, model_type, analysis_data, enhancement_data):
+    """Combine the parsed analysis and enhancement into the ai-enhance response"""
+    result = {
+        "success": True,
+        "analysis": analysis_data,
+        "enhancements": enhancement_data,
+        "metadata": {
+            "model_used": model,
+            "model_type": model_type,
+            "timestamp": json.dumps({"timestamp": "2024-01-01T00:00:00Z"}),
+            "resume_sections_analyzed": list(resume_json.keys())
         }
+    }
     
-    else:
+    print(f"DEBUG: Combined result keys: {list(result.keys())}")
+    return result
+
+
+def ai_enhancement_error(error, analysis_text="", enhancement_text=""):
+    """Return the ai-enhance failure response for a parsing or provider error"""
+    if isinstance(error, json.JSONDecodeError):
+        print(f"DEBUG: JSON decode error: {str(error)}")
         return {
             "success": False,
-            "error": f"Model type '{model_type}' not supported for AI enhancement"
+            "error": "Failed to parse AI response as JSON",
+            "raw_analysis": analysis_text,
+            "raw_enhancement": enhancement_text
         }
+    print(f"DEBUG: OpenAI API error: {str(error)}")
+    return {
+        "success": False,
+        "error": f"OpenAI API error: {str(error)}"
+    }
+
+
+def ai_enhancement_outcome(resume_json, model, model_type, parts, combined):
+    """Build the ai-enhance response from {part: (data, text, error)}
+
+    One failed part does not discard the other: the response then has
+    ``partial`` set, the failed part as None and its error under ``errors``.
+    Only when both fail is it an error response.
+    """
+    (analysis_data, analysis_text, analysis_error) = parts["analysis"]
+    (enhancement_data, enhancement_text, enhancement_error) = parts["enhancements"]
+    if analysis_error is not None and enhancement_error is not None:
+        return ai_enhancement_error(analysis_error, analysis_text, enhancement_text)
+
+    result = ai_enhancement_result(resume_json, model, model_type, analysis_data, enhancement_data)
+    result["metadata"]["combined_call"] = combined
+    errors = {part: str(error) for part, (_, _, error) in parts.items() if error is not None}
+    if errors:
+        print(f"DEBUG: ai-enhance partial result, failed parts: {errors}")
+        result["partial"] = True
+        result["errors"] = errors
+        for part, (_, text, error) in parts.items():
+            if error is not None and text:
+                result[f"raw_{part}"] = text
+    return result
+
+
+def ai_enhancement_part(model_type, api_key, model, part, prompt, use_cache):
+    """Make one ai-enhance call, returning (data, text, error) instead of raising"""
+    system_prompt, prompt_name, temperature = AI_ENHANCEMENT_PARTS[part]
+    text = ""
+    try:
+        print(f"DEBUG: Making {model_type} API call for {part} with model {model}...")
+        text, _ = chat_completion(
+            model_type, api_key, model, system_prompt, prompt,
+            use_cache=use_cache, cache_check=is_json_answer, prompt_name=prompt_name,
+            temperature=temperature
+        )
+        return parse_ai_answer(text), text, None
+    except Exception as e:
+        return None, text, e
+
+
+async def aai_enhancement_part(model_type, api_key, model, part, prompt, use_cache):
+    """Coroutine version of ai_enhancement_part"""
+    system_prompt, prompt_name, temperature = AI_ENHANCEMENT_PARTS[part]
+    text = ""
+    try:
+        print(f"DEBUG: Making async {model_type} API call for {part} with model {model}...")
+        text, _ = await achat_completion(
+            model_type, api_key, model, system_prompt, prompt,
+            use_cache=use_cache, cache_check=is_json_answer, prompt_name=prompt_name,
+            temperature=temperature
+        )
+        return parse_ai_answer(text), text, None
+    except Exception as e:
+        return None, text, e
+
+
+def apply_local_scores(enhancement_result, resume_json, job_description):
+    """Return a copy of an ai-enhance result with the LLM's scores replaced by match_score's
+
+    The local scores are deterministic and comparable across calls; the
+    LLM's other feedback is kept.
+    """
+    scores = match_score(resume_json, job_description)
+    analysis = dict(enhancement_result.get("analysis") or {}, match_score=scores["match_score"])
+    analysis["keyword_analysis"] = dict(
+        analysis.get("keyword_analysis") or {},
+        keyword_density_score=scores["keyword_density_score"],
+        missing_keywords=scores["missing_keywords"],
+        present_keywords=scores["present_keywords"]
+    )
+    metadata = dict(enhancement_result.get("metadata") or {}, score_source="local")
+    return dict(enhancement_result, analysis=analysis, metadata=metadata, local_match=scores)
+
+
+def generate_ai_enhancement(resume_json, job_description, api_key, model="deepseek-chat", model_type="DeepSeek", use_cache=True, combined=False):
+    """Generate AI-powered enhancement analysis and content
+
+    The analysis and enhancement calls are independent and run concurrently.
+    With ``combined`` both are asked for in one call, and only a part
+    missing from its answer gets its own call.
+    """
+    model_type, model = resolve_model(model_type, model)
+    prompts = dict(zip(AI_ENHANCEMENT_PARTS, ai_enhancement_prompts(resume_json, job_description)))
+    parts = {}
+
+    if combined:
+        try:
+            print(f"DEBUG: Making {model_type} API call for combined analysis and enhancement with model {model}...")
+            text, _ = chat_completion(
+                model_type, api_key, model, AI_COMBINED_SYSTEM_PROMPT, ai_combined_prompt(resume_json, job_description),
+                use_cache=use_cache, cache_check=is_json_answer, prompt_name="ai_combined", temperature=0.3
+            )
+            parts = parse_ai_combined_answer(text)
+        except Exception as e:
+            print(f"DEBUG: Combined ai-enhance call failed: {str(e)}")
+
+    pending = [part for part in AI_ENHANCEMENT_PARTS if part not in parts]
+    if pending:
+        print(f"DEBUG: Generating AI {' and '.join(pending)}...")
+        with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+            futures = {
+                part: executor.submit(
+                    contextvars.copy_context().run, ai_enhancement_part,
+                    model_type, api_key, model, part, prompts[part], use_cache
+                )
+                for part in pending
+            }
+            parts.update({part: future.result() for part, future in futures.items()})
+
+    return ai_enhancement_outcome(resume_json, model, model_type, parts, combined)
+
+
+async def agenerate_ai_enhancement(resume_json, job_description, api_key, model="deepseek-chat", model_type="DeepSeek", use_cache=True, combined=False):
+    """Coroutine version of generate_ai_enhancement"""
+    model_type, model = resolve_model(model_type, model)
+    prompts = dict(zip(AI_ENHANCEMENT_PARTS, ai_enhancement_prompts(resume_json, job_description)))
+    parts = {}
+
+    if combined:
+        try:
+            print(f"DEBUG: Making async {model_type} API call for combined analysis and enhancement with model {model}...")
+            text, _ = await achat_completion(
+                model_type, api_key, model, AI_COMBINED_SYSTEM_PROMPT, ai_combined_prompt(resume_json, job_description),
+                use_cache=use_cache, cache_check=is_json_answer, prompt_name="ai_combined", temperature=0.3
+            )
+            parts = parse_ai_combined_answer(text)
+        except Exception as e:
+            print(f"DEBUG: Combined ai-enhance call failed: {str(e)}")
+
+    pending = [part for part in AI_ENHANCEMENT_PARTS if part not in parts]
+    if pending:
+        results = await asyncio.gather(*[
+            aai_enhancement_part(model_type, api_key, model, part, prompts[part], use_cache) for part in pending
+        ])
+        parts.update(zip(pending, results))
+
+    return ai_enhancement_outcome(resume_json, model, model_type, parts, combined)
 
 if __name__ == '__main__':
     print("=== DEBUG: Starting Flask application ===")
@@ -984,10 +1928,17 @@ if __name__ == '__main__':
     print("DEBUG: Available endpoints:")
     print("  - GET  /api/health")
     print("  - GET  /api/templates")
+    print("  - GET  /api/metrics")
+    print("  - GET  /api/metrics/llm")
     print("  - POST /api/extract-resume-json")
+    print("  - POST /api/extract-resume-json/stream")
+    print("  - POST /api/extract-resume-json/batch")
     print("  - POST /api/generate-cover-letter")
     print("  - POST /api/optimize-resume")
     print("  - POST /api/ai-enhance")
+    print("  - POST /api/match-score")
+    print("  - POST /api/rank-jobs")
+    print("  - POST /api/search-resumes")
     app.run(debug=True, host='0.0.0.0', port=5000)
     print("  - POST /api/optimize-resume")
     print("  - POST /api/ai-enhance")
@@ -0,0 +1,182 @@
+"""ASGI entry point: ``uvicorn asgi:application --host 0.0.0.0 --port 5000``
+
+Coroutine views (the LLM-bound endpoints) are awaited directly on the
+server's event loop, so one process can hold hundreds of in-flight LLM calls
+without a thread per request. Every other view runs through the regular WSGI
+app on a pool of ASGI_SYNC_WORKERS threads, so a slow sync view (a streamed
+extraction) does not hold up the others.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import inspect
+import os
+import sys
+
+from app import app
+
+# Threads running the sync (WSGI) views; each streamed extraction holds one for its duration
+SYNC_WORKERS = int(os.environ.get("ASGI_SYNC_WORKERS", 32))
+
+
+def build_environ(scope, body):
+    """Build a WSGI environ from an ASGI HTTP scope and the request body"""
+    script_name = scope.get("root_path", "").encode("utf8").decode("latin1")
+    path_info = scope["path"].encode("utf8").decode("latin1")
+    if script_name and path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": script_name,
+        "PATH_INFO": path_info,
+        "QUERY_STRING": scope.get("query_string", b"").decode("ascii"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin1")
+        if name == "content-length":
+            key = "CONTENT_LENGTH"
+        elif name == "content-type":
+            key = "CONTENT_TYPE"
+        else:
+            key = "HTTP_" + name.upper().replace("-", "_")
+        value = value.decode("latin1")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    # The body is fully buffered, so chunked uploads get a length too
+    environ.pop("HTTP_TRANSFER_ENCODING", None)
+    environ["CONTENT_LENGTH"] = str(len(body))
+    return environ
+
+
+async def read_body(receive):
+    """Read the whole request body; returns None if the client disconnected"""
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return bytes(body)
+
+
+class FlaskASGI:
+    """Serve a Flask app over ASGI, awaiting its coroutine views in the server's event loop"""
+
+    def __init__(self, flask_app, sync_workers=SYNC_WORKERS):
+        self.app = flask_app
+        self._executor = ThreadPoolExecutor(max_workers=sync_workers, thread_name_prefix="asgi-sync")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        body = await read_body(receive)
+        if body is None:
+            return
+        environ = build_environ(scope, body)
+
+        with self.app.request_context(environ) as ctx:
+            rule = ctx.request.url_rule
+            view = self.app.view_functions.get(rule.endpoint) if rule is not None else None
+            if view is not None and inspect.iscoroutinefunction(view) and ctx.request.method != "OPTIONS":
+                response = await self.dispatch(view, ctx.request.view_args or {})
+                await self.send_response(response, environ, send)
+                return
+
+        await self.run_wsgi(environ, send)
+
+    async def dispatch(self, view, view_args):
+        """Await a coroutine view with Flask's before/after request hooks and error handlers"""
+        try:
+            try:
+                rv = self.app.preprocess_request()
+                if rv is None:
+                    rv = await view(**view_args)
+            except Exception as e:
+                rv = self.app.handle_user_exception(e)
+            return self.app.finalize_request(rv)
+        except Exception as e:
+            return self.app.handle_exception(e)
+
+    async def run_wsgi(self, environ, send):
+        """Run a sync view through the WSGI app on the worker pool, sending each chunk as it is produced"""
+        loop = asyncio.get_running_loop()
+
+        def send_from_thread(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def run():
+            response_start = {}
+
+            def start_response(status, headers, exc_info=None):
+                if exc_info and response_start.get("sent"):
+                    raise exc_info[1].with_traceback(exc_info[2])
+                response_start["message"] = {
+                    "type": "http.response.start",
+                    "status": int(status.split(" ", 1)[0]),
+                    "headers": [(name.lower().encode("latin1"), value.encode("latin1")) for name, value in headers],
+                }
+
+            def start():
+                if not response_start.get("sent"):
+                    response_start["sent"] = True
+                    send_from_thread(response_start["message"])
+
+            app_iter = self.app(environ, start_response)
+            try:
+                for chunk in app_iter:
+                    if chunk:
+                        start()
+                        send_from_thread({"type": "http.response.body", "body": chunk, "more_body": True})
+            finally:
+                if hasattr(app_iter, "close"):
+                    app_iter.close()
+            start()
+            send_from_thread({"type": "http.response.body", "body": b"", "more_body": False})
+
+        await loop.run_in_executor(self._executor, run)
+
+    async def send_response(self, response, environ, send):
+        app_iter, status, headers = response.get_wsgi_response(environ)
+        await send({
+            "type": "http.response.start",
+            "status": int(status.split(" ", 1)[0]),
+            "headers": [(name.lower().encode("latin1"), value.encode("latin1")) for name, value in headers],
+        })
+        try:
+            for chunk in app_iter:
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        finally:
+            if hasattr(app_iter, "close"):
+                app_iter.close()
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+application = FlaskASGI(app)
@@ -1,8 +1,13 @@
-from pdfminer.high_level import extract_text
+from pdfminer.high_level import extract_text, extract_pages
+from pdfminer.layout import LTChar, LTTextContainer, LTTextLine
 import docx2txt
 import tempfile
 import os
 from io import BytesIO
+from collections import Counter
+import posixpath
+import re
+import zipfile
 
 
 def extract_text_from_pdf(file):
@@ -37,6 +42,49 @@ def extract_text_from_docx(file):
         return docx2txt.process(file)
 
 
+def extract_text_and_layout_from_pdf(file):
+    """Extract text plus per-line layout hints from a PDF in a single pdfminer pass
+
+    Returns (text, lines) where each line is a dict with its text, page number,
+    top coordinate, left and right coordinates, average font size and whether
+    any of its characters use a bold font. The text matches extract_text_from_pdf closely
+    enough for the LLM prompts (one newline per text line, a blank line after
+    each text box, a form feed after each page).
+    """
+    if hasattr(file, "read"):
+        file.seek(0)  # Reset file pointer
+        source = BytesIO(file.read())
+    else:
+        source = file
+
+    text_parts = []
+    lines = []
+    for page_number, page in enumerate(extract_pages(source)):
+        for element in page:
+            if not isinstance(element, LTTextContainer):
+                continue
+            for text_line in element:
+                if not isinstance(text_line, LTTextLine):
+                    continue
+                line_text = text_line.get_text()
+                text_parts.append(line_text)
+                chars = [char for char in text_line if isinstance(char, LTChar)]
+                if not line_text.strip() or not chars:
+                    continue
+                lines.append({
+                    "text": line_text.strip(),
+                    "page": page_number,
+                    "top": text_line.y1,
+                    "x0": text_line.x0,
+                    "x1": text_line.x1,
+                    "size": sum(char.size for char in chars) / len(chars),
+                    "bold": any("bold" in char.fontname.lower() for char in chars),
+                })
+            text_parts.append("\n")
+        text_parts.append("\f")
+    return "".join(text_parts), lines
+
+
 def get_file_type(file):
     """Determine file type from content_type and filename"""
     # Try to get content_type (for Flask FileStorage objects)
@@ -74,6 +122,18 @@ def get_file_type(file):
     return "unknown"
 
 
+def extract_text_and_layout_from_upload(file):
+    """Like extract_text_from_upload, also returning PDF layout lines (None for other types)"""
+    if get_file_type(file) == "pdf":
+        try:
+            return extract_text_and_layout_from_pdf(file)
+        except Exception as e:
+            raise ValueError(
+                f"Error processing file: {str(e)}. File type: pdf, Content-Type: {getattr(file, 'content_type', 'unknown')}, Filename: {getattr(file, 'filename', 'unknown')}"
+            )
+    return extract_text_from_upload(file), None
+
+
 def extract_text_from_upload(file):
     file_type = get_file_type(file)
 
@@ -105,6 +165,568 @@ def extract_text_from_upload(file):
         )
 
 
+# Archive members extract_text_from_upload knows how to read
+ARCHIVE_FILE_TYPES = ("pdf", "docx", "doc", "json", "text")
+
+
+class ArchiveMember(BytesIO):
+    """A file read from an archive, usable wherever an uploaded FileStorage is"""
+
+    def __init__(self, data, filename):
+        super().__init__(data)
+        self.filename = filename
+        self.content_type = None
+
+
+def extract_uploads_from_zip(file, max_files, max_bytes):
+    """Return (members, skipped) for the resumes in an uploaded zip archive
+
+    members are ArchiveMember objects in archive order; skipped lists the
+    names of entries that are not resumes (directories, hidden or metadata
+    files, unsupported types). Raises ValueError for a file that is not a
+    zip, or when the archive holds more than max_files resumes or more than
+    max_bytes of uncompressed resume data.
+    """
+    file.seek(0)
+    try:
+        archive = zipfile.ZipFile(BytesIO(file.read()))
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Archive is not a valid zip file: {str(e)}")
+
+    members, skipped = [], []
+    total_bytes = 0
+    with archive:
+        for info in archive.infolist():
+            name = posixpath.basename(info.filename.replace("\\", "/"))
+            if info.is_dir():
+                continue
+            if not name or name.startswith(".") or info.filename.startswith("__MACOSX/"):
+                skipped.append(info.filename)
+                continue
+            member = ArchiveMember(b"", name)
+            if get_file_type(member) not in ARCHIVE_FILE_TYPES:
+                skipped.append(info.filename)
+                continue
+            if len(members) >= max_files:
+                raise ValueError(f"Archive holds more than {max_files} resumes")
+            total_bytes += info.file_size
+            if total_bytes > max_bytes:
+                raise ValueError(f"Archive holds more than {max_bytes} bytes of uncompressed resumes")
+            # Read at most the declared size, so a forged header cannot inflate past the limit
+            with archive.open(info) as source:
+                data = source.read(info.file_size + 1)
+            if len(data) > info.file_size:
+                raise ValueError(f"Archive member {info.filename} is larger than its declared size")
+            members.append(ArchiveMember(data, name))
+    return members, skipped
+
+
+# Characters pdfminer/docx2txt leave behind that the LLM does not need
+TEXT_REPLACEMENTS = {
+    "\ufb00": "ff",
+    "\ufb01": "fi",
+    "\ufb02": "fl",
+    "\ufb03": "ffi",
+    "\ufb04": "ffl",
+    "\ufb05": "st",
+    "\ufb06": "st",
+    "\xa0": " ",  # Non-breaking space
+    "\u2002": " ",
+    "\u2003": " ",
+    "\u2009": " ",
+    "\u00ad": "",  # Soft hyphen
+    "\u200b": "",  # Zero-width space
+    "\u200c": "",
+    "\u200d": "",
+    "\ufeff": "",
+    "\t": " ",
+}
+
+PAGE_NUMBER_PATTERN = re.compile(r"^(page\s*)?\d{1,3}(\s*(/|of)\s*\d{1,3})?$", re.IGNORECASE)
+CID_PATTERN = re.compile(r"\(cid:\d+\)")
+LINE_BREAK_HYPHEN_PATTERN = re.compile(r"\b([A-Za-z]*[a-z])-\n([a-z]+)\b")
+
+# Word endings that only occur as the second half of a word split by
+# hyphenation ("develop-\nment"); compounds end in words ("Full-\nstack")
+HYPHENATION_SUFFIXES = {
+    "ment", "ments", "tion", "tions", "sion", "sions", "ation", "ations", "ization", "isation",
+    "ing", "ings", "ity", "ities", "ness", "ance", "ances", "ence", "ences", "ancy", "ency",
+    "ible", "ibly", "ably", "ive", "ives", "ively", "ous", "ously", "ally", "ical", "ically",
+    "ial", "ially", "ized", "izing", "ised", "ising", "ure", "ures", "ture", "tures",
+    "ist", "ists", "ism", "ed", "er", "ers", "ly", "al",
+}
+
+
+def estimate_tokens(text):
+    """Rough token count for budgeting (about 4 characters per token)"""
+    return (len(text) + 3) // 4
+
+
+def _strip_repeated_page_lines(pages):
+    """Drop page numbers and header/footer lines repeated across pages
+
+    A line counts as a header or footer when it is among the first or last two
+    non-empty lines of at least two pages. Its first occurrence is kept, since
+    resume headers usually carry the candidate's name and contact details.
+    """
+    edge_lines = Counter()
+    for page in pages:
+        lines = [line for line in page if line]
+        for line in set(lines[:2] + lines[-2:]):
+            edge_lines[line] += 1
+    repeated = {line for line, count in edge_lines.items() if count >= 2}
+
+    seen = set()
+    removed = 0
+    kept_pages = []
+    for page in pages:
+        kept = []
+        for line in page:
+            if line and PAGE_NUMBER_PATTERN.match(line):
+                removed += 1
+                continue
+            if line in repeated:
+                if line in seen:
+                    removed += 1
+                    continue
+                seen.add(line)
+            kept.append(line)
+        kept_pages.append(kept)
+    return kept_pages, removed
+
+
+def _join_hyphenated_words(text):
+    """Re-join words hyphenated across a line break ("develop-\nment")
+
+    A split is joined when its second half is a hyphenation suffix or the
+    joined word appears elsewhere in the text, and never when the
+    hyphenated compound does; otherwise the hyphen is kept, so compounds
+    such as "Full-\nstack" stay "Full-stack".
+    """
+    words = set(re.findall(r"[a-z]+", text.lower()))
+    compounds = set(re.findall(r"[a-z]+-[a-z]+", text.lower()))
+
+    def join(match):
+        head, tail = match.groups()
+        joined = (head + tail).lower()
+        if f"{head}-{tail}".lower() not in compounds and (tail in HYPHENATION_SUFFIXES or joined in words):
+            return head + tail
+        return f"{head}-{tail}"
+
+    return LINE_BREAK_HYPHEN_PATTERN.sub(join, text)
+
+
+def compact_text(text):
+    """Normalize extracted resume text before it is sent to the LLM
+
+    Removes ligature and whitespace artifacts, pdfminer (cid:N) glyphs, page
+    numbers, repeated headers/footers, hyphenation splits and runs of blank
+    lines, and rejoins lines that pdfminer split by a blank line mid-sentence.
+    The result is deterministic for a given input.
+
+    Returns a (text, stats) tuple where stats holds the character and estimated
+    token counts before and after.
+    """
+    original = text or ""
+
+    text = original.replace("\r\n", "\n").replace("\r", "\n")
+    for char, replacement in TEXT_REPLACEMENTS.items():
+        text = text.replace(char, replacement)
+    text = CID_PATTERN.sub("", text)
+
+    # pdfminer separates pages with form feeds
+    pages = []
+    for page in text.split("\f"):
+        pages.append([re.sub(r" {2,}", " ", line).strip() for line in page.split("\n")])
+    pages, removed_lines = _strip_repeated_page_lines(pages)
+    text = "\n".join("\n".join(page) for page in pages)
+
+    text = _join_hyphenated_words(text)
+    # A blank line between a long line and a lowercase word is a sentence
+    # broken by layout; short lines are left alone since they may be headings
+    text = re.sub(r"([^\n]{40,})\n\n+([a-z])", r"\1 \2", text)
+    text = re.sub(r"\n{3,}", "\n\n", text).strip()
+
+    stats = {
+        "original_chars": len(original),
+        "compacted_chars": len(text),
+        "original_tokens_estimate": estimate_tokens(original),
+        "compacted_tokens_estimate": estimate_tokens(text),
+        "removed_lines": removed_lines,
+    }
+    if original:
+        stats["reduction_ratio"] = round(1 - len(text) / len(original), 4)
+    return text, stats
+
+
+# Heading texts (lowercased, without trailing punctuation) mapped to resume sections
+SECTION_HEADINGS = {
+    "education": [
+        "education", "academic background", "academic history", "academics",
+        "education and training", "qualifications", "academic qualifications",
+    ],
+    "work": [
+        "experience", "work experience", "professional experience", "employment",
+        "employment history", "work history", "career history", "relevant experience",
+        "professional background", "research experience", "industry experience",
+    ],
+    "projects": [
+        "projects", "personal projects", "academic projects", "selected projects",
+        "key projects", "project experience", "side projects",
+    ],
+    "skills": [
+        "skills", "technical skills", "core skills", "key skills", "skills and interests",
+        "core competencies", "competencies", "technologies", "tools and technologies",
+        "programming languages", "languages and tools",
+    ],
+    "awards": [
+        "awards", "honors", "honours", "awards and honors", "honors and awards",
+        "achievements", "accomplishments", "scholarships", "awards and achievements",
+    ],
+}
+
+HEADING_LOOKUP = {
+    heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings
+}
+
+# Longest heading line, in words, that is still treated as a section heading
+MAX_HEADING_WORDS = 5
+
+# Smallest share of a page's characters on each side of a gutter for the
+# page to count as two columns (so a right-aligned column of dates is not one)
+COLUMN_MIN_TEXT_SHARE = 0.2
+
+# Points a line may reach past a gutter and still belong to its column
+COLUMN_GUTTER_TOLERANCE = 2.0
+
+
+def _normalize_heading(line):
+    line = re.sub(r"[^a-z&/ ]", " ", line.lower()).replace("&", " and ").replace("/", " and ")
+    return " ".join(line.split())
+
+
+def match_section_heading(line):
+    """Return the resume section a heading line introduces, or None"""
+    normalized = _normalize_heading(line)
+    if not normalized or len(normalized.split()) > MAX_HEADING_WORDS or len(line) > 60:
+        return None
+    if normalized in HEADING_LOOKUP:
+        return HEADING_LOOKUP[normalized]
+    # "Achievements and Publications", "Skills & Interests", ...
+    for heading, section in HEADING_LOOKUP.items():
+        if normalized.startswith(heading + " "):
+            return section
+    return None
+
+
+def _layout_headings(lines):
+    """Mark heading lines using font hints: known headings, plus larger-than-body lines as unknown sections"""
+    weights = Counter()
+    for line in lines:
+        weights[round(line["size"], 1)] += len(line["text"])
+    body_size = weights.most_common(1)[0][0] if weights else 0
+
+    marked = []
+    for line in lines:
+        section = match_section_heading(line["text"])
+        is_large = body_size and line["size"] >= body_size * 1.15
+        if section is None and is_large and len(line["text"].split()) <= MAX_HEADING_WORDS and not re.search(r"[\d@|]", line["text"]):
+            section = "other"
+        marked.append((line["text"], section))
+    return marked
+
+
+def _find_gutter(lines):
+    """Return (gutter x, blocked) for the best vertical split of a page's lines into two columns
+
+    The gutter is the left edge of a line such that each side holds at least
+    COLUMN_MIN_TEXT_SHARE of the characters or a section heading (a sidebar);
+    the widest gap wins, then the most balanced split. Lines
+    crossing it above or below the columns (a full-width name or footer) are
+    fine; ``blocked`` counts those crossing it between the columns' top and
+    bottom. Returns (None, 0) when no split has enough text on both sides.
+    """
+    total = sum(len(line["text"]) for line in lines)
+    best = None
+    for gutter in sorted({line["x0"] for line in lines}):
+        left = [line for line in lines if line["x1"] <= gutter + COLUMN_GUTTER_TOLERANCE]
+        right = [line for line in lines if line["x0"] >= gutter - COLUMN_GUTTER_TOLERANCE]
+        left_chars = sum(len(line["text"]) for line in left)
+        right_chars = sum(len(line["text"]) for line in right)
+        if not all(
+            chars >= total * COLUMN_MIN_TEXT_SHARE or any(match_section_heading(line["text"]) for line in side)
+            for side, chars in ((left, left_chars), (right, right_chars))
+        ) or not left or not right:
+            continue
+        columns = left + right
+        top = max(line["top"] for line in columns)
+        bottom = min(line["top"] for line in columns)
+        blocked = sum(
+            1 for line in lines
+            if line["x0"] < gutter - COLUMN_GUTTER_TOLERANCE < gutter + COLUMN_GUTTER_TOLERANCE < line["x1"]
+            and bottom <= line["top"] <= top
+        )
+        gap = gutter - max(line["x1"] for line in left)
+        score = (blocked, -round(gap), -min(left_chars, right_chars))
+        if best is None or score < best[0]:
+            best = (score, gutter)
+    if best is None:
+        return None, 0
+    return best[1], best[0][0]
+
+
+def _reading_order(lines):
+    """Order one page's lines for reading: full-width lines above the columns, each column, then the rest
+
+    Returns (ordered lines, columns, blocked) where ``columns`` is how many
+    columns were found and ``blocked`` counts lines that cross the gutter in
+    the middle of the page, which means the columns could not be told apart.
+    """
+    def top_down(group):
+        return sorted(group, key=lambda line: (-round(line["top"]), line["x0"]))
+
+    gutter, blocked = _find_gutter(lines) if len(lines) > 1 else (None, 0)
+    if gutter is None:
+        return top_down(lines), 1, 0
+    if blocked:
+        return top_down(lines), 2, blocked
+
+    left = [line for line in lines if line["x1"] <= gutter + COLUMN_GUTTER_TOLERANCE]
+    right = [line for line in lines if line["x0"] >= gutter - COLUMN_GUTTER_TOLERANCE and line not in left]
+    columns_top = max(line["top"] for line in left + right)
+    spanning = [line for line in lines if line not in left and line not in right]
+    above = [line for line in spanning if line["top"] > columns_top]
+    below = [line for line in spanning if line["top"] <= columns_top]
+    return top_down(above) + top_down(left) + top_down(right) + top_down(below), 2, 0
+
+
+def _segmentation_confidence(header, sections, headings, blocked_pages):
+    """Score how consistent a split is, in [0, 1]
+
+    No headings, or a multi-column page whose columns could not be told apart,
+    gives 0 so every prompt gets the full text. A section introduced by more
+    than one heading (columns read out of order, or a heading word inside the
+    text) halves the score, and text left before the first heading (headings
+    that were missed) lowers it in proportion.
+    """
+    if not headings or blocked_pages:
+        return 0.0
+    known = [heading["section"] for heading in headings if heading["section"] != "other"]
+    confidence = 1.0
+    if len(known) != len(set(known)):
+        confidence *= 0.5
+    header_chars = len(header)
+    total_chars = header_chars + sum(len(segment) for segment in sections.values())
+    if total_chars and header_chars > total_chars * 0.3:
+        confidence *= 1 - header_chars / total_chars
+    return round(confidence, 2)
+
+
+def segment_resume_text(text, layout_lines=None):
+    """Split resume text into per-section segments by detecting headings
+
+    Plain text is scanned line by line for known headings (Education,
+    Experience, Projects, Skills, Awards and their usual synonyms). When PDF
+    layout lines are given (see extract_text_and_layout_from_pdf) each page is
+    split into columns at its gutter and read column by column, top to bottom,
+    so side columns such as dates land under the heading they sit next to and
+    two-column templates are not interleaved; oversized unknown headings
+    ("Publications", "Volunteering") close the previous section.
+
+    Returns a dict with the contact "header" (text before the first heading),
+    "sections" mapping section names to their text, the detected "headings",
+    the "columns" of the widest page and a "confidence" in [0, 1] of how
+    consistent the split is (see _segmentation_confidence).
+    """
+    columns = 1
+    blocked_pages = 0
+    if layout_lines:
+        ordered = []
+        for page in sorted({line["page"] for line in layout_lines}):
+            page_lines = [dict(line, x1=line.get("x1", line["x0"])) for line in layout_lines if line["page"] == page]
+            page_order, page_columns, blocked = _reading_order(page_lines)
+            ordered += page_order
+            columns = max(columns, page_columns)
+            blocked_pages += bool(blocked)
+        marked = _layout_headings(ordered)
+    else:
+        marked = [(line.strip(), match_section_heading(line)) for line in (text or "").splitlines()]
+
+    header = []
+    sections = {}
+    headings = []
+    current = None
+    for line, section in marked:
+        # A large line above the first known heading is the candidate's name
+        if section == "other" and current is None:
+            section = None
+        if section is not None:
+            current = section
+            headings.append({"text": line, "section": section})
+            continue
+        if current is None:
+            header.append(line)
+        elif current != "other":
+            sections.setdefault(current, []).append(line)
+
+    sections = {section: compact_text("\n".join(lines))[0] for section, lines in sections.items()}
+    sections = {section: segment for section, segment in sections.items() if segment}
+    header = compact_text("\n".join(header))[0]
+    return {
+        "header": header,
+        "sections": sections,
+        "headings": headings,
+        "columns": columns,
+        "confidence": _segmentation_confidence(header, sections, headings, blocked_pages),
+    }
+
+
+EMAIL_PATTERN = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+PHONE_PATTERN = re.compile(r"(?<![\w/])\+?\(?\d[\d ().-]{7,}\d(?![\w/])")
+URL_PATTERN = re.compile(
+    r"(?:https?://)?(?:www\.)?[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.(?:com|io|dev|me|org|net|ai|co|edu|app|page|site|info|tech)(?:/[^\s|,;]*)?",
+    re.IGNORECASE,
+)
+ADDRESS_PATTERN = re.compile(r"^[A-Z][A-Za-z.' -]+,\s*(?:[A-Z]{2}|[A-Z][A-Za-z.' -]+)(?:\s+\d{5}(?:-\d{4})?)?(?:,\s*[A-Z][A-Za-z.' -]+)?$")
+NAME_WORD_PATTERN = re.compile(r"^[A-Z][A-Za-z'’.-]*$")
+YEAR_RANGE_PATTERN = re.compile(r"\b(?:19|20)\d{2}\s*[-–]\s*(?:(?:19|20)\d{2}|present|now)\b", re.IGNORECASE)
+
+# Words of document titles and job titles; a header line holding one is not a name
+NOT_NAME_WORDS = {
+    "cv", "resume", "résumé", "curriculum", "vitae", "profile", "contact", "summary", "objective", "portfolio",
+    "engineer", "engineering", "developer", "manager", "director", "analyst", "scientist", "designer",
+    "consultant", "architect", "specialist", "administrator", "coordinator", "assistant", "associate",
+    "intern", "officer", "lead", "senior", "junior", "principal", "staff", "head", "chief", "president",
+    "software", "data", "product", "project", "technical", "full", "stack", "frontend", "backend",
+    "student", "graduate", "researcher", "professor", "teacher", "nurse", "accountant",
+}
+
+# Contact details are read from the top of the resume only, so references and
+# publications further down do not leak other people's emails and numbers
+CONTACT_SEARCH_CHARS = 1000
+CONTACT_NAME_LINES = 8
+
+# Weight of each basics field in the extraction confidence
+CONTACT_FIELD_WEIGHTS = {
+    "name": 0.35,
+    "email": 0.3,
+    "phone": 0.2,
+    "website": 0.1,
+    "address": 0.05,
+}
+
+# Weight of a name that is neither the first header line nor part of the
+# email address: too weak on its own to skip the basics LLM call
+CONTACT_UNCONFIRMED_NAME_WEIGHT = 0.1
+
+
+def _find_contact_name(lines):
+    """Return (name, line index) of the first header line that reads as a person's name"""
+    for index, line in enumerate(lines[:CONTACT_NAME_LINES]):
+        words = line.split()
+        if not 2 <= len(words) <= 4 or len(line) > 40:
+            continue
+        if re.search(r"[\d@|:/]", line):
+            continue
+        if any(word.lower().strip(".,") in NOT_NAME_WORDS for word in words):
+            continue
+        if all(NAME_WORD_PATTERN.match(word) for word in words):
+            # All-caps names are common in headers
+            return " ".join(word.capitalize() if word.isupper() and len(word) > 2 else word for word in words), index
+    return "", None
+
+
+def _is_confirmed_name(name, index, email):
+    """Check a name against its position (first header line) or the email's local part"""
+    if index == 0:
+        return True
+    local_part = email.split("@")[0].lower() if email else ""
+    return any(len(word) >= 3 and word.lower().strip(".'’") in local_part for word in name.split())
+
+
+def _looks_like_phone(candidate):
+    """Tell phone numbers from date runs such as "2019 - 2023 0100" that the phone pattern also matches"""
+    groups = re.findall(r"\d+", candidate)
+    if not 10 <= len("".join(groups)) <= 15:
+        return False
+    if YEAR_RANGE_PATTERN.search(candidate):
+        return False
+    years = sum(1 for group in groups if len(group) == 4 and group[:2] in ("19", "20"))
+    return years < 2
+
+
+def _find_contact_phone(text):
+    for match in PHONE_PATTERN.finditer(text):
+        if _looks_like_phone(match.group()):
+            return match.group().strip()
+    return ""
+
+
+def _find_contact_website(text, email):
+    email_domain = email.split("@")[-1].lower() if email else None
+    for match in URL_PATTERN.finditer(text):
+        url = match.group().rstrip(".")
+        start = match.start()
+        # Skip the domain part of an email address
+        if start > 0 and text[start - 1] == "@":
+            continue
+        if email_domain and url.lower() == email_domain:
+            continue
+        return url
+    return ""
+
+
+def _find_contact_address(lines):
+    for line in lines[:CONTACT_NAME_LINES]:
+        for part in re.split(r"\s*[|•·]\s*", line):
+            part = part.strip()
+            if ADDRESS_PATTERN.match(part) and not EMAIL_PATTERN.search(part):
+                return part
+    return ""
+
+
+def extract_contact_info(text):
+    """Pull the basics section (name, email, phone, website, address) out of resume text with regexes
+
+    Only the first CONTACT_SEARCH_CHARS characters are searched, and the name
+    and address only above the first section heading. Returns
+    (basics, confidence) where basics has the keys of the Basics schema (empty
+    strings for fields not found) and confidence in [0, 1] is the summed
+    CONTACT_FIELD_WEIGHTS of the fields that were found; a name counts fully
+    only when it is the first header line or appears in the email address.
+    """
+    head = (text or "")[:CONTACT_SEARCH_CHARS]
+    lines = []
+    for line in head.splitlines():
+        line = line.strip()
+        if match_section_heading(line):
+            # Name and address are looked for in the header only
+            break
+        if line:
+            lines.append(line)
+
+    email_match = EMAIL_PATTERN.search(head)
+    email = email_match.group() if email_match else ""
+    name, name_index = _find_contact_name(lines)
+    basics = {
+        "name": name,
+        "email": email,
+        "phone": _find_contact_phone(head),
+        "website": _find_contact_website(head, email),
+        "address": _find_contact_address(lines),
+    }
+    weights = dict(CONTACT_FIELD_WEIGHTS)
+    if name and not _is_confirmed_name(name, name_index, email):
+        weights["name"] = CONTACT_UNCONFIRMED_NAME_WEIGHT
+    confidence = sum(weight for field, weight in weights.items() if basics[field])
+    return basics, round(confidence, 2)
+
+
+def normalize_job_description(job_description):
+    """Collapse whitespace so re-submitted copies of a job description compare equal"""
+    return " ".join((job_description or "").split())
+
+
 def escape_for_latex(data):
     if isinstance(data, dict):
         new_data = {}
@@ -0,0 +1,760 @@
+from collections import OrderedDict, defaultdict
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+# English function words plus job-posting boilerplate that says nothing about fit
+STOPWORDS = (
+    "a", "about", "above", "after", "all", "also", "am", "an", "and", "any", "are", "as", "at", "be", "been",
+    "being", "both", "but", "by", "can", "could", "did", "do", "does", "each", "etc", "for", "from", "had",
+    "has", "have", "he", "her", "his", "how", "i", "if", "in", "into", "is", "it", "its", "just", "may",
+    "me", "more", "most", "must", "my", "no", "not", "of", "on", "one", "or", "other", "our", "ours", "out",
+    "over", "own", "per", "plus", "same", "she", "should", "so", "some", "such", "than", "that", "the",
+    "their", "them", "then", "there", "these", "they", "this", "those", "through", "to", "too", "under",
+    "up", "us", "very", "was", "we", "were", "what", "when", "where", "which", "while", "who", "whom",
+    "why", "will", "with", "within", "would", "you", "your", "yours",
+    "ability", "able", "applicant", "applicants", "apply", "candidate", "candidates", "company", "environment",
+    "excellent", "experience", "experienced", "great", "good", "ideal", "including", "job", "join", "looking",
+    "position", "preferred", "required", "requirements", "responsibilities", "responsible", "role", "skills",
+    "strong", "team", "teams", "work", "working", "year", "years",
+)
+
+# Resume fields that hold contact details or links rather than content to match
+RESUME_SKIPPED_FIELDS = ("email", "phone", "url", "website", "linkedin", "github", "location", "address")
+
+# Bytes terms are made of: ASCII letters and digits, "+" and "#" (c++, c#) and
+# any non-ASCII UTF-8 byte. Joiners are kept inside a term when a term byte
+# follows them (node.js, ci/cd, full-stack) and dropped otherwise ("python.").
+TERM_BYTES = np.zeros(256, dtype=bool)
+for _byte in b"abcdefghijklmnopqrstuvwxyz0123456789+#":
+    TERM_BYTES[_byte] = True
+TERM_BYTES[128:] = True
+JOINER_BYTES = np.zeros(256, dtype=bool)
+for _byte in b"./-":
+    JOINER_BYTES[_byte] = True
+
+# Longer runs of term bytes (URLs, base64, hashes) are not terms
+MAX_TERM_BYTES = 64
+
+# Terms are identified by a 64-bit polynomial hash of their bytes
+HASH_MULTIPLIER = np.uint64(0x100000001B3)
+HASH_POWERS = np.cumprod(np.full(MAX_TERM_BYTES, HASH_MULTIPLIER, dtype=np.uint64), dtype=np.uint64)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Below this many documents document frequencies say nothing, so every term weighs the same
+IDF_MIN_DOCUMENTS = 5
+
+# How similarity and keyword coverage (both 0-1) make up the 0-100 match score
+MATCH_SCORE_WEIGHTS = {"similarity": 0.4, "coverage": 0.6}
+
+# Present / missing keywords reported by match_score
+MATCH_KEYWORDS = 15
+
+# Scores rank_job_descriptions can order postings by
+RANKING_SCORES = ("score", "bm25", "similarity", "coverage")
+
+# Term matrices kept so the same postings can be ranked for many resumes
+RANK_MATRIX_CACHE_ENTRIES = int(os.environ.get("RANK_MATRIX_CACHE_ENTRIES", 4))
+
+# Resume fields the stored-resume index searches, by section
+RESUME_INDEX_FIELDS = {
+    "skills": ("name", "keywords"),
+    "work": ("position", "highlights"),
+    "education": ("area", "additionalAreas", "studyType", "institution"),
+}
+
+# The index snapshot is rewritten, and its update log emptied, after this many updates
+RESUME_INDEX_COMPACT_EVERY = int(os.environ.get("RESUME_INDEX_COMPACT_EVERY", 500))
+
+# Near-duplicate postings: MinHash signatures of consecutive-term shingles,
+# bucketed by LSH bands of POSTING_MINHASH_PERMUTATIONS / POSTING_LSH_BANDS
+# rows. With 16 bands of 4 rows, postings 50% similar are candidates half of
+# the time and 85% similar ones almost always.
+POSTING_SHINGLE_TERMS = 3
+POSTING_MINHASH_PERMUTATIONS = 64
+POSTING_LSH_BANDS = 16
+
+# Postings with fewer shingles than this are too short to compare reliably
+POSTING_MIN_SHINGLES = 8
+
+# Estimated Jaccard similarity above which a posting counts as a repost of an earlier one
+POSTING_DUPLICATE_THRESHOLD = float(os.environ.get("POSTING_DUPLICATE_THRESHOLD", 0.85))
+
+# Distinct postings remembered by the near-duplicate index
+POSTING_INDEX_ENTRIES = int(os.environ.get("POSTING_INDEX_ENTRIES", 10000))
+
+# Fixed seeds, so signatures are comparable across processes and restarts
+_minhash_seeds = np.random.default_rng(0x4D696E48).integers(
+    0, np.iinfo(np.uint64).max, size=(2, POSTING_MINHASH_PERMUTATIONS), dtype=np.uint64, endpoint=True
+)
+MINHASH_MULTIPLIERS = _minhash_seeds[0] | np.uint64(1)
+MINHASH_OFFSETS = _minhash_seeds[1]
+
+DIGIT_BYTES = np.zeros(256, dtype=bool)
+for _byte in b"0123456789":
+    DIGIT_BYTES[_byte] = True
+
+# Numbers in a posting that reposts change without changing the job: links,
+# dates, years and requisition or tracking ids. Every other number (years of
+# experience, salary, hours) has to be the same for postings to be duplicates.
+_MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+POSTING_NOISE_PATTERN = re.compile(
+    r"https?://\S+|www\.\S+"
+    r"|\b\d{4}-\d{1,2}-\d{1,2}\b|\b\d{1,2}[/.]\d{1,2}[/.]\d{2,4}\b"
+    rf"|\b{_MONTH}\s+\d{{1,2}}(?:st|nd|rd|th)?(?:,?\s+\d{{4}})?\b"
+    rf"|\b\d{{1,2}}(?:st|nd|rd|th)?\s+{_MONTH}(?:,?\s+\d{{4}})?\b"
+    r"|\b(?:19|20)\d{2}\b"
+    r"|\b[a-z]*[-_#]?\d{5,}[a-z0-9]*\b"
+)
+POSTING_NUMBER_PATTERN = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def scan_terms(data):
+    """Find the terms in lowercased UTF-8 bytes without a Python loop
+
+    Returns (hashes, starts, ends): one uint64 hash and byte span per term
+    occurrence, in order.
+    """
+    chars = np.frombuffer(data, dtype=np.uint8)
+    if not chars.size:
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    term_bytes = TERM_BYTES[chars]
+    in_term = term_bytes.copy()
+    in_term[:-1] |= JOINER_BYTES[chars[:-1]] & term_bytes[1:]
+
+    edges = np.diff(np.concatenate(([False], in_term, [False])).astype(np.int8))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if not starts.size:
+        return np.zeros(0, dtype=np.uint64), starts, ends
+    lengths = ends - starts
+
+    # hash = mix(sum(byte_i * M^(i+1)) + length), summed per term with reduceat
+    positions = np.flatnonzero(in_term)
+    offsets = positions - np.repeat(starts, lengths)
+    np.minimum(offsets, MAX_TERM_BYTES - 1, out=offsets)
+    values = chars[positions].astype(np.uint64) * HASH_POWERS[offsets]
+    hashes = mix_hashes(np.add.reduceat(values, np.cumsum(lengths) - lengths) + lengths.astype(np.uint64))
+    kept = lengths <= MAX_TERM_BYTES
+    return hashes[kept], starts[kept], ends[kept]
+
+
+def mix_hashes(hashes):
+    """Spread every input bit over the whole hash (MurmurHash3's 64-bit finalizer), in place"""
+    hashes ^= hashes >> np.uint64(33)
+    hashes *= np.uint64(0xFF51AFD7ED558CCD)
+    hashes ^= hashes >> np.uint64(33)
+    hashes *= np.uint64(0xC4CEB9FE1A85EC53)
+    hashes ^= hashes >> np.uint64(33)
+    return hashes
+
+
+def lookup_terms(vocabulary, hashes):
+    """Return the index of each hash in the sorted vocabulary (all must be present)
+
+    Goes through a direct-address table on the hashes' top bits, about 16
+    slots per term; only hashes whose slot is shared fall back to a binary
+    search. Much faster than searching millions of hashes in the vocabulary.
+    """
+    bits = min(max(len(vocabulary) * 16, 2).bit_length(), 26)
+    shift = np.uint64(64 - bits)
+    table = np.zeros(1 << bits, dtype=np.int64)
+    table[(vocabulary >> shift).astype(np.int64)] = np.arange(len(vocabulary))
+    term_ids = table[(hashes >> shift).astype(np.int64)]
+    missed = vocabulary[term_ids] != hashes
+    term_ids[missed] = np.searchsorted(vocabulary, hashes[missed])
+    return term_ids
+
+
+def term_hashes(text):
+    """Return the hashes of a text's terms, stopwords included"""
+    return scan_terms((text or "").lower().encode("utf-8"))[0]
+
+
+STOPWORD_HASHES = np.unique(term_hashes(" ".join(STOPWORDS)))
+
+
+def tokenize(text):
+    """Lowercase text and split it into matching terms, dropping stopwords"""
+    data = (text or "").lower().encode("utf-8")
+    hashes, starts, ends = scan_terms(data)
+    kept = ~np.isin(hashes, STOPWORD_HASHES)
+    return [data[start:end].decode("utf-8", "replace") for start, end in zip(starts[kept], ends[kept])]
+
+
+def resume_to_text(resume_json):
+    """Flatten the content of a JSON resume into one string, skipping contact details"""
+    parts = []
+
+    def collect(value):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if key not in RESUME_SKIPPED_FIELDS:
+                    collect(item)
+        elif isinstance(value, list):
+            for item in value:
+                collect(item)
+        elif isinstance(value, str):
+            parts.append(value)
+
+    collect(resume_json)
+    return "\n".join(parts)
+
+
+def bm25_idf(document_frequency, documents):
+    """BM25 inverse document frequency, kept positive for terms in most documents"""
+    return np.log1p((documents - document_frequency + 0.5) / (document_frequency + 0.5))
+
+
+class TermMatrix:
+    """Sparse (CSR) term-count matrix over a set of documents with a shared vocabulary
+
+    Row d holds the counts of document d's terms: its term ids are
+    ``indices[indptr[d]:indptr[d + 1]]`` and their counts the same slice of
+    ``counts``. Term ids index ``vocabulary``, the sorted term hashes;
+    stopwords are part of it but never counted. All documents are scanned
+    in one pass over their joined bytes.
+    """
+
+    def __init__(self, texts):
+        encoded = [(text or "").lower().encode("utf-8") for text in texts]
+        self.documents = len(encoded)
+        # Documents are joined with a newline, which no term crosses
+        self.data = b"\n".join(encoded)
+        document_starts = np.cumsum([0] + [len(document) + 1 for document in encoded[:-1]], dtype=np.int64)
+
+        hashes, starts, ends = scan_terms(self.data)
+        terms_per_document = np.diff(np.append(np.searchsorted(starts, document_starts), starts.size))
+        document_ids = np.repeat(np.arange(self.documents, dtype=np.int64), terms_per_document)
+
+        # A plain sort and a search in the (small) vocabulary beat np.unique's argsort
+        ordered = np.sort(hashes)
+        self.vocabulary = ordered[np.concatenate(([True], ordered[1:] != ordered[:-1]))] if ordered.size else ordered
+        term_ids = lookup_terms(self.vocabulary, hashes)
+        first = np.full(len(self.vocabulary), hashes.size, dtype=np.int64)
+        np.minimum.at(first, term_ids, np.arange(hashes.size))
+        self.term_spans = (starts[first], ends[first])
+        size = max(len(self.vocabulary), 1)
+
+        kept = ~np.isin(self.vocabulary, STOPWORD_HASHES)[term_ids]
+        codes, counts = np.unique(document_ids[kept] * size + term_ids[kept], return_counts=True)
+        self.rows = codes // size
+        self.indices = codes % size
+        self.counts = counts.astype(np.float64)
+        self.indptr = np.zeros(self.documents + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.rows, minlength=self.documents), out=self.indptr[1:])
+        self.lengths = np.bincount(self.rows, weights=self.counts, minlength=self.documents)
+
+        self.document_frequency = np.bincount(self.indices, minlength=len(self.vocabulary))
+        if self.documents >= IDF_MIN_DOCUMENTS:
+            self.idf = bm25_idf(self.document_frequency, self.documents)
+            self.unseen_idf = float(bm25_idf(0, self.documents))
+        else:
+            self.idf = np.ones(len(self.vocabulary))
+            self.unseen_idf = 1.0
+
+        # Per-document parts of the scores that do not depend on the query
+        idf = self.idf[self.indices]
+        self.tfidf = (1 + np.log(self.counts)) * idf
+        self.tfidf_norms = np.sqrt(np.bincount(self.rows, weights=self.tfidf ** 2, minlength=self.documents))
+        self.idf_mass = np.bincount(self.rows, weights=idf, minlength=self.documents)
+        average_length = self.lengths.mean() if self.documents and self.lengths.mean() > 0 else 1.0
+        saturation = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[self.rows] / average_length)
+        self.bm25_terms = idf * self.counts * (BM25_K1 + 1) / (self.counts + saturation)
+
+    @property
+    def vocabulary_size(self):
+        """Number of distinct terms counted in the documents"""
+        return int(np.count_nonzero(self.document_frequency))
+
+    def term(self, term_id):
+        """Return the text of a term"""
+        start, end = self.term_spans[0][term_id], self.term_spans[1][term_id]
+        return self.data[start:end].decode("utf-8", "replace")
+
+    def query_weights(self, text, binary=False):
+        """Return (weights over the vocabulary, norm) of a query's log-scaled tf-idf vector
+
+        With ``binary`` every query term counts once. The norm also counts
+        query terms that appear in no document.
+        """
+        hashes, counts = np.unique(term_hashes(text), return_counts=True)
+        kept = ~np.isin(hashes, STOPWORD_HASHES)
+        hashes, counts = hashes[kept], (np.ones(kept.sum()) if binary else counts[kept].astype(np.float64))
+        term_ids = np.searchsorted(self.vocabulary, hashes)
+        found = term_ids < len(self.vocabulary)
+        found[found] = self.vocabulary[term_ids[found]] == hashes[found]
+
+        term_weights = 1 + np.log(counts)
+        weights = np.zeros(len(self.vocabulary))
+        weights[term_ids[found]] = term_weights[found] * self.idf[term_ids[found]]
+        unseen_norm = float(np.sum((term_weights[~found] * self.unseen_idf) ** 2))
+        return weights, float(np.sqrt(np.dot(weights, weights) + unseen_norm))
+
+    def score(self, text, binary=False):
+        """Score every document against a query text in one vectorized pass
+
+        Returns a dict of per-document arrays: ``bm25`` (the query's terms
+        found in the document), ``similarity`` (tf-idf cosine, 0-1),
+        ``coverage`` (share of the document's idf-weighted terms the query
+        contains, 0-1) and ``score`` (0-100, see MATCH_SCORE_WEIGHTS).
+        """
+        weights, query_norm = self.query_weights(text, binary)
+        matched = weights[self.indices] > 0
+        bm25 = np.bincount(self.rows, weights=self.bm25_terms * matched, minlength=self.documents)
+        dot = np.bincount(self.rows, weights=self.tfidf * weights[self.indices], minlength=self.documents)
+        covered = np.bincount(self.rows, weights=self.idf[self.indices] * matched, minlength=self.documents)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            similarity = np.where(self.tfidf_norms > 0, dot / (self.tfidf_norms * (query_norm or 1.0)), 0.0)
+            coverage = np.where(self.idf_mass > 0, covered / self.idf_mass, 0.0)
+        score = 100 * (
+            MATCH_SCORE_WEIGHTS["similarity"] * similarity + MATCH_SCORE_WEIGHTS["coverage"] * coverage
+        )
+        return {"bm25": bm25, "similarity": similarity, "coverage": coverage, "score": score}
+
+    def top(self, text, top_k, rank_by="score", binary=False):
+        """Return (document indices, scores) of the top_k documents for a query, best first"""
+        scores = self.score(text, binary)
+        ranking = scores[rank_by]
+        top_k = max(0, min(top_k, self.documents))
+        if 0 < top_k < self.documents:
+            candidates = np.argpartition(-ranking, top_k - 1)[:top_k]
+        else:
+            candidates = np.arange(top_k)
+        order = candidates[np.lexsort((candidates, -ranking[candidates]))]
+        return order, scores
+
+    def document_terms(self, document):
+        """Return (term id, count) pairs of one document, most frequent first, then in text order"""
+        start, end = self.indptr[document], self.indptr[document + 1]
+        term_ids = self.indices[start:end]
+        counts = self.counts[start:end]
+        order = np.lexsort((self.term_spans[0][term_ids], -counts))
+        return [(int(term_ids[i]), int(counts[i])) for i in order]
+
+
+def match_score(resume_json, job_description, keywords=MATCH_KEYWORDS):
+    """Score a JSON resume against one job description without an LLM
+
+    Deterministic and takes milliseconds. match_score and
+    keyword_density_score are on the same 0-100 scale as the LLM analysis of
+    /api/ai-enhance; keywords are the job description's most frequent terms.
+    """
+    resume_text = resume_to_text(resume_json)
+    matrix = TermMatrix([job_description])
+    scores = matrix.score(resume_text, binary=True)
+    in_resume = matrix.query_weights(resume_text, binary=True)[0] > 0
+    job_terms = [term_id for term_id, _ in matrix.document_terms(0)]
+    return {
+        "match_score": int(round(float(scores["score"][0]))),
+        "keyword_density_score": int(round(100 * float(scores["coverage"][0]))),
+        "similarity": round(float(scores["similarity"][0]), 4),
+        "coverage": round(float(scores["coverage"][0]), 4),
+        "bm25": round(float(scores["bm25"][0]), 4),
+        "present_keywords": [matrix.term(term_id) for term_id in job_terms if in_resume[term_id]][:keywords],
+        "missing_keywords": [matrix.term(term_id) for term_id in job_terms if not in_resume[term_id]][:keywords],
+    }
+
+
+def postings_key(job_descriptions):
+    """Return a digest identifying a list of job descriptions (order matters)"""
+    digest = hashlib.sha256()
+    for job_description in job_descriptions:
+        encoded = (job_description or "").encode("utf-8")
+        digest.update(len(encoded).to_bytes(8, "little"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+class MatrixCache:
+    """Small LRU of built TermMatrix objects (with their posting ids) by postings_key"""
+
+    def __init__(self, max_entries=RANK_MATRIX_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, matrix, ids=None):
+        with self._lock:
+            self._entries[key] = (matrix, ids)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+matrix_cache = MatrixCache()
+
+
+def rank_job_descriptions(resume_json, job_descriptions=None, top_k=10, rank_by="score", ids=None, key=None):
+    """Rank many job descriptions for one JSON resume in a single vectorized pass
+
+    The term matrix of the postings is built once and cached under
+    postings_key(job_descriptions); later calls can pass that ``key``
+    instead of the job descriptions. Returns (ranking, stats): ranking holds
+    the top_k postings as {"index", "id", "score", "similarity", "coverage",
+    "bm25"}, best first (ties keep input order); stats reports the time
+    spent building the matrix and scoring. Building dominates (about 15 MB
+    of posting text per second); scoring a cached matrix is roughly ten
+    times faster. Raises ValueError for an unknown rank_by and KeyError for
+    a key that is no longer cached.
+    """
+    if rank_by not in RANKING_SCORES:
+        raise ValueError(f"Invalid rank_by '{rank_by}'. Available scores: {list(RANKING_SCORES)}")
+
+    started = time.perf_counter()
+    if job_descriptions is not None:
+        key = postings_key(job_descriptions)
+    entry = matrix_cache.get(key)
+    if entry is None:
+        if job_descriptions is None:
+            raise KeyError(f"Postings '{key}' are no longer cached; send the job descriptions again")
+        entry = (TermMatrix(job_descriptions), ids)
+        matrix_cache.put(key, *entry)
+        cached = False
+    else:
+        cached = True
+    matrix, cached_ids = entry
+    ids = cached_ids if ids is None else ids
+    built = time.perf_counter()
+    order, scores = matrix.top(resume_to_text(resume_json), top_k, rank_by, binary=True)
+    finished = time.perf_counter()
+
+    ranking = [
+        {
+            "index": int(index),
+            "id": ids[index] if ids is not None else int(index),
+            "score": round(float(scores["score"][index]), 2),
+            "similarity": round(float(scores["similarity"][index]), 4),
+            "coverage": round(float(scores["coverage"][index]), 4),
+            "bm25": round(float(scores["bm25"][index]), 4),
+        }
+        for index in order
+    ]
+    elapsed = finished - started
+    stats = {
+        "postings": matrix.documents,
+        "postings_key": key,
+        "matrix_cached": cached,
+        "vocabulary_size": matrix.vocabulary_size,
+        "matrix_nonzeros": int(matrix.indices.size),
+        "build_ms": round((built - started) * 1000, 3),
+        "score_ms": round((finished - built) * 1000, 3),
+        "elapsed_ms": round(elapsed * 1000, 3),
+        "postings_per_second": round(matrix.documents / elapsed) if elapsed > 0 else None,
+    }
+    return ranking, stats
+
+
+def resume_index_text(resume_json):
+    """Return the text of the RESUME_INDEX_FIELDS of a JSON resume"""
+    parts = []
+    for section, fields in RESUME_INDEX_FIELDS.items():
+        items = (resume_json or {}).get(section) or []
+        for item in items if isinstance(items, list) else [items]:
+            if isinstance(item, dict):
+                parts.extend(resume_to_text(item.get(field)) for field in fields)
+    return "\n".join(part for part in parts if part)
+
+
+class ResumeIndex:
+    """Inverted index over stored resumes' skills, work and education, persisted to a directory
+
+    On disk the index is a snapshot of every resume's term counts plus an
+    append-only log of the updates made since; loading replays the log onto
+    the snapshot, and every ``compact_every`` updates the snapshot is
+    rewritten. ``bootstrap`` is called once, when neither file exists yet,
+    and yields (file_id, resume_json) pairs to index. Searching only uses
+    the in-memory postings, never the resume files.
+    """
+
+    SNAPSHOT_FILE = "resume_index.json"
+    LOG_FILE = "resume_index.log"
+
+    def __init__(self, directory, compact_every=RESUME_INDEX_COMPACT_EVERY, bootstrap=None):
+        self.directory = directory
+        self.compact_every = compact_every
+        self.bootstrap = bootstrap
+        self._lock = threading.RLock()
+        self._loaded = False
+        self.documents = {}
+        self.postings = defaultdict(dict)
+        self.lengths = {}
+        self._logged = 0
+
+    @property
+    def snapshot_path(self):
+        return os.path.join(self.directory, self.SNAPSHOT_FILE)
+
+    @property
+    def log_path(self):
+        return os.path.join(self.directory, self.LOG_FILE)
+
+    def _apply(self, file_id, terms):
+        """Replace (or with terms=None, drop) one resume's postings in memory"""
+        for term in self.documents.pop(file_id, {}):
+            postings = self.postings[term]
+            postings.pop(file_id, None)
+            if not postings:
+                del self.postings[term]
+        self.lengths.pop(file_id, None)
+        if terms is not None:
+            self.documents[file_id] = terms
+            self.lengths[file_id] = sum(terms.values())
+            for term, count in terms.items():
+                self.postings[term][file_id] = count
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                for file_id, terms in json.load(f)["documents"].items():
+                    self._apply(file_id, terms)
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash while appending
+                        continue
+                    self._apply(entry["file_id"], entry["terms"])
+                    self._logged += 1
+        elif not os.path.exists(self.snapshot_path) and self.bootstrap is not None:
+            for file_id, resume_json in self.bootstrap():
+                self._apply(file_id, self.resume_terms(resume_json))
+            self._compact()
+        self._loaded = True
+
+    def _compact(self):
+        """Write the snapshot atomically and empty the update log"""
+        temp_path = self.snapshot_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"documents": self.documents}, f, ensure_ascii=False)
+        os.replace(temp_path, self.snapshot_path)
+        open(self.log_path, "w").close()
+        self._logged = 0
+
+    def _record(self, file_id, terms):
+        self._apply(file_id, terms)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"file_id": file_id, "terms": terms}, ensure_ascii=False) + "\n")
+        self._logged += 1
+        if self._logged >= self.compact_every:
+            self._compact()
+
+    @staticmethod
+    def resume_terms(resume_json):
+        counts = {}
+        for term in tokenize(resume_index_text(resume_json)):
+            counts[term] = counts.get(term, 0) + 1
+        return counts
+
+    def update(self, file_id, resume_json):
+        """Index (or re-index) one stored resume"""
+        terms = self.resume_terms(resume_json)
+        with self._lock:
+            self._ensure_loaded()
+            self._record(file_id, terms)
+
+    def remove(self, file_id):
+        """Drop one resume from the index"""
+        with self._lock:
+            self._ensure_loaded()
+            if file_id in self.documents:
+                self._record(file_id, None)
+
+    def search(self, text, top_k=10):
+        """Return the top_k resumes for a query as {"file_id", "score", "matched_terms"}, best first
+
+        Scores are BM25 over the indexed fields. Ties are ordered by file_id.
+        """
+        query = sorted(set(tokenize(text)))
+        with self._lock:
+            self._ensure_loaded()
+            documents = len(self.documents)
+            if not documents:
+                return []
+            average_length = (sum(self.lengths.values()) / documents) or 1.0
+            scores = defaultdict(float)
+            matched = defaultdict(list)
+            for term in query:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                if documents >= IDF_MIN_DOCUMENTS:
+                    idf = math.log1p((documents - len(postings) + 0.5) / (len(postings) + 0.5))
+                else:
+                    idf = 1.0
+                for file_id, count in postings.items():
+                    saturation = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[file_id] / average_length)
+                    scores[file_id] += idf * count * (BM25_K1 + 1) / (count + saturation)
+                    matched[file_id].append(term)
+        best = heapq.nsmallest(top_k, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [
+            {"file_id": file_id, "score": round(score, 4), "matched_terms": matched[file_id]}
+            for file_id, score in best
+        ]
+
+    def stats(self):
+        with self._lock:
+            self._ensure_loaded()
+            return {
+                "resumes": len(self.documents),
+                "terms": len(self.postings),
+                "pending_log_entries": self._logged,
+            }
+
+
+def posting_id(text):
+    """Return a short id for a posting, ignoring case and whitespace"""
+    return hashlib.sha256(" ".join((text or "").lower().split()).encode("utf-8")).hexdigest()[:16]
+
+
+def posting_numbers(text):
+    """Return the sorted numbers of a posting left once dates, years, links and ids are removed
+
+    "5+ years" and "10+ years", or two salaries, give different numbers, so
+    postings that only differ there are not duplicates.
+    """
+    cleaned = POSTING_NOISE_PATTERN.sub(" ", (text or "").lower())
+    return tuple(sorted(number.replace(",", "") for number in POSTING_NUMBER_PATTERN.findall(cleaned)))
+
+
+def posting_shingles(text):
+    """Return the unique hashes of a posting's runs of POSTING_SHINGLE_TERMS consecutive terms
+
+    Terms with digits are left out; posting_numbers compares those separately.
+    """
+    data = (text or "").lower().encode("utf-8")
+    hashes, starts, ends = scan_terms(data)
+    if hashes.size:
+        digits = np.concatenate(([0], np.cumsum(DIGIT_BYTES[np.frombuffer(data, dtype=np.uint8)])))
+        hashes = hashes[digits[ends] == digits[starts]]
+    if hashes.size < POSTING_SHINGLE_TERMS:
+        return np.unique(hashes)
+    count = hashes.size - POSTING_SHINGLE_TERMS + 1
+    shingles = hashes[:count].copy()
+    for offset in range(1, POSTING_SHINGLE_TERMS):
+        shingles = mix_hashes(shingles * HASH_MULTIPLIER + hashes[offset:offset + count])
+    return np.unique(shingles)
+
+
+def minhash_signature(shingles):
+    """Return the MinHash signature (POSTING_MINHASH_PERMUTATIONS uint64 minima) of a shingle set"""
+    permuted = shingles[np.newaxis, :] * MINHASH_MULTIPLIERS[:, np.newaxis] + MINHASH_OFFSETS[:, np.newaxis]
+    return mix_hashes(permuted).min(axis=1)
+
+
+class PostingIndex:
+    """Near-duplicate detection over the job postings seen so far (MinHash + LSH)
+
+    Each posting is summarized by the MinHash signature of its shingles (see
+    posting_shingles) and by its numbers (see posting_numbers), and filed
+    under each of its LSH bands. Postings sharing a band with a new one are
+    its candidates; those with the same numbers and an estimated similarity
+    at or above ``threshold`` are its near duplicates. Only ids are kept, not
+    posting text. Past ``max_entries`` the least recently seen postings are
+    dropped.
+    """
+
+    def __init__(self, threshold=POSTING_DUPLICATE_THRESHOLD, max_entries=POSTING_INDEX_ENTRIES, bands=POSTING_LSH_BANDS):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.bands = bands
+        self.postings = OrderedDict()  # posting id -> (signature, numbers)
+        self.buckets = defaultdict(set)  # (band, band hash) -> posting ids
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "matches": 0, "added": 0, "evictions": 0}
+
+    def _band_keys(self, signature):
+        return [(band, rows.tobytes()) for band, rows in enumerate(np.array_split(signature, self.bands))]
+
+    def _add(self, key, signature, numbers):
+        self.postings[key] = (signature, numbers)
+        for band_key in self._band_keys(signature):
+            self.buckets[band_key].add(key)
+        self._stats["added"] += 1
+        while len(self.postings) > self.max_entries:
+            old_key, (old_signature, _) = self.postings.popitem(last=False)
+            for band_key in self._band_keys(old_signature):
+                bucket = self.buckets[band_key]
+                bucket.discard(old_key)
+                if not bucket:
+                    del self.buckets[band_key]
+            self._stats["evictions"] += 1
+
+    def lookup(self, text, add=True):
+        """Return (posting id, duplicates): the earlier postings ``text`` nearly duplicates
+
+        duplicates is a list of (posting id, estimated similarity), most
+        similar first, never including the posting itself. The posting is
+        added to the index when ``add`` is set.
+        """
+        key = posting_id(text)
+        shingles = posting_shingles(text)
+        if shingles.size < POSTING_MIN_SHINGLES:
+            return key, []
+        signature = minhash_signature(shingles)
+        numbers = posting_numbers(text)
+
+        with self._lock:
+            self._stats["lookups"] += 1
+            candidates = set()
+            for band_key in self._band_keys(signature):
+                candidates.update(self.buckets.get(band_key, ()))
+            candidates.discard(key)
+
+            duplicates = []
+            for candidate in candidates:
+                candidate_signature, candidate_numbers = self.postings[candidate]
+                if candidate_numbers != numbers:
+                    continue
+                similarity = float(np.mean(candidate_signature == signature))
+                if similarity >= self.threshold:
+                    duplicates.append((candidate, round(similarity, 4)))
+            duplicates.sort(key=lambda item: (-item[1], item[0]))
+            if duplicates:
+                self._stats["matches"] += 1
+
+            if key in self.postings:
+                self.postings.move_to_end(key)
+            elif add:
+                self._add(key, signature, numbers)
+        return key, duplicates
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, postings=len(self.postings), buckets=len(self.buckets), threshold=self.threshold)
+        stats["match_rate"] = round(stats["matches"] / stats["lookups"], 4) if stats["lookups"] else 0.0
+        return stats
+
+
+posting_index = PostingIndex()
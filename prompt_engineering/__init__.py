@@ -1,5 +1,18 @@
-from openai import OpenAI
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import contextvars
 import json
+import time
+
+from doc_utils import extract_contact_info, normalize_job_description
+
+from .cache import make_cache_key, response_cache
+from .llm import achat_completion, chat_completion
+from .parsing import (
+    SchemaError, is_repaired, is_valid_section_answer, normalize_section, parse_section, parse_stats,
+    repair_json_text, schema_interface,
+)
+from .providers import resolve_model, supports_json_mode
 
 SYSTEM_PROMPT = "You are a smart assistant to career advisors at the Harvard Extension School. You will reply with JSON only."
 
@@ -27,12 +40,61 @@ Your task is to rewrite the given CV. Follow these guidelines:
 Improved CV:
 """
 
-BASICS_PROMPT = """
+# JSON-to-JSON tailoring prompts. Like SECTION_PREFIX, the job description
+# and guidelines come first so the per-section calls share a cacheable prefix.
+TAILORING_JSON_PREFIX = """
+You are going to tailor a JSON resume section for an applicant applying to the following job:
+<JOB_DESCRIPTION>
+
+Follow these guidelines:
+- Be truthful and objective to the experience listed in the resume; never invent employers, titles, dates, degrees or skills
+- Keep every item and every field; only reword, reorder and emphasize what is relevant to the job
+- Be specific rather than general
+- Rewrite highlight items using STAR methodology (but do not mention STAR explicitly)
+- Fix spelling and grammar errors
+- Write to express not impress
+- Articulate and don't be flowery
+- Prefer active voice over passive voice
+"""
+
+TAILORING_SECTION_PROMPT = TAILORING_JSON_PREFIX + """
+Now consider the following TypeScript Interface for the JSON schema:
+
+<SCHEMA>
+
+This is the current <SECTION_KEY> section:
+<SECTION_JSON>
+
+Write the tailored <SECTION_KEY> section according to the schema, as an object with a single "<SECTION_KEY>" key. On the response, include only the JSON.
+"""
+
+TAILORING_COMBINED_PROMPT = TAILORING_JSON_PREFIX + """
+Instead of a single section, tailor every section below at once.
+
+Now consider the following TypeScript Interfaces for the JSON schema:
+
+<SCHEMA>
+
+These are the current sections:
+<SECTION_JSON>
+
+Write the tailored sections according to the schema, as one object with the keys <SECTION_KEYS>. On the response, include only the JSON.
+"""
+
+JOB_DESCRIPTION_PLACEHOLDER = "<JOB_DESCRIPTION>"
+
+# Every extraction prompt starts with the same text up to and including the CV,
+# so provider-side prompt caching (OpenAI, DeepSeek) can reuse the prefix
+# across the section calls of one extraction. Section-specific instructions
+# must only ever be appended after it.
+SECTION_PREFIX = """
 You are going to write a JSON resume section for an applicant applying for job posts.
 
 Consider the following CV:
 <CV_TEXT>
+"""
 
+BASICS_PROMPT = SECTION_PREFIX + """
 Now consider the following TypeScript Interface for the JSON schema:
 
 interface Basics {
@@ -46,12 +108,7 @@ interface Basics {
 Write the basics section according to the Basic schema. On the response, include only the JSON.
 """
 
-EDUCATION_PROMPT = """
-You are going to write a JSON resume section for an applicant applying for job posts.
-
-Consider the following CV:
-<CV_TEXT>
-
+EDUCATION_PROMPT = SECTION_PREFIX + """
 Now consider the following TypeScript Interface for the JSON schema:
 
 interface EducationItem {
@@ -72,12 +129,7 @@ interface Education {
 Write the education section according to the Education schema. On the response, include only the JSON.
 """
 
-AWARDS_PROMPT = """
-You are going to write a JSON resume section for an applicant applying for job posts.
-
-Consider the following CV:
-<CV_TEXT>
-
+AWARDS_PROMPT = SECTION_PREFIX + """
 Now consider the following TypeScript Interface for the JSON schema:
 
 interface AwardItem {
@@ -94,12 +146,7 @@ interface Awards {
 Write the awards section according to the Awards schema. Include only the awards section. On the response, include only the JSON.
 """
 
-PROJECTS_PROMPT = """
-You are going to write a JSON resume section for an applicant applying for job posts.
-
-Consider the following CV:
-<CV_TEXT>
-
+PROJECTS_PROMPT = SECTION_PREFIX + """
 Now consider the following TypeScript Interface for the JSON schema:
 
 interface ProjectItem {
@@ -116,12 +163,7 @@ interface Projects {
 Write the projects section according to the Projects schema. Include all projects, but only the ones present in the CV. On the response, include only the JSON.
 """
 
-SKILLS_PROMPT = """
-You are going to write a JSON resume section for an applicant applying for job posts.
-
-Consider the following CV:
-<CV_TEXT>
-
+SKILLS_PROMPT = SECTION_PREFIX + """
 type HardSkills = "Programming Languages" | "Tools" | "Frameworks" | "Computer Proficiency";
 type SoftSkills = "Team Work" | "Communication" | "Leadership" | "Problem Solving" | "Creativity";
 type OtherSkills = string;
@@ -140,12 +182,7 @@ interface Skills {
 Write the skills section according to the Skills schema. Include only up to the top 4 skill names that are present in the CV and related with the education and work experience. On the response, include only the JSON.
 """
 
-WORK_PROMPT = """
-You are going to write a JSON resume section for an applicant applying for job posts.
-
-Consider the following CV:
-<CV_TEXT>
-
+WORK_PROMPT = SECTION_PREFIX + """
 Now consider the following TypeScript Interface for the JSON schema:
 
 interface WorkItem {
@@ -164,94 +201,680 @@ interface Work {
 Write a work section for the candidate according to the Work schema. Include only the work experience and not the project experience. For each work experience, provide a company name, position name, start and end date, and bullet point for the highlights. Follow the Harvard Extension School Resume guidelines and phrase the highlights with the STAR methodology
 """
 
+COMBINED_PROMPT = SECTION_PREFIX + """
+Instead of a single section, write every section of the JSON resume at once.
 
-def generate_json_resume(cv_text, api_key, model="deepseek-chat", model_type="DeepSeek"):
-    """Generate a JSON resume from a CV text"""
-    print(f"DEBUG: Starting JSON resume generation with model: {model}, type: {model_type}")
-    print(f"DEBUG: CV text length: {len(cv_text)}")
-    print(f"DEBUG: First 200 chars of CV: {cv_text[:200]}...")
-    
-    sections = []
-    print("DEBUG: Initializing client for model type: {model_type}")
-    if model_type == "OpenAI":
-        client = OpenAI(api_key=api_key)
-    elif model_type == "DeepSeek":
-        client = OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
-    else:
-        print(f"DEBUG: Unsupported model type: {model_type}, falling back to DeepSeek")
-        client = OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
-        model_type = "DeepSeek"
-        model = "deepseek-chat"
-
-    prompts = [
-        ("BASICS", BASICS_PROMPT),
-        ("EDUCATION", EDUCATION_PROMPT),
-        ("AWARDS", AWARDS_PROMPT),
-        ("PROJECTS", PROJECTS_PROMPT),
-        ("SKILLS", SKILLS_PROMPT),
-        ("WORK", WORK_PROMPT),
-    ]
-
-    for prompt_name, prompt in prompts:
-        print(f"DEBUG: Processing {prompt_name} section...")
-        
-        filled_prompt = prompt.replace(CV_TEXT_PLACEHOLDER, cv_text)
-        print(f"DEBUG: Filled prompt length for {prompt_name}: {len(filled_prompt)}")
-        
+Now consider the following TypeScript Interfaces for the JSON schema:
+
+interface Basics {
+    name: string;
+    email: string;
+    phone: string;
+    website: string;
+    address: string;
+}
+
+interface EducationItem {
+    institution: string;
+    area: string;
+    additionalAreas: string[];
+    studyType: string;
+    startDate: string;
+    endDate: string;
+    score: string;
+    location: string;
+}
+
+interface AwardItem {
+    title: string;
+    date: string;
+    awarder: string;
+    summary: string;
+}
+
+interface ProjectItem {
+    name: string;
+    description: string;
+    keywords: string[];
+    url: string;
+}
+
+type HardSkills = "Programming Languages" | "Tools" | "Frameworks" | "Computer Proficiency";
+type SoftSkills = "Team Work" | "Communication" | "Leadership" | "Problem Solving" | "Creativity";
+type OtherSkills = string;
+
+interface SkillItem {
+    name: HardSkills | SoftSkills | OtherSkills;
+    keywords: string[];
+}
+
+interface WorkItem {
+    company: string;
+    position: string;
+    startDate: string;
+    endDate: string;
+    location: string;
+    highlights: string[];
+}
+
+interface Resume {
+    basics: Basics;
+    education: EducationItem[];
+    awards: AwardItem[];
+    projects: ProjectItem[];
+    skills: SkillItem[];
+    work: WorkItem[];
+}
+
+Write the whole resume according to the Resume schema, following these rules for each section:
+- projects: include all projects, but only the ones present in the CV.
+- skills: include only up to the top 4 skill names that are present in the CV and related with the education and work experience.
+- work: include only the work experience and not the project experience. Follow the Harvard Extension School Resume guidelines and phrase the highlights with the STAR methodology.
+On the response, include only the JSON.
+"""
+
+
+SECTION_PROMPTS = [
+    ("BASICS", BASICS_PROMPT),
+    ("EDUCATION", EDUCATION_PROMPT),
+    ("AWARDS", AWARDS_PROMPT),
+    ("PROJECTS", PROJECTS_PROMPT),
+    ("SKILLS", SKILLS_PROMPT),
+    ("WORK", WORK_PROMPT),
+]
+
+# Top-level JSON resume key produced by each section prompt
+SECTION_KEYS = {
+    "BASICS": "basics",
+    "EDUCATION": "education",
+    "AWARDS": "awards",
+    "PROJECTS": "projects",
+    "SKILLS": "skills",
+    "WORK": "work",
+}
+
+# Upper bound on concurrent section requests per extraction
+SECTION_MAX_WORKERS = len(SECTION_PROMPTS)
+
+# Segments (from doc_utils.segment_resume_text) each section prompt is given,
+# the first one being required; BASICS only gets the contact header
+SECTION_SEGMENTS = {
+    "BASICS": [],
+    "EDUCATION": ["education"],
+    "AWARDS": ["awards"],
+    "PROJECTS": ["projects"],
+    "SKILLS": ["skills", "work", "education"],
+    "WORK": ["work"],
+}
+
+SEGMENT_TITLES = {
+    "education": "Education",
+    "work": "Experience",
+    "projects": "Projects",
+    "skills": "Skills",
+    "awards": "Awards",
+}
+
+# Contact-extraction confidence from which the BASICS prompt is skipped
+# (name, email and phone found locally)
+BASICS_LOCAL_MIN_CONFIDENCE = 0.8
+
+# Segmentation confidence below which every prompt gets the full CV text
+SEGMENT_MIN_CONFIDENCE = 0.4
+
+# Contact header characters kept in front of every segment
+SEGMENT_HEADER_CHARS = 400
+
+# Sections rewritten by JSON tailoring; basics, education and awards are facts
+# that tailoring must not touch, so they are passed through unchanged
+TAILORED_SECTIONS = ("work", "projects", "skills")
+
+# "sections" tailors each section in its own call, "combined" in one call that
+# falls back to per-section calls for broken sections, "text" is the legacy
+# rewrite-as-prose-then-re-extract path
+TAILORING_MODES = ("sections", "combined", "text")
+
+# "sections" sends one prompt per section, "combined" asks for the whole
+# resume in one completion and only re-asks for sections that come back broken
+EXTRACTION_STRATEGIES = ("sections", "combined")
+
+
+def merge_usage(total, usage):
+    """Add the token counts of usage into total"""
+    for key, value in usage.items():
+        total[key] = total.get(key, 0) + value
+    return total
+
+
+def clean_json_answer(answer):
+    """Strip whitespace and markdown code fences around a JSON answer"""
+    answer = answer.strip()
+    if answer.startswith("```json"):
+        answer = answer[7:]
+    elif answer.startswith("```"):
+        answer = answer[3:]
+    if answer.endswith("```"):
+        answer = answer[:-3]
+    return answer.strip()
+
+
+def is_json_answer(answer):
+    """Check whether an answer parses as JSON once code fences are stripped"""
+    try:
+        json.loads(clean_json_answer(answer))
+        return True
+    except ValueError:
+        return False
+
+
+def section_attempts(model_type):
+    """Return the completion parameters of a section's first try and its one retry"""
+    if supports_json_mode(model_type):
+        return [{}, {"response_format": {"type": "json_object"}}]
+    return [{}, {"temperature": 0}]
+
+
+def accept_section_answer(section_key, label, answer, attempt, usage):
+    """Parse a section answer and record its repairs; raises SchemaError if it is invalid"""
+    print(f"DEBUG: API response received for {label}, length: {len(answer)}")
+    print(f"DEBUG: Raw response for {label}: {answer[:200]}...")
+
+    section, repairs = parse_section(section_key, answer)
+    print(f"DEBUG: Successfully parsed JSON for {label}")
+    if repairs:
+        print(f"DEBUG: Repaired {label} answer: {repairs}")
+    repaired = int(is_repaired(repairs))
+    parse_stats.record(sections=1, repaired=repaired, retried=attempt, retry_succeeded=attempt)
+    usage["repaired_sections"] = repaired
+    usage["json_retries"] = attempt
+    return section
+
+
+def reject_section(label, attempts, attempt, usage):
+    """Record a section that failed every attempt and return its (None, usage) result"""
+    print(f"DEBUG: Skipping {label}")
+    retried = int(len(attempts) > 1 and attempt > 0)
+    parse_stats.record(sections=1, retried=retried, failed=1)
+    usage["json_retries"] = retried
+    return None, usage
+
+
+def request_section(model_type, api_key, model, system_prompt, prompt, section_key, label, use_cache=True, prompt_name=None):
+    """Ask for one JSON resume section and validate the answer against its schema
+
+    The answer is parsed with parsing.parse_section, repairing fences,
+    trailing commas, wrappers and field types. An answer that still fails is
+    retried once, in the provider's JSON mode when it has one.
+
+    Returns a (section, usage) tuple where section is None if it failed.
+    """
+    usage = {"calls": 0}
+    attempts = section_attempts(model_type)
+    for attempt, params in enumerate(attempts):
+        answer = ""
         try:
-            print(f"DEBUG: Making API call for {prompt_name} using {model_type} with model {model}...")
-            response = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": filled_prompt},
-                ],
+            print(f"DEBUG: Making API call for {label} using {model_type} with model {model}...")
+            usage["calls"] += 1
+            answer, call_usage = chat_completion(
+                model_type, api_key, model, system_prompt, prompt, use_cache=use_cache,
+                cache_check=lambda answer: is_valid_section_answer(section_key, answer),
+                prompt_name=prompt_name, **params
             )
-            answer = response.choices[0].message.content
-            print(f"DEBUG: API response received for {prompt_name}, length: {len(answer)}")
-            
-            print(f"DEBUG: Raw response for {prompt_name}: {answer[:200]}...")
-            
-            # Clean up the response
-            answer = answer.strip()
-            if answer.startswith("```json"):
-                answer = answer[7:]
-            if answer.endswith("```"):
-                answer = answer[:-3]
-            answer = answer.strip()
-            
-            print(f"DEBUG: Cleaned response for {prompt_name}: {answer[:200]}...")
-            
-            # Parse JSON
-            parsed_answer = json.loads(answer)
-            print(f"DEBUG: Successfully parsed JSON for {prompt_name}")
-            print(f"DEBUG: Parsed keys for {prompt_name}: {list(parsed_answer.keys())}")
-
-            # Fix common GPT mistake for basics section
-            if prompt_name == "BASICS" and "basics" not in parsed_answer:
-                print(f"DEBUG: Fixing basics section structure for {prompt_name}")
-                parsed_answer = {"basics": parsed_answer}
-
-            sections.append(parsed_answer)
-            print(f"DEBUG: Added {prompt_name} section to results")
-
-        except json.JSONDecodeError as e:
-            print(f"DEBUG: JSON parsing error for {prompt_name}: {e}")
-            print(f"DEBUG: Raw answer that failed to parse: {answer}")
-            print(f"DEBUG: Skipping {prompt_name} section due to parsing error")
-            continue
+            merge_usage(usage, call_usage)
+            return accept_section_answer(section_key, label, answer, attempt, usage), usage
+
+        except SchemaError as e:
+            print(f"DEBUG: Invalid {label} answer: {e}")
+            print(f"DEBUG: Raw answer that failed to validate: {answer}")
+        except Exception as e:
+            print(f"DEBUG: Error processing {label}: {str(e)}")
+            break
+
+        if attempt + 1 < len(attempts):
+            print(f"DEBUG: Retrying {label} with {attempts[attempt + 1]}")
+
+    return reject_section(label, attempts, attempt, usage)
+
+
+async def arequest_section(model_type, api_key, model, system_prompt, prompt, section_key, label, use_cache=True, prompt_name=None):
+    """Coroutine version of request_section"""
+    usage = {"calls": 0}
+    attempts = section_attempts(model_type)
+    for attempt, params in enumerate(attempts):
+        answer = ""
+        try:
+            print(f"DEBUG: Making async API call for {label} using {model_type} with model {model}...")
+            usage["calls"] += 1
+            answer, call_usage = await achat_completion(
+                model_type, api_key, model, system_prompt, prompt, use_cache=use_cache,
+                cache_check=lambda answer: is_valid_section_answer(section_key, answer),
+                prompt_name=prompt_name, **params
+            )
+            merge_usage(usage, call_usage)
+            return accept_section_answer(section_key, label, answer, attempt, usage), usage
+
+        except SchemaError as e:
+            print(f"DEBUG: Invalid {label} answer: {e}")
+            print(f"DEBUG: Raw answer that failed to validate: {answer}")
         except Exception as e:
-            print(f"DEBUG: Error processing {prompt_name}: {str(e)}")
-            print(f"DEBUG: Skipping {prompt_name} section due to error")
+            print(f"DEBUG: Error processing {label}: {str(e)}")
+            break
+
+        if attempt + 1 < len(attempts):
+            print(f"DEBUG: Retrying {label} with {attempts[attempt + 1]}")
+
+    return reject_section(label, attempts, attempt, usage)
+
+
+def fill_section_prompt(prompt_name, prompt, cv_text):
+    """Return the section prompt with the CV text filled in"""
+    print(f"DEBUG: Processing {prompt_name} section...")
+    filled_prompt = prompt.replace(CV_TEXT_PLACEHOLDER, cv_text)
+    print(f"DEBUG: Filled prompt length for {prompt_name}: {len(filled_prompt)}")
+    return filled_prompt
+
+
+def generate_section(model_type, api_key, prompt_name, prompt, cv_text, model, use_cache=True):
+    """Generate a single JSON resume section (see request_section)
+
+    Returns a (section, usage) tuple where section is None if it failed.
+    """
+    return request_section(
+        model_type, api_key, model, SYSTEM_PROMPT, fill_section_prompt(prompt_name, prompt, cv_text),
+        SECTION_KEYS[prompt_name], f"{prompt_name} section", use_cache, f"extract:{SECTION_KEYS[prompt_name]}"
+    )
+
+
+async def agenerate_section(model_type, api_key, prompt_name, prompt, cv_text, model, use_cache=True):
+    """Coroutine version of generate_section"""
+    return await arequest_section(
+        model_type, api_key, model, SYSTEM_PROMPT, fill_section_prompt(prompt_name, prompt, cv_text),
+        SECTION_KEYS[prompt_name], f"{prompt_name} section", use_cache, f"extract:{SECTION_KEYS[prompt_name]}"
+    )
+
+
+def build_section_texts(cv_text, segments=None, min_confidence=SEGMENT_MIN_CONFIDENCE):
+    """Return {prompt_name: text} holding the CV text each section prompt should see
+
+    With confident segments a prompt gets the contact header plus its own
+    segments; it falls back to the full text when segmentation confidence is
+    low or its required segment was not found.
+    """
+    texts = {prompt_name: cv_text for prompt_name, _ in SECTION_PROMPTS}
+    if not segments or segments.get("confidence", 0) < min_confidence:
+        return texts
+
+    header = segments.get("header", "")[:SEGMENT_HEADER_CHARS].strip()
+    found = segments.get("sections", {})
+    for prompt_name, names in SECTION_SEGMENTS.items():
+        if not names:
+            # Contact details are usually in the header; too short means they are elsewhere
+            if len(header) >= 20:
+                texts[prompt_name] = header
+            continue
+        if names[0] not in found:
             continue
+        parts = [header] if header else []
+        parts += [f"{SEGMENT_TITLES[name]}\n{found[name]}" for name in names if name in found]
+        texts[prompt_name] = "\n\n".join(parts)
+    return texts
+
+
+def iter_sections(model_type, api_key, prompts, texts, model, max_workers, usage, use_cache=True):
+    """Run section prompts concurrently, yielding (prompt_name, section) as each one finishes
+
+    ``texts`` maps each prompt name to the CV text sent with it (see build_section_texts).
+    """
+    if not prompts:
+        return
+    max_workers = max(1, min(int(max_workers or 1), len(prompts)))
+    print(f"DEBUG: Generating {len(prompts)} sections with {max_workers} worker(s)")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            # Each worker runs in a copy of the caller's context so telemetry keeps the endpoint
+            executor.submit(contextvars.copy_context().run, generate_section, model_type, api_key, prompt_name, prompt, texts[prompt_name], model, use_cache): prompt_name
+            for prompt_name, prompt in prompts
+        }
+        for future in as_completed(futures):
+            section, section_usage = future.result()
+            merge_usage(usage, section_usage)
+            if section is None:
+                usage["failed_sections"].append(futures[future])
+            yield futures[future], section
+
+
+async def aiter_sections(model_type, api_key, prompts, texts, model, max_workers, usage, use_cache=True):
+    """Async generator version of iter_sections; ``max_workers`` caps the calls in flight"""
+    if not prompts:
+        return
+    max_workers = max(1, min(int(max_workers or 1), len(prompts)))
+    print(f"DEBUG: Generating {len(prompts)} sections with {max_workers} concurrent call(s)")
+    slots = asyncio.Semaphore(max_workers)
+
+    async def run(prompt_name, prompt):
+        async with slots:
+            return prompt_name, await agenerate_section(
+                model_type, api_key, prompt_name, prompt, texts[prompt_name], model, use_cache
+            )
+
+    for finished in asyncio.as_completed([run(prompt_name, prompt) for prompt_name, prompt in prompts]):
+        prompt_name, (section, section_usage) = await finished
+        merge_usage(usage, section_usage)
+        if section is None:
+            usage["failed_sections"].append(prompt_name)
+        yield prompt_name, section
+
+
+def fill_combined_prompt(model_type, model, cv_text):
+    """Return the combined resume prompt with the CV text filled in"""
+    print(f"DEBUG: Processing combined resume schema using {model_type} with model {model}...")
+    filled_prompt = COMBINED_PROMPT.replace(CV_TEXT_PLACEHOLDER, cv_text)
+    print(f"DEBUG: Filled combined prompt length: {len(filled_prompt)}")
+    return filled_prompt
+
+
+def generate_combined(model_type, api_key, cv_text, model, usage, use_cache=True):
+    """Ask for the whole resume in one completion
+
+    Returns {prompt_name: section} holding only the sections that came back
+    present and well-formed.
+    """
+    filled_prompt = fill_combined_prompt(model_type, model, cv_text)
+    try:
+        answer, call_usage = chat_completion(
+            model_type, api_key, model, SYSTEM_PROMPT, filled_prompt,
+            use_cache=use_cache, cache_check=is_json_answer, prompt_name="extract:combined",
+        )
+    except Exception as e:
+        print(f"DEBUG: Error processing combined resume: {str(e)}")
+        return {}
+    usage["calls"] += 1
+    merge_usage(usage, call_usage)
+    return parse_combined_answer(answer, usage)
+
+
+async def agenerate_combined(model_type, api_key, cv_text, model, usage, use_cache=True):
+    """Coroutine version of generate_combined"""
+    filled_prompt = fill_combined_prompt(model_type, model, cv_text)
+    try:
+        answer, call_usage = await achat_completion(
+            model_type, api_key, model, SYSTEM_PROMPT, filled_prompt,
+            use_cache=use_cache, cache_check=is_json_answer, prompt_name="extract:combined",
+        )
+    except Exception as e:
+        print(f"DEBUG: Error processing combined resume: {str(e)}")
+        return {}
+    usage["calls"] += 1
+    merge_usage(usage, call_usage)
+    return parse_combined_answer(answer, usage)
+
+
+def parse_combined_answer(answer, usage):
+    """Return {prompt_name: section} for the present and well-formed sections of a combined answer"""
+    try:
+        parsed_answer, repairs = repair_json_text(answer)
+    except SchemaError as e:
+        print(f"DEBUG: JSON parsing error for combined resume: {e}")
+        print(f"DEBUG: Raw answer that failed to parse: {answer}")
+        return {}
+
+    if not isinstance(parsed_answer, dict):
+        print(f"DEBUG: Combined resume is not a JSON object: {type(parsed_answer).__name__}")
+        return {}
+    # Unwrap {"resume": {...}}, the combined equivalent of the BASICS fix
+    if len(parsed_answer) == 1 and isinstance(parsed_answer.get("resume"), dict):
+        parsed_answer = parsed_answer["resume"]
+
+    results = {}
+    for prompt_name, key in SECTION_KEYS.items():
+        if key not in parsed_answer:
+            print(f"DEBUG: Combined resume is missing the {key} section")
+            continue
+        try:
+            results[prompt_name], section_repairs = normalize_section(key, {key: parsed_answer[key]})
+        except SchemaError as e:
+            print(f"DEBUG: Combined resume has an invalid {key} section: {e}")
+            continue
+        repaired = int(is_repaired(repairs + section_repairs))
+        usage["repaired_sections"] += repaired
+        parse_stats.record(sections=1, repaired=repaired)
+    return results
+
+
+def new_usage(strategy):
+    """Return an empty usage record for one extraction"""
+    return {
+        "strategy": strategy,
+        "calls": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "total_tokens": 0,
+        "cached_tokens": 0,
+        "cache_hits": 0,
+        "queue_wait_seconds": 0.0,
+        "retries": 0,
+        "hedged": 0,
+        "hedge_wins": 0,
+        "cost_usd": 0.0,
+        "failed_sections": [],
+        "local_sections": [],
+        "repaired_sections": 0,
+        "json_retries": 0,
+    }
+
+
+def finish_usage(usage, started):
+    """Fill in the elapsed time and cached-token share of a usage record"""
+    usage["elapsed_seconds"] = round(time.monotonic() - started, 3)
+    usage["queue_wait_seconds"] = round(usage["queue_wait_seconds"], 3)
+    usage["cost_usd"] = round(usage["cost_usd"], 6)
+    if usage["prompt_tokens"]:
+        usage["cached_token_ratio"] = round(usage["cached_tokens"] / usage["prompt_tokens"], 4)
+    return usage
+
 
-    print(f"DEBUG: Processed {len(sections)} sections successfully")
+def merge_sections(results):
+    """Combine {prompt_name: section} into one JSON resume in SECTION_PROMPTS order"""
+    final_json = {}
+    for prompt_name, _ in SECTION_PROMPTS:
+        section = results.get(prompt_name)
+        if section is not None:
+            final_json.update(section)
+    return final_json
+
+
+def prepare_extraction(cv_text, model, model_type, strategy, usage, segments=None, warm_prefix=False):
+    """Validate the options, resolve the model and pick each prompt's CV text
+
+    Returns (model_type, model, texts). Records the segmented sections in
+    usage, and under "prompt_layout" whether the prompts shared the CV
+    prefix ("shared_prefix") or some got their own segment ("segmented").
+    """
+    if strategy not in EXTRACTION_STRATEGIES:
+        raise ValueError(f"Unknown extraction strategy '{strategy}'. Available strategies: {list(EXTRACTION_STRATEGIES)}")
+    if warm_prefix and segments:
+        raise ValueError("warm_prefix and segments are mutually exclusive: segmented prompts don't share the CV prefix")
+
+    print(f"DEBUG: Resolving model for model type: {model_type}")
+    model_type, model = resolve_model(model_type, model)
+
+    texts = build_section_texts(cv_text, segments)
+    usage["segmented_sections"] = [name for name, text in texts.items() if text is not cv_text]
+    usage["prompt_layout"] = "segmented" if usage["segmented_sections"] else "shared_prefix"
+    if segments:
+        print(f"DEBUG: Segmentation confidence {segments.get('confidence')}, segmented sections: {usage['segmented_sections']}")
+    return model_type, model, texts
+
+
+def combined_retry_prompts(results, usage):
+    """Return the section prompts to re-ask after a combined extraction"""
+    retry_prompts = [(name, prompt) for name, prompt in SECTION_PROMPTS if name not in results]
+    usage["fallback_sections"] = [name for name, _ in retry_prompts]
+    if retry_prompts:
+        print(f"DEBUG: Re-asking for sections: {usage['fallback_sections']}")
+    return retry_prompts
+
+
+def extract_local_basics(cv_text, segments, usage):
+    """Return the basics section read locally, or None when it is not confident enough"""
+    basics, confidence = extract_contact_info(segments["header"] if segments and segments.get("header") else cv_text)
+    print(f"DEBUG: Local contact extraction confidence {confidence}: {basics}")
+    if confidence < BASICS_LOCAL_MIN_CONFIDENCE:
+        return None
+    usage["local_sections"].append("BASICS")
+    return {"basics": basics}
+
+
+def iter_json_resume_sections(cv_text, api_key, model="deepseek-chat", model_type="DeepSeek", max_workers=SECTION_MAX_WORKERS, strategy="sections", use_cache=True, warm_prefix=False, usage=None, segments=None, local_basics=True):
+    """Yield (prompt_name, section) for each JSON resume section as soon as it is ready
+
+    Sections arrive in completion order; failed sections are yielded with a
+    None section. ``usage`` (see new_usage) is updated in place. The other
+    arguments behave as in generate_json_resume.
+    """
+    if usage is None:
+        usage = new_usage(strategy)
+    model_type, model, texts = prepare_extraction(cv_text, model, model_type, strategy, usage, segments, warm_prefix)
+
+    if strategy == "combined":
+        results = generate_combined(model_type, api_key, cv_text, model, usage, use_cache)
+        for prompt_name, _ in SECTION_PROMPTS:
+            if prompt_name in results:
+                yield prompt_name, results[prompt_name]
+        retry_prompts = combined_retry_prompts(results, usage)
+        if retry_prompts:
+            yield from iter_sections(model_type, api_key, retry_prompts, texts, model, max_workers, usage, use_cache)
+        return
+
+    prompts = SECTION_PROMPTS
+    basics = extract_local_basics(cv_text, segments, usage) if local_basics else None
+    if basics is not None:
+        prompts = [(name, prompt) for name, prompt in SECTION_PROMPTS if name != "BASICS"]
+        yield "BASICS", basics
+
+    if warm_prefix and max_workers > 1:
+        print(f"DEBUG: Warming the shared prompt prefix with {prompts[0][0]}")
+        yield from iter_sections(model_type, api_key, prompts[:1], texts, model, 1, usage, use_cache)
+        yield from iter_sections(model_type, api_key, prompts[1:], texts, model, max_workers, usage, use_cache)
+    else:
+        yield from iter_sections(model_type, api_key, prompts, texts, model, max_workers, usage, use_cache)
+
+
+async def aiter_json_resume_sections(cv_text, api_key, model="deepseek-chat", model_type="DeepSeek", max_workers=SECTION_MAX_WORKERS, strategy="sections", use_cache=True, warm_prefix=False, usage=None, segments=None, local_basics=True):
+    """Async generator version of iter_json_resume_sections"""
+    if usage is None:
+        usage = new_usage(strategy)
+    model_type, model, texts = prepare_extraction(cv_text, model, model_type, strategy, usage, segments, warm_prefix)
+
+    if strategy == "combined":
+        results = await agenerate_combined(model_type, api_key, cv_text, model, usage, use_cache)
+        for prompt_name, _ in SECTION_PROMPTS:
+            if prompt_name in results:
+                yield prompt_name, results[prompt_name]
+        retry_prompts = combined_retry_prompts(results, usage)
+        async for prompt_name, section in aiter_sections(model_type, api_key, retry_prompts, texts, model, max_workers, usage, use_cache):
+            yield prompt_name, section
+        return
+
+    prompts = SECTION_PROMPTS
+    basics = extract_local_basics(cv_text, segments, usage) if local_basics else None
+    if basics is not None:
+        prompts = [(name, prompt) for name, prompt in SECTION_PROMPTS if name != "BASICS"]
+        yield "BASICS", basics
+
+    batches = [(prompts, max_workers)]
+    if warm_prefix and max_workers > 1:
+        print(f"DEBUG: Warming the shared prompt prefix with {prompts[0][0]}")
+        batches = [(prompts[:1], 1), (prompts[1:], max_workers)]
+    for batch, workers in batches:
+        async for prompt_name, section in aiter_sections(model_type, api_key, batch, texts, model, workers, usage, use_cache):
+            yield prompt_name, section
+
+
+def generate_json_resume(cv_text, api_key, model="deepseek-chat", model_type="DeepSeek", max_workers=SECTION_MAX_WORKERS, strategy="sections", return_usage=False, use_cache=True, warm_prefix=False, segments=None, local_basics=True):
+    """Generate a JSON resume from a CV text
+
+    With the "sections" strategy the section prompts are sent concurrently on
+    a pool of at most ``max_workers`` threads (``max_workers=1`` runs them one
+    after another). The "combined" strategy asks for every section in one
+    completion and re-asks only for sections that are missing or malformed.
+    Sections are merged in SECTION_PROMPTS order, and a failed section is
+    skipped without failing the rest.
+
+    When ``return_usage`` is set a (resume, usage) tuple is returned, where
+    usage holds the strategy, number of calls and summed token counts.
+    ``use_cache=False`` forces fresh completions instead of cached ones.
+
+    Prompts that get the full CV share the SECTION_PREFIX + CV prefix. With
+    ``warm_prefix`` the first section is sent on its own so the provider has
+    cached that prefix before the remaining sections go out concurrently;
+    this trades one extra round trip of latency for cheaper, faster prompt
+    processing on the rest. usage["cached_tokens"] reports how many prompt
+    tokens the provider served from its cache.
+
+    ``segments`` (from doc_utils.segment_resume_text) lets each section prompt
+    see only its own part of the CV plus the contact header, which cuts input
+    tokens on long CVs but gives up the shared prefix, so it can't be combined
+    with ``warm_prefix`` (ValueError). usage["prompt_layout"] says which of
+    the two was in effect. The combined strategy ignores segments.
+
+    With ``local_basics`` the "sections" strategy first reads the contact
+    details with doc_utils.extract_contact_info and skips the BASICS prompt
+    when name, email and phone were all found.
+    """
+    print(f"DEBUG: Starting JSON resume generation with model: {model}, type: {model_type}, strategy: {strategy}")
+    print(f"DEBUG: CV text length: {len(cv_text)}")
+    print(f"DEBUG: First 200 chars of CV: {cv_text[:200]}...")
+
+    usage = new_usage(strategy)
+    started = time.monotonic()
+    results = dict(iter_json_resume_sections(
+        cv_text, api_key, model, model_type, max_workers=max_workers, strategy=strategy,
+        use_cache=use_cache, warm_prefix=warm_prefix, usage=usage, segments=segments,
+        local_basics=local_basics,
+    ))
+    final_json = finish_json_resume(results, usage, started)
+    if return_usage:
+        return final_json, usage
+    return final_json
+
+
+async def agenerate_json_resume(cv_text, api_key, model="deepseek-chat", model_type="DeepSeek", max_workers=SECTION_MAX_WORKERS, strategy="sections", return_usage=False, use_cache=True, warm_prefix=False, segments=None, local_basics=True):
+    """Coroutine version of generate_json_resume
+
+    Section calls run as concurrent coroutines on the event loop instead of
+    on a thread pool; ``max_workers`` caps how many are in flight.
+    """
+    print(f"DEBUG: Starting async JSON resume generation with model: {model}, type: {model_type}, strategy: {strategy}")
+    print(f"DEBUG: CV text length: {len(cv_text)}")
+
+    usage = new_usage(strategy)
+    started = time.monotonic()
+    results = {}
+    async for prompt_name, section in aiter_json_resume_sections(
+        cv_text, api_key, model, model_type, max_workers=max_workers, strategy=strategy,
+        use_cache=use_cache, warm_prefix=warm_prefix, usage=usage, segments=segments,
+        local_basics=local_basics,
+    ):
+        results[prompt_name] = section
+
+    final_json = finish_json_resume(results, usage, started)
+    if return_usage:
+        return final_json, usage
+    return final_json
+
+
+def finish_json_resume(results, usage, started):
+    """Close the usage record and merge the extracted sections into one JSON resume"""
+    finish_usage(usage, started)
+
+    succeeded = [name for name, section in results.items() if section is not None]
+    print(f"DEBUG: Processed {len(succeeded)} sections successfully in {usage['elapsed_seconds']}s")
+    print(f"DEBUG: Token usage: {usage}")
     
     # Combine all sections
-    final_json = {}
-    for section in sections:
-        print(f"DEBUG: Merging section with keys: {list(section.keys())}")
-        final_json.update(section)
+    final_json = merge_sections(results)
 
     print(f"DEBUG: Final JSON keys: {list(final_json.keys())}")
     print(f"DEBUG: Final JSON structure summary:")
@@ -262,42 +885,325 @@ def generate_json_resume(cv_text, api_key, model="deepseek-chat", model_type="De
             print(f"  - {key}: list with {len(value)} items")
         else:
             print(f"  - {key}: {type(value).__name__}")
-    
     return final_json
 
 
-def tailor_resume(cv_text, api_key, model="deepseek-chat", model_type="DeepSeek"):
+def fill_tailoring_prompt(cv_text, model, model_type):
+    """Return the legacy text tailoring prompt with the CV text filled in"""
     print(f"DEBUG: Starting resume tailoring with model: {model}, type: {model_type}")
     print(f"DEBUG: CV text length for tailoring: {len(cv_text)}")
     
     filled_prompt = TAILORING_PROMPT.replace("<CV_TEXT>", cv_text)
     print(f"DEBUG: Filled tailoring prompt length: {len(filled_prompt)}")
+    return filled_prompt
+
+
+def clean_tailored_text(answer):
+    """Strip quotes around a tailored CV text and end it with a full stop"""
+    answer = answer.strip().strip('"').strip("'").rstrip('.') + '.'
+    print(f"DEBUG: API tailoring response received, length: {len(answer)}")
+    print(f"DEBUG: Tailored text preview: {answer[:300]}...")
+    return answer
+
+
+def tailor_resume(cv_text, api_key, model="deepseek-chat", model_type="DeepSeek", use_cache=True):
+    filled_prompt = fill_tailoring_prompt(cv_text, model, model_type)
     
     print(f"DEBUG: Using {model_type} for resume tailoring with model {model}")
-    if model_type == "OpenAI":
-        client = OpenAI(api_key=api_key)
-    elif model_type == "DeepSeek":
-        client = OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
-    else:
-        print(f"DEBUG: Unsupported model type: {model_type}, falling back to DeepSeek")
-        client = OpenAI(api_key=api_key, base_url="https://api.deepseek.com")
-        model_type = "DeepSeek"
-        model = "deepseek-chat"
+    model_type, model = resolve_model(model_type, model)
     
     try:
         print(f"DEBUG: Making {model_type} API call for tailoring...")
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": SYSTEM_TAILORING},
-                {"role": "user", "content": filled_prompt},
-            ],
+        answer, _ = chat_completion(
+            model_type, api_key, model, SYSTEM_TAILORING, filled_prompt, use_cache=use_cache,
+            prompt_name="tailor:text",
         )
-        answer = response.choices[0].message.content.strip().strip('"').strip("'").rstrip('.') + '.'
-        print(f"DEBUG: API tailoring response received, length: {len(answer)}")
-        print(f"DEBUG: Tailored text preview: {answer[:300]}...")
-        return answer
+        return clean_tailored_text(answer)
     except Exception as e:
         print(f"DEBUG: API tailoring failed: {e}")
         print("DEBUG: Returning original CV text")
         return cv_text
+
+
+async def atailor_resume(cv_text, api_key, model="deepseek-chat", model_type="DeepSeek", use_cache=True):
+    """Coroutine version of tailor_resume"""
+    filled_prompt = fill_tailoring_prompt(cv_text, model, model_type)
+    model_type, model = resolve_model(model_type, model)
+
+    try:
+        print(f"DEBUG: Making async {model_type} API call for tailoring...")
+        answer, _ = await achat_completion(
+            model_type, api_key, model, SYSTEM_TAILORING, filled_prompt, use_cache=use_cache,
+            prompt_name="tailor:text",
+        )
+        return clean_tailored_text(answer)
+    except Exception as e:
+        print(f"DEBUG: API tailoring failed: {e}")
+        print("DEBUG: Returning original CV text")
+        return cv_text
+
+
+def fill_tailoring_section_prompt(job_description, section_key, section):
+    """Return the tailoring prompt for one section"""
+    filled_prompt = (
+        TAILORING_SECTION_PROMPT
+        .replace(JOB_DESCRIPTION_PLACEHOLDER, job_description)
+        .replace("<SCHEMA>", schema_interface(section_key))
+        .replace("<SECTION_JSON>", json.dumps({section_key: section}, indent=2, ensure_ascii=False))
+        .replace("<SECTION_KEY>", section_key)
+    )
+    print(f"DEBUG: Filled tailoring prompt length for {section_key}: {len(filled_prompt)}")
+    return filled_prompt
+
+
+def tailor_section(model_type, api_key, model, job_description, section_key, section, use_cache=True):
+    """Tailor one JSON resume section to a job description
+
+    Returns a (section, usage) tuple where section is None if it failed.
+    """
+    return request_section(
+        model_type, api_key, model, SYSTEM_PROMPT, fill_tailoring_section_prompt(job_description, section_key, section),
+        section_key, f"{section_key} tailoring", use_cache, f"tailor:{section_key}"
+    )
+
+
+async def atailor_section(model_type, api_key, model, job_description, section_key, section, use_cache=True):
+    """Coroutine version of tailor_section"""
+    return await arequest_section(
+        model_type, api_key, model, SYSTEM_PROMPT, fill_tailoring_section_prompt(job_description, section_key, section),
+        section_key, f"{section_key} tailoring", use_cache, f"tailor:{section_key}"
+    )
+
+
+def fill_tailoring_combined_prompt(job_description, sections):
+    """Return the tailoring prompt covering several sections"""
+    keys = list(sections)
+    filled_prompt = (
+        TAILORING_COMBINED_PROMPT
+        .replace(JOB_DESCRIPTION_PLACEHOLDER, job_description)
+        .replace("<SCHEMA>", "\n\n".join(schema_interface(key) for key in keys))
+        .replace("<SECTION_JSON>", json.dumps(sections, indent=2, ensure_ascii=False))
+        .replace("<SECTION_KEYS>", ", ".join(f'"{key}"' for key in keys))
+    )
+    print(f"DEBUG: Filled combined tailoring prompt length: {len(filled_prompt)}")
+    return filled_prompt
+
+
+def tailor_combined(model_type, api_key, model, job_description, sections, usage, use_cache=True):
+    """Tailor several sections in one completion
+
+    Returns {section_key: section} holding only the sections that came back
+    present and well-formed.
+    """
+    filled_prompt = fill_tailoring_combined_prompt(job_description, sections)
+    try:
+        usage["calls"] += 1
+        answer, call_usage = chat_completion(
+            model_type, api_key, model, SYSTEM_PROMPT, filled_prompt,
+            use_cache=use_cache, cache_check=is_json_answer, prompt_name="tailor:combined",
+        )
+    except Exception as e:
+        print(f"DEBUG: Error in combined tailoring: {str(e)}")
+        return {}
+    merge_usage(usage, call_usage)
+    return parse_tailored_answer(answer, list(sections), usage)
+
+
+async def atailor_combined(model_type, api_key, model, job_description, sections, usage, use_cache=True):
+    """Coroutine version of tailor_combined"""
+    filled_prompt = fill_tailoring_combined_prompt(job_description, sections)
+    try:
+        usage["calls"] += 1
+        answer, call_usage = await achat_completion(
+            model_type, api_key, model, SYSTEM_PROMPT, filled_prompt,
+            use_cache=use_cache, cache_check=is_json_answer, prompt_name="tailor:combined",
+        )
+    except Exception as e:
+        print(f"DEBUG: Error in combined tailoring: {str(e)}")
+        return {}
+    merge_usage(usage, call_usage)
+    return parse_tailored_answer(answer, list(sections), usage)
+
+
+def parse_tailored_answer(answer, keys, usage):
+    """Return {section_key: section} for the present and well-formed sections of a combined tailoring answer"""
+    try:
+        parsed_answer, repairs = repair_json_text(answer)
+    except SchemaError as e:
+        print(f"DEBUG: JSON parsing error for combined tailoring: {e}")
+        print(f"DEBUG: Raw answer that failed to parse: {answer}")
+        return {}
+
+    if not isinstance(parsed_answer, dict):
+        print(f"DEBUG: Combined tailoring is not a JSON object: {type(parsed_answer).__name__}")
+        return {}
+
+    results = {}
+    for key in keys:
+        if key not in parsed_answer:
+            print(f"DEBUG: Combined tailoring is missing the {key} section")
+            continue
+        try:
+            tailored, section_repairs = normalize_section(key, {key: parsed_answer[key]})
+        except SchemaError as e:
+            print(f"DEBUG: Combined tailoring has an invalid {key} section: {e}")
+            continue
+        repaired = int(is_repaired(repairs + section_repairs))
+        usage["repaired_sections"] += repaired
+        parse_stats.record(sections=1, repaired=repaired)
+        results[key] = tailored[key]
+    return results
+
+
+# Hash of the prompts tailored sections come from, part of every tailored
+# section's cache key so that editing a prompt does not serve stale sections
+TAILORING_PROMPT_VERSION = make_cache_key(SYSTEM_PROMPT, TAILORING_SECTION_PROMPT, TAILORING_COMBINED_PROMPT)
+
+
+def tailoring_cache_key(model_type, model, job_description, section_key, section):
+    """Cache key of one tailored section
+
+    Made of the section's content hash, the normalized job description hash,
+    the model, and the hashes of the tailoring prompts and the section's schema.
+    """
+    return make_cache_key(
+        "tailored-section", TAILORING_PROMPT_VERSION, make_cache_key(schema_interface(section_key)),
+        model_type, model, section_key,
+        make_cache_key(section), make_cache_key(normalize_job_description(job_description)),
+    )
+
+
+def tailor_json_resume(resume_json, job_description, api_key, model="deepseek-chat", model_type="DeepSeek",
+                       mode="sections", max_workers=SECTION_MAX_WORKERS, use_cache=True, return_usage=False):
+    """Tailor a JSON resume to a job description, returning schema-conforming JSON
+
+    Only TAILORED_SECTIONS are rewritten; every other section is copied as is.
+    With mode "sections" each section is tailored in its own call, run
+    concurrently; "combined" tailors them in one call and re-asks only for
+    sections that come back missing or malformed. A section whose tailoring
+    fails, or comes back empty while the original was not, keeps its
+    original content.
+
+    Tailored sections are cached per (section content, whitespace-normalized
+    job description, model), so re-optimizing for a similar posting only
+    regenerates sections whose content changed; usage["cached_sections"]
+    lists the ones served from cache. ``use_cache=False`` regenerates all.
+
+    When ``return_usage`` is set a (resume, usage) tuple is returned.
+    """
+    model_type, model, usage, started, sections, cache_keys, tailored = start_tailoring(
+        resume_json, job_description, model, model_type, mode, use_cache
+    )
+
+    pending = [key for key in sections if key not in tailored]
+    if mode == "combined" and pending:
+        tailored.update(tailor_combined(
+            model_type, api_key, model, job_description, {key: sections[key] for key in pending}, usage, use_cache
+        ))
+        pending = tailoring_fallback_sections(pending, tailored, usage)
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending)))) as executor:
+            futures = {
+                executor.submit(contextvars.copy_context().run, tailor_section, model_type, api_key, model, job_description, key, sections[key], use_cache): key
+                for key in pending
+            }
+            for future in as_completed(futures):
+                key = futures[future]
+                section, section_usage = future.result()
+                merge_usage(usage, section_usage)
+                if section is not None:
+                    tailored[key] = section[key]
+
+    final_json = finish_tailoring(resume_json, sections, cache_keys, tailored, usage, started)
+    if return_usage:
+        return final_json, usage
+    return final_json
+
+
+async def atailor_json_resume(resume_json, job_description, api_key, model="deepseek-chat", model_type="DeepSeek",
+                              mode="sections", max_workers=SECTION_MAX_WORKERS, use_cache=True, return_usage=False):
+    """Coroutine version of tailor_json_resume"""
+    model_type, model, usage, started, sections, cache_keys, tailored = start_tailoring(
+        resume_json, job_description, model, model_type, mode, use_cache
+    )
+
+    pending = [key for key in sections if key not in tailored]
+    if mode == "combined" and pending:
+        tailored.update(await atailor_combined(
+            model_type, api_key, model, job_description, {key: sections[key] for key in pending}, usage, use_cache
+        ))
+        pending = tailoring_fallback_sections(pending, tailored, usage)
+
+    if pending:
+        slots = asyncio.Semaphore(max(1, min(max_workers, len(pending))))
+
+        async def run(key):
+            async with slots:
+                return await atailor_section(model_type, api_key, model, job_description, key, sections[key], use_cache)
+
+        for key, (section, section_usage) in zip(pending, await asyncio.gather(*[run(key) for key in pending])):
+            merge_usage(usage, section_usage)
+            if section is not None:
+                tailored[key] = section[key]
+
+    final_json = finish_tailoring(resume_json, sections, cache_keys, tailored, usage, started)
+    if return_usage:
+        return final_json, usage
+    return final_json
+
+
+def start_tailoring(resume_json, job_description, model, model_type, mode, use_cache):
+    """Validate the mode, resolve the model and look up already tailored sections
+
+    Returns (model_type, model, usage, started, sections, cache_keys, tailored)
+    where tailored holds the sections served from the cache.
+    """
+    if mode not in ("sections", "combined"):
+        raise ValueError(f"Unknown JSON tailoring mode '{mode}'. Available modes: ['sections', 'combined']")
+
+    print(f"DEBUG: Starting JSON resume tailoring with model: {model}, type: {model_type}, mode: {mode}")
+    model_type, model = resolve_model(model_type, model)
+
+    usage = new_usage(mode)
+    started = time.monotonic()
+    usage["cached_sections"] = []
+    sections = {key: resume_json[key] for key in TAILORED_SECTIONS if resume_json.get(key)}
+    cache_keys = {key: tailoring_cache_key(model_type, model, job_description, key, section) for key, section in sections.items()}
+    tailored = {}
+    if use_cache:
+        for key in sections:
+            cached = response_cache.get(cache_keys[key])
+            if cached is not None:
+                tailored[key] = cached
+                usage["cached_sections"].append(key)
+        if usage["cached_sections"]:
+            print(f"DEBUG: Tailored sections served from cache: {usage['cached_sections']}")
+    else:
+        response_cache.record_bypass()
+    return model_type, model, usage, started, sections, cache_keys, tailored
+
+
+def tailoring_fallback_sections(pending, tailored, usage):
+    """Return the sections a combined tailoring call did not deliver"""
+    pending = [key for key in pending if key not in tailored]
+    usage["fallback_sections"] = pending
+    if pending:
+        print(f"DEBUG: Re-asking for tailored sections: {pending}")
+    return pending
+
+
+def finish_tailoring(resume_json, sections, cache_keys, tailored, usage, started):
+    """Merge tailored sections into the resume, cache the fresh ones and close the usage record"""
+    final_json = dict(resume_json)
+    for key in sections:
+        if tailored.get(key):
+            final_json[key] = tailored[key]
+            if key not in usage["cached_sections"]:
+                response_cache.set(cache_keys[key], tailored[key])
+        else:
+            print(f"DEBUG: Keeping the original {key} section")
+            usage["failed_sections"].append(key)
+    finish_usage(usage, started)
+    print(f"DEBUG: JSON tailoring usage: {usage}")
+    return final_json
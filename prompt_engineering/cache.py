@@ -0,0 +1,215 @@
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+import time
+
+# Defaults for the shared LLM response cache, overridable through the environment
+CACHE_DIR = os.environ.get(
+    "LLM_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "llm_cache"),
+)
+CACHE_MEMORY_ENTRIES = int(os.environ.get("LLM_CACHE_MEMORY_ENTRIES", 512))
+CACHE_DISK_MAX_BYTES = int(os.environ.get("LLM_CACHE_DISK_MAX_BYTES", 256 * 1024 * 1024))
+CACHE_TTL_SECONDS = int(os.environ.get("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+
+
+def make_cache_key(*parts):
+    """Hash JSON-serializable parts into a stable hex digest"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier cache: an in-process LRU in front of a size-bounded directory of JSON files
+
+    Entries expire after ``ttl`` seconds in both tiers. The disk tier is pruned
+    (expired entries first, then least recently written) whenever its tracked
+    size goes over ``max_disk_bytes``. Set ``cache_dir`` to None for a
+    memory-only cache.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_memory_entries=CACHE_MEMORY_ENTRIES,
+                 max_disk_bytes=CACHE_DISK_MAX_BYTES, ttl=CACHE_TTL_SECONDS):
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._disk_bytes = None
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "bypassed": 0,
+            "memory_evictions": 0,
+            "disk_evictions": 0,
+        }
+
+    def _count(self, stat, amount=1):
+        with self._lock:
+            self._stats[stat] += amount
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if now - stored_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+        entry = self._read_disk(key, now)
+        if entry is None:
+            self._count("misses")
+            return None
+
+        stored_at, value = entry
+        self._remember(key, stored_at, value)
+        self._count("disk_hits")
+        return value
+
+    def set(self, key, value):
+        """Store a JSON-serializable value under key in both tiers"""
+        stored_at = time.time()
+        self._remember(key, stored_at, value)
+        self._write_disk(key, stored_at, value)
+        self._count("stores")
+
+    def delete(self, key):
+        """Remove key from both tiers"""
+        with self._lock:
+            self._memory.pop(key, None)
+        if self.cache_dir:
+            path = self._entry_path(key)
+            with self._disk_lock:
+                self._remove_file(path)
+
+    def record_bypass(self):
+        """Count a lookup skipped because the caller asked for a fresh result"""
+        self._count("bypassed")
+
+    def _remember(self, key, stored_at, value):
+        with self._lock:
+            self._memory[key] = (stored_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+                self._stats["memory_evictions"] += 1
+
+    def _read_disk(self, key, now):
+        if not self.cache_dir:
+            return None
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        stored_at = entry.get("stored_at", 0)
+        if now - stored_at > self.ttl:
+            with self._disk_lock:
+                self._remove_file(path)
+            return None
+        return stored_at, entry.get("value")
+
+    def _write_disk(self, key, stored_at, value):
+        if not self.cache_dir:
+            return
+        path = self._entry_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            data = json.dumps({"stored_at": stored_at, "value": value}, ensure_ascii=False).encode("utf-8")
+            with self._disk_lock:
+                self._ensure_disk_size()
+                previous = os.path.getsize(path) if os.path.exists(path) else 0
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                self._disk_bytes += len(data) - previous
+                if self._disk_bytes > self.max_disk_bytes:
+                    self._prune_disk()
+        except OSError as e:
+            print(f"DEBUG: Failed to write LLM cache entry {key}: {str(e)}")
+
+    def _ensure_disk_size(self):
+        if self._disk_bytes is None:
+            self._disk_bytes = sum(size for _, _, size in self._scan_disk())
+
+    def _scan_disk(self):
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for filename in files:
+                if not filename.endswith(".json"):
+                    continue
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def _remove_file(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return False
+        if self._disk_bytes is not None:
+            self._disk_bytes -= size
+        return True
+
+    def _prune_disk(self):
+        """Evict expired entries, then the oldest ones, until under 90% of the size bound"""
+        now = time.time()
+        target = self.max_disk_bytes * 0.9
+        entries = sorted(self._scan_disk(), key=lambda entry: entry[1])
+        self._disk_bytes = sum(size for _, _, size in entries)
+
+        remaining = []
+        for path, mtime, size in entries:
+            if now - mtime > self.ttl and self._remove_file(path):
+                self._count("disk_evictions")
+            else:
+                remaining.append((path, mtime, size))
+        for path, _, _ in remaining:
+            if self._disk_bytes <= target:
+                break
+            if self._remove_file(path):
+                self._count("disk_evictions")
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+        if self.cache_dir:
+            with self._disk_lock:
+                for path, _, _ in self._scan_disk():
+                    self._remove_file(path)
+
+    def stats(self):
+        """Return hit/miss counters and tier sizes"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        stats["disk_bytes"] = self._disk_bytes
+        return stats
+
+
+response_cache = ResponseCache()
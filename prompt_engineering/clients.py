@@ -0,0 +1,159 @@
+from collections import OrderedDict
+import asyncio
+import threading
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+# All providers are reached through their OpenAI-compatible endpoints, so one
+# client type (and no process-global SDK configuration) covers every model_type
+PROVIDER_BASE_URLS = {
+    "OpenAI": None,
+    "DeepSeek": "https://api.deepseek.com",
+    "Gemini": "https://generativelanguage.googleapis.com/v1beta/openai/",
+}
+
+DEFAULT_MODEL_TYPE = "DeepSeek"
+DEFAULT_MODEL = "deepseek-chat"
+
+# Keep-alive pool shared by all requests made through one client
+CONNECTION_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60)
+
+# Number of (model_type, api_key, base_url) clients kept around for reuse
+MAX_IDLE_CLIENTS = 64
+
+
+class ClientRegistry:
+    """Thread-safe LRU of OpenAI-compatible clients keyed by (model_type, api_key, base_url)
+
+    Reusing a client reuses its connection pool, so repeated requests with the
+    same key skip the TCP/TLS handshake. Evicted clients are not closed
+    explicitly because another thread may still be using them; their pools are
+    released when the last reference goes away.
+    """
+
+    def __init__(self, max_clients=MAX_IDLE_CLIENTS, limits=CONNECTION_LIMITS):
+        self.max_clients = max_clients
+        self.limits = limits
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model_type, api_key, base_url=None):
+        """Return the pooled client for this provider and key, creating it if needed"""
+        if base_url is None:
+            base_url = PROVIDER_BASE_URLS.get(model_type)
+        key = (model_type, api_key, base_url)
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                return client
+
+            print(f"DEBUG: Creating pooled {model_type} client (base_url={base_url})")
+            client = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=DefaultHttpxClient(limits=self.limits),
+                # Retries are handled by the scheduler, which knows about the key's rate limit
+                max_retries=0,
+            )
+            self._clients[key] = client
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+            return client
+
+    def clear(self):
+        """Drop every pooled client"""
+        with self._lock:
+            self._clients.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._clients)
+
+
+client_registry = ClientRegistry()
+
+
+class AsyncClientRegistry:
+    """LRU of AsyncOpenAI clients keyed by (model_type, api_key, base_url, event loop)
+
+    An async connection pool belongs to the event loop it was opened on, so
+    clients are only shared between coroutines of the same loop. Pooling across
+    requests therefore only works under an ASGI server (``uvicorn
+    asgi:application``), which runs every coroutine view on one long-lived
+    loop. Under ``flask run`` or ``python app.py`` each coroutine view gets a
+    loop of its own, and the app closes that loop's clients with
+    ``aclose_loop`` before the loop ends. Clients of loops that closed without
+    that are dropped unclosed on the next lookup.
+    """
+
+    def __init__(self, max_clients=MAX_IDLE_CLIENTS, limits=CONNECTION_LIMITS):
+        self.max_clients = max_clients
+        self.limits = limits
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model_type, api_key, base_url=None):
+        """Return the pooled async client for this provider, key and running loop"""
+        if base_url is None:
+            base_url = PROVIDER_BASE_URLS.get(model_type)
+        loop = asyncio.get_running_loop()
+        key = (model_type, api_key, base_url, loop)
+
+        with self._lock:
+            for stale in [stale for stale in self._clients if stale[3].is_closed()]:
+                del self._clients[stale]
+
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                return client
+
+            print(f"DEBUG: Creating pooled async {model_type} client (base_url={base_url})")
+            client = AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=DefaultAsyncHttpxClient(limits=self.limits),
+                max_retries=0,
+            )
+            self._clients[key] = client
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+            return client
+
+    async def aclose_loop(self):
+        """Close and drop the clients of the running loop, while it can still close them"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = [self._clients.pop(key) for key in [key for key in self._clients if key[3] is loop]]
+        for client in clients:
+            await client.close()
+
+    def clear(self):
+        """Drop every pooled client"""
+        with self._lock:
+            self._clients.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._clients)
+
+
+async_client_registry = AsyncClientRegistry()
+
+
+def get_client(model_type, api_key, base_url=None):
+    """Return the shared client for model_type and api_key"""
+    return client_registry.get(model_type, api_key, base_url)
+
+
+def get_async_client(model_type, api_key, base_url=None):
+    """Return the shared async client for model_type and api_key on the running event loop"""
+    return async_client_registry.get(model_type, api_key, base_url)
+
+
+async def close_async_clients():
+    """Close the async clients of the running event loop before it ends"""
+    await async_client_registry.aclose_loop()
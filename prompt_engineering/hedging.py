@@ -0,0 +1,299 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+
+# Hedging policy, overridable through the environment. Unset, hedging is on
+# only when a secondary provider is configured: a duplicate sent to the same
+# provider and key mostly adds load to the key that is already slow
+HEDGING_ENABLED = os.environ.get("LLM_HEDGING")
+if HEDGING_ENABLED is not None:
+    HEDGING_ENABLED = HEDGING_ENABLED.lower() not in ("0", "false", "no", "off")
+HEDGE_PERCENTILE = float(os.environ.get("LLM_HEDGE_PERCENTILE", 95))
+HEDGE_MIN_SAMPLES = int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", 20))
+HEDGE_MIN_DELAY_SECONDS = float(os.environ.get("LLM_HEDGE_MIN_DELAY_SECONDS", 2.0))
+# Used until a model has HEDGE_MIN_SAMPLES latencies recorded
+HEDGE_DEFAULT_DELAY_SECONDS = float(os.environ.get("LLM_HEDGE_DEFAULT_DELAY_SECONDS", 20.0))
+HEDGE_POOL_WORKERS = int(os.environ.get("LLM_HEDGE_POOL_WORKERS", 32))
+LATENCY_WINDOW = 200
+
+# Optional secondary provider the hedge is sent to instead of repeating the primary
+HEDGE_MODEL_TYPE = os.environ.get("LLM_HEDGE_MODEL_TYPE")
+HEDGE_MODEL = os.environ.get("LLM_HEDGE_MODEL")
+HEDGE_API_KEY = os.environ.get("LLM_HEDGE_API_KEY")
+
+# Deadline for one LLM call, hedge included
+LLM_TIMEOUT_SECONDS = float(os.environ.get("LLM_TIMEOUT_SECONDS", 90))
+
+
+class LatencyTracker:
+    """Sliding window of successful call latencies per (model_type, model)"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, model_type, model, seconds):
+        with self._lock:
+            samples = self._samples.setdefault((model_type, model), deque(maxlen=self.window))
+            samples.append(seconds)
+
+    def percentile(self, model_type, model, percentile, min_samples=1):
+        """Return the latency at ``percentile`` (0-100), or None with fewer than min_samples"""
+        with self._lock:
+            samples = sorted(self._samples.get((model_type, model), ()))
+        if len(samples) < max(min_samples, 1):
+            return None
+        index = min(len(samples) - 1, math.ceil(percentile / 100 * len(samples)) - 1)
+        return samples[max(index, 0)]
+
+
+class HedgeTimer:
+    """Start hedges once their delay is up, from one thread shared by every call
+
+    A call waiting for its hedge delay holds no worker. ``cancel`` drops a
+    hedge that is no longer needed.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def schedule(self, delay, func):
+        """Run func() on the timer thread in ``delay`` seconds; returns a handle for ``cancel``"""
+        entry = [time.monotonic() + delay, next(self._order), func]
+        with self._cond:
+            heapq.heappush(self._heap, entry)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="llm-hedge-timer", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return entry
+
+    def cancel(self, entry):
+        with self._cond:
+            entry[2] = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._cond.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                _, _, func = heapq.heappop(self._heap)
+            if func is not None:
+                func()
+
+
+class Hedger:
+    """Send a duplicate of a slow LLM call and keep whichever answer arrives first
+
+    The hedge fires once the primary has run longer than the model's recent
+    ``percentile`` latency (never sooner than ``min_delay``). It goes to the
+    configured secondary provider when there is one, otherwise to the primary
+    provider again; unless ``enabled`` says otherwise, hedging is only on with
+    a secondary provider. Every call gets an absolute deadline, which the
+    scheduler's queueing and retries also stop at.
+
+    ``acall`` runs both calls as tasks and cancels the loser. ``call`` runs the
+    primary on the caller's thread and only the hedge on the worker pool.
+    Threads cannot be interrupted, so there the hedge covers a primary that
+    fails or times out, and a hedge that is no longer needed is dropped from
+    the pool's queue or left to stop at the deadline.
+    """
+
+    def __init__(self, enabled=HEDGING_ENABLED, percentile=HEDGE_PERCENTILE, min_samples=HEDGE_MIN_SAMPLES,
+                 min_delay=HEDGE_MIN_DELAY_SECONDS, default_delay=HEDGE_DEFAULT_DELAY_SECONDS,
+                 secondary_model_type=HEDGE_MODEL_TYPE, secondary_model=HEDGE_MODEL,
+                 secondary_api_key=HEDGE_API_KEY, max_workers=HEDGE_POOL_WORKERS):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.default_delay = default_delay
+        self.secondary = None
+        if secondary_model_type and secondary_model and secondary_api_key:
+            self.secondary = (secondary_model_type, secondary_api_key, secondary_model)
+        self.enabled = self.secondary is not None if enabled is None else enabled
+        self.latencies = LatencyTracker()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge")
+        self._timer = HedgeTimer()
+        self._lock = threading.Lock()
+        self._stats = {
+            "calls": 0,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "secondary_hedges": 0,
+            "timeouts": 0,
+        }
+
+    def _record(self, **counts):
+        with self._lock:
+            for stat, amount in counts.items():
+                self._stats[stat] += amount
+
+    def hedge_delay(self, model_type, model):
+        """Return how long to wait on the primary before hedging"""
+        delay = self.latencies.percentile(model_type, model, self.percentile, self.min_samples)
+        if delay is None:
+            delay = self.default_delay
+        return max(delay, self.min_delay)
+
+    def hedge_target(self, model_type, api_key, model):
+        """Return the (model_type, api_key, model) a hedge for this call is sent to"""
+        if self.secondary is not None and self.secondary[0] != model_type:
+            return self.secondary
+        return model_type, api_key, model
+
+    def _timed(self, send, target, deadline):
+        started = time.monotonic()
+        result = send(*target, deadline)
+        self.latencies.record(target[0], target[2], time.monotonic() - started)
+        return result
+
+    async def _atimed(self, send, target, deadline):
+        started = time.monotonic()
+        result = await send(*target, deadline)
+        self.latencies.record(target[0], target[2], time.monotonic() - started)
+        return result
+
+    def _timed_out(self, model_type, model, timeout):
+        self._record(timeouts=1)
+        return TimeoutError(f"{model_type}/{model} call did not finish within {timeout:g}s")
+
+    def call(self, model_type, api_key, model, send, timeout=LLM_TIMEOUT_SECONDS):
+        """Run send(model_type, api_key, model, deadline) with hedging and an overall deadline
+
+        ``deadline`` is the time.monotonic() time the call has to finish by.
+        Returns (result, info) where info holds "hedged" and "hedge_wins"
+        (0 or 1) and "model_type", the provider whose answer won. Raises
+        TimeoutError when no call finished within ``timeout`` seconds, or the
+        primary's error when every call failed.
+        """
+        self._record(calls=1)
+        primary_target = (model_type, api_key, model)
+        deadline = time.monotonic() + timeout
+        if not self.enabled:
+            try:
+                return self._timed(send, primary_target, deadline), {"hedged": 0, "hedge_wins": 0, "model_type": model_type}
+            except Exception:
+                if time.monotonic() >= deadline:
+                    raise self._timed_out(model_type, model, timeout)
+                raise
+
+        lock = threading.Lock()
+        hedge = {"future": None, "target": None, "closed": False}
+
+        def start_hedge():
+            with lock:
+                if hedge["closed"]:
+                    return
+                target = self.hedge_target(model_type, api_key, model)
+                print(f"DEBUG: {model_type}/{model} call still running, hedging to {target[0]}/{target[2]}")
+                self._record(hedges=1, secondary_hedges=int(target != primary_target))
+                hedge["target"] = target
+                hedge["future"] = self._executor.submit(self._timed, send, target, deadline)
+
+        timer = self._timer.schedule(min(self.hedge_delay(model_type, model), timeout), start_hedge)
+        primary_error = None
+        try:
+            result = self._timed(send, primary_target, deadline)
+        except Exception as e:
+            print(f"DEBUG: Primary LLM call failed: {str(e)}")
+            primary_error = e
+        self._timer.cancel(timer)
+        with lock:
+            hedge["closed"] = True
+        future = hedge["future"]
+
+        if primary_error is None:
+            if future is not None:
+                future.cancel()
+            return result, {"hedged": int(future is not None), "hedge_wins": 0, "model_type": model_type}
+        if future is None:
+            if time.monotonic() >= deadline:
+                raise self._timed_out(model_type, model, timeout)
+            raise primary_error
+
+        try:
+            result = future.result(timeout=max(deadline - time.monotonic(), 0.0))
+        except FutureTimeoutError:
+            future.cancel()
+            raise self._timed_out(model_type, model, timeout)
+        except Exception as e:
+            print(f"DEBUG: Hedged LLM call failed: {str(e)}")
+            if time.monotonic() >= deadline:
+                raise self._timed_out(model_type, model, timeout)
+            raise primary_error
+        self._record(hedge_wins=1)
+        return result, {"hedged": 1, "hedge_wins": 1, "model_type": hedge["target"][0]}
+
+    async def acall(self, model_type, api_key, model, send, timeout=LLM_TIMEOUT_SECONDS):
+        """Await send(model_type, api_key, model, deadline) with hedging and an overall deadline
+
+        The coroutine counterpart of ``call``: ``send`` returns an awaitable,
+        the result and errors are the same, and whichever call loses is
+        cancelled instead of left running.
+        """
+        self._record(calls=1)
+        primary_target = (model_type, api_key, model)
+        deadline = time.monotonic() + timeout
+        primary = asyncio.ensure_future(self._atimed(send, primary_target, deadline))
+        pending = {primary: None}
+        hedged = 0
+
+        try:
+            if self.enabled:
+                done, _ = await asyncio.wait([primary], timeout=min(self.hedge_delay(model_type, model), timeout))
+                if not done:
+                    target = self.hedge_target(model_type, api_key, model)
+                    print(f"DEBUG: {model_type}/{model} call still running, hedging to {target[0]}/{target[2]}")
+                    self._record(hedges=1, secondary_hedges=int(target != primary_target))
+                    hedged = 1
+                    pending[asyncio.ensure_future(self._atimed(send, target, deadline))] = target
+
+            first_error = None
+            while pending:
+                done, _ = await asyncio.wait(list(pending), timeout=max(deadline - time.monotonic(), 0.0),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break
+                for task in done:
+                    target = pending.pop(task)
+                    error = task.exception()
+                    if error is not None:
+                        print(f"DEBUG: {'Hedged' if target else 'Primary'} LLM call failed: {str(error)}")
+                        if task is primary or first_error is None:
+                            first_error = error
+                        continue
+                    if target is not None:
+                        self._record(hedge_wins=1)
+                    return task.result(), {
+                        "hedged": hedged,
+                        "hedge_wins": int(target is not None),
+                        "model_type": (target or primary_target)[0],
+                    }
+
+            if first_error is not None and not pending and time.monotonic() < deadline:
+                raise first_error
+            raise self._timed_out(model_type, model, timeout)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self):
+        """Return hedge and deadline counters"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["enabled"] = self.enabled
+        stats["secondary_model_type"] = self.secondary[0] if self.secondary else None
+        return stats
+
+
+hedger = Hedger()
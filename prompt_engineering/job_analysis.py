@@ -0,0 +1,227 @@
+import json
+import os
+
+from doc_utils import normalize_job_description
+
+from . import clean_json_answer, is_json_answer
+from .cache import CACHE_DIR, ResponseCache, make_cache_key
+from .llm import achat_completion, chat_completion
+from .providers import supports_json_mode
+from .singleflight import SingleFlight
+
+# Job description analyses are shared by every endpoint, user and model, so
+# they live in their own cache with their own lifetime
+JOB_ANALYSIS_CACHE_DIR = os.environ.get(
+    "JOB_ANALYSIS_CACHE_DIR", os.path.join(os.path.dirname(CACHE_DIR), "job_analysis_cache")
+)
+JOB_ANALYSIS_TTL_SECONDS = int(os.environ.get("JOB_ANALYSIS_TTL_SECONDS", 24 * 3600))
+
+# Postings shorter than this are sent as they are; the analysis would not be much shorter
+JOB_ANALYSIS_MIN_CHARS = int(os.environ.get("JOB_ANALYSIS_MIN_CHARS", 1200))
+
+# Items kept per list and characters kept per value of an analysis
+JOB_ANALYSIS_MAX_ITEMS = 12
+JOB_ANALYSIS_MAX_CHARS = 160
+
+JOB_ANALYSIS_SYSTEM_PROMPT = "You are an expert technical recruiter. You will reply with JSON only."
+
+JOB_ANALYSIS_PROMPT = """
+Extract what a resume and a cover letter for the job below have to address. Reply with this JSON object:
+{
+    "title": "job title",
+    "company": "hiring company, or an empty string",
+    "seniority": "one of intern, junior, mid, senior, lead, manager, executive",
+    "required_skills": ["skill1", "skill2"],
+    "preferred_skills": ["skill1", "skill2"],
+    "keywords": ["keyword1", "keyword2"],
+    "responsibilities": ["short responsibility 1", "short responsibility 2"]
+}
+Use the posting's own wording, keep every item short and list at most 12 items per field. Leave out benefits, salary, equal opportunity statements and application instructions.
+
+Job description:
+<JOB_DESCRIPTION>
+"""
+
+JOB_ANALYSIS_FIELDS = ("title", "company", "seniority")
+JOB_ANALYSIS_LISTS = ("required_skills", "preferred_skills", "keywords", "responsibilities")
+
+# Labels of the compact text sent to downstream prompts
+JOB_ANALYSIS_LABELS = {
+    "title": "Title",
+    "company": "Company",
+    "seniority": "Seniority",
+    "required_skills": "Required skills",
+    "preferred_skills": "Preferred skills",
+    "keywords": "Keywords",
+    "responsibilities": "Responsibilities",
+}
+
+job_analysis_cache = ResponseCache(cache_dir=JOB_ANALYSIS_CACHE_DIR, ttl=JOB_ANALYSIS_TTL_SECONDS)
+
+# Concurrent requests for the same new posting share one analysis call
+job_analysis_flights = SingleFlight()
+
+
+def job_analysis_key(job_description):
+    """Return the cache key of a posting: the hash of its normalized text"""
+    return make_cache_key("job-analysis", normalize_job_description(job_description))
+
+
+def fill_job_analysis_prompt(job_description):
+    return JOB_ANALYSIS_PROMPT.replace("<JOB_DESCRIPTION>", job_description)
+
+
+def job_analysis_params(model_type):
+    if supports_json_mode(model_type):
+        return {"temperature": 0, "response_format": {"type": "json_object"}}
+    return {"temperature": 0}
+
+
+def parse_job_analysis(answer):
+    """Return the analysis in an answer with its fields cleaned and capped, or None if it has none"""
+    try:
+        data = json.loads(clean_json_answer(answer))
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    analysis = {}
+    for field in JOB_ANALYSIS_FIELDS:
+        value = data.get(field)
+        analysis[field] = str(value).strip()[:JOB_ANALYSIS_MAX_CHARS] if value else ""
+    for field in JOB_ANALYSIS_LISTS:
+        values = data.get(field)
+        if isinstance(values, str):
+            values = [values]
+        if not isinstance(values, list):
+            values = []
+        items = [str(value).strip()[:JOB_ANALYSIS_MAX_CHARS] for value in values if str(value).strip()]
+        analysis[field] = list(dict.fromkeys(items))[:JOB_ANALYSIS_MAX_ITEMS]
+
+    if not analysis["title"] and not any(analysis[field] for field in JOB_ANALYSIS_LISTS):
+        return None
+    return analysis
+
+
+def format_job_analysis(analysis):
+    """Render an analysis as the compact job description text downstream prompts get"""
+    lines = []
+    for field in JOB_ANALYSIS_FIELDS:
+        if analysis.get(field):
+            lines.append(f"{JOB_ANALYSIS_LABELS[field]}: {analysis[field]}")
+    for field in JOB_ANALYSIS_LISTS:
+        if not analysis.get(field):
+            continue
+        if field == "responsibilities":
+            lines.append(f"{JOB_ANALYSIS_LABELS[field]}:")
+            lines.extend(f"- {item}" for item in analysis[field])
+        else:
+            lines.append(f"{JOB_ANALYSIS_LABELS[field]}: {', '.join(analysis[field])}")
+    return "\n".join(lines)
+
+
+def cached_job_analysis(key, use_cache):
+    if not use_cache:
+        job_analysis_cache.record_bypass()
+        return None
+    return job_analysis_cache.get(key)
+
+
+def analyze_job_description(job_description, api_key, model="deepseek-chat", model_type="DeepSeek", use_cache=True):
+    """Return (analysis, cached) for a posting, or (None, False) if the answer had no analysis
+
+    The analysis (title, company, seniority, skills, keywords and
+    responsibilities) is cached under the normalized posting's hash for
+    JOB_ANALYSIS_TTL_SECONDS, whichever endpoint, key or model asked first.
+    """
+    key = job_analysis_key(job_description)
+    analysis = cached_job_analysis(key, use_cache)
+    if analysis is not None:
+        return analysis, True
+
+    def analyze():
+        answer, _ = chat_completion(
+            model_type, api_key, model, JOB_ANALYSIS_SYSTEM_PROMPT, fill_job_analysis_prompt(job_description),
+            use_cache=use_cache, cache_check=is_json_answer, prompt_name="job_analysis",
+            **job_analysis_params(model_type)
+        )
+        result = parse_job_analysis(answer)
+        if result is not None:
+            job_analysis_cache.set(key, result)
+        return result
+
+    analysis, coalesced = job_analysis_flights.do(key, analyze)
+    return analysis, coalesced and analysis is not None
+
+
+async def aanalyze_job_description(job_description, api_key, model="deepseek-chat", model_type="DeepSeek", use_cache=True):
+    """Coroutine version of analyze_job_description"""
+    key = job_analysis_key(job_description)
+    analysis = cached_job_analysis(key, use_cache)
+    if analysis is not None:
+        return analysis, True
+
+    async def analyze():
+        answer, _ = await achat_completion(
+            model_type, api_key, model, JOB_ANALYSIS_SYSTEM_PROMPT, fill_job_analysis_prompt(job_description),
+            use_cache=use_cache, cache_check=is_json_answer, prompt_name="job_analysis",
+            **job_analysis_params(model_type)
+        )
+        result = parse_job_analysis(answer)
+        if result is not None:
+            job_analysis_cache.set(key, result)
+        return result
+
+    analysis, coalesced = await job_analysis_flights.ado(key, analyze)
+    return analysis, coalesced and analysis is not None
+
+
+def skipped_job_context(job_description, reason):
+    return job_description, {"used": False, "reason": reason, "job_description_chars": len(job_description)}
+
+
+def finish_job_context(job_description, analysis, cached):
+    if analysis is None:
+        return skipped_job_context(job_description, "no_analysis")
+    context = format_job_analysis(analysis)
+    return context, {
+        "used": True,
+        "cached": cached,
+        "job_description_chars": len(job_description),
+        "context_chars": len(context),
+        "analysis": analysis,
+    }
+
+
+def job_description_context(job_description, api_key, model="deepseek-chat", model_type="DeepSeek", use_cache=True, enabled=True):
+    """Return (text, report): the job description text to put in prompts and how it was chosen
+
+    The text is the compact analysis of the posting when ``enabled`` and the
+    posting has at least JOB_ANALYSIS_MIN_CHARS characters, and the posting
+    itself otherwise, including when the analysis call fails.
+    """
+    if not enabled:
+        return skipped_job_context(job_description, "disabled")
+    if len(job_description) < JOB_ANALYSIS_MIN_CHARS:
+        return skipped_job_context(job_description, "short")
+    try:
+        analysis, cached = analyze_job_description(job_description, api_key, model, model_type, use_cache)
+    except Exception as e:
+        print(f"DEBUG: Job description analysis failed, using the full posting: {str(e)}")
+        return skipped_job_context(job_description, "failed")
+    return finish_job_context(job_description, analysis, cached)
+
+
+async def ajob_description_context(job_description, api_key, model="deepseek-chat", model_type="DeepSeek", use_cache=True, enabled=True):
+    """Coroutine version of job_description_context"""
+    if not enabled:
+        return skipped_job_context(job_description, "disabled")
+    if len(job_description) < JOB_ANALYSIS_MIN_CHARS:
+        return skipped_job_context(job_description, "short")
+    try:
+        analysis, cached = await aanalyze_job_description(job_description, api_key, model, model_type, use_cache)
+    except Exception as e:
+        print(f"DEBUG: Job description analysis failed, using the full posting: {str(e)}")
+        return skipped_job_context(job_description, "failed")
+    return finish_job_context(job_description, analysis, cached)
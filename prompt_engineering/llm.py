@@ -0,0 +1,165 @@
+import time
+
+from .cache import make_cache_key, response_cache
+from .hedging import LLM_TIMEOUT_SECONDS, hedger
+from .providers import get_backend
+from .scheduler import remaining_seconds, scheduler
+from .telemetry import call_cost, telemetry
+
+
+def get_cached_tokens(usage):
+    """Return the prompt tokens served from the provider's prompt cache
+
+    OpenAI (and Gemini's compatible endpoint) report them under
+    prompt_tokens_details.cached_tokens, DeepSeek as prompt_cache_hit_tokens.
+    """
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", None)
+    if cached_tokens is None:
+        cached_tokens = getattr(usage, "prompt_cache_hit_tokens", None)
+    return cached_tokens or 0
+
+
+def get_response_usage(response):
+    """Return the token usage reported by a chat completion response"""
+    usage = getattr(response, "usage", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "total_tokens": getattr(usage, "total_tokens", 0) or 0,
+        "cached_tokens": get_cached_tokens(usage),
+        "cache_hits": 0,
+        "queue_wait_seconds": 0.0,
+        "retries": 0,
+        "hedged": 0,
+        "hedge_wins": 0,
+        "cost_usd": 0.0,
+    }
+
+
+def _cached_completion(key, model_type, model, use_cache, prompt_name, started):
+    """Return (answer, usage) for a cached answer, or None when the call has to be sent"""
+    if not use_cache:
+        response_cache.record_bypass()
+        return None
+    answer = response_cache.get(key)
+    if answer is None:
+        return None
+    print(f"DEBUG: LLM cache hit for {model_type}/{model} ({key[:12]})")
+    usage = get_response_usage(None)
+    usage["cache_hits"] = 1
+    telemetry.record(model_type, model, prompt_name, time.monotonic() - started, usage)
+    return answer, usage
+
+
+def _finish_completion(key, model_type, model, response, schedule, hedge, cache_check, prompt_name, started):
+    """Cache a fresh answer, record its telemetry and return (answer, usage)"""
+    answer = response.choices[0].message.content or ""
+    if hedge["model_type"] == model_type and (cache_check is None or cache_check(answer)):
+        response_cache.set(key, answer)
+    usage = get_response_usage(response)
+    usage.update(schedule)
+    usage["hedged"] = hedge["hedged"]
+    usage["hedge_wins"] = hedge["hedge_wins"]
+    usage["cost_usd"] = call_cost(model, usage) or 0.0
+    telemetry.record(model_type, model, prompt_name, time.monotonic() - started, usage)
+    return answer, usage
+
+
+def _failed_completion(model_type, model, prompt_name, started):
+    telemetry.record(model_type, model, prompt_name, time.monotonic() - started, error=True)
+
+
+def chat_completion(model_type, api_key, model, system_prompt, user_prompt, use_cache=True, cache_check=None, timeout=None, prompt_name=None, **params):
+    """Send one chat completion through the model_type's backend and the response cache
+
+    The cache key covers the provider, model, both prompts and any sampling
+    parameters (temperature, response_format, ...). ``use_cache=False`` skips
+    the lookup for callers that explicitly want a fresh generation; the fresh
+    answer still replaces the cached one. ``cache_check`` can veto caching an
+    answer, e.g. one that does not parse as JSON.
+
+    Provider calls go through the shared scheduler, which rate-limits them per
+    API key and retries rate limits and transient errors with backoff. A call
+    slower than the model's recent tail latency is hedged (see Hedger), and
+    ``timeout`` (default LLM_TIMEOUT_SECONDS) bounds the whole call; answers
+    from a secondary hedge provider are returned but not cached under the
+    primary's key. Backends that are not rate limited (the mock) skip the
+    scheduler.
+
+    ``prompt_name`` names the prompt being sent (e.g. "extract:work"); it is
+    not part of the cache key, and the mock backend picks its answer by it.
+
+    Returns an (answer, usage) tuple; cache hits report zero tokens. usage also
+    holds the seconds the call spent queued, the retries it needed, whether
+    it was hedged and its cost. Every call, cache hit and failure is recorded
+    in the telemetry under the current endpoint and ``prompt_name``.
+    """
+    if timeout is None:
+        timeout = LLM_TIMEOUT_SECONDS
+    started = time.monotonic()
+    key = make_cache_key(model_type, model, system_prompt, user_prompt, params)
+    cached = _cached_completion(key, model_type, model, use_cache, prompt_name, started)
+    if cached is not None:
+        return cached
+
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+    def send(target_type, target_key, target_model, deadline):
+        backend = get_backend(target_type)
+
+        def create():
+            # Time spent queued and retrying comes out of the call's deadline
+            return backend.create(target_type, target_key, target_model, messages, remaining_seconds(deadline), prompt_name=prompt_name, **params)
+
+        if not backend.rate_limited:
+            return create(), {"queue_wait_seconds": 0.0, "retries": 0}
+        return scheduler.call(target_type, target_key, create, deadline)
+
+    try:
+        (response, schedule), hedge = hedger.call(model_type, api_key, model, send, timeout)
+    except Exception:
+        _failed_completion(model_type, model, prompt_name, started)
+        raise
+    return _finish_completion(key, model_type, model, response, schedule, hedge, cache_check, prompt_name, started)
+
+
+async def achat_completion(model_type, api_key, model, system_prompt, user_prompt, use_cache=True, cache_check=None, timeout=None, prompt_name=None, **params):
+    """Coroutine version of chat_completion using the backends' async calls
+
+    Shares the response cache, the per-key scheduler limits and the hedging
+    policy with chat_completion, but waits on the event loop instead of
+    holding a thread for the duration of the call.
+    """
+    if timeout is None:
+        timeout = LLM_TIMEOUT_SECONDS
+    started = time.monotonic()
+    key = make_cache_key(model_type, model, system_prompt, user_prompt, params)
+    cached = _cached_completion(key, model_type, model, use_cache, prompt_name, started)
+    if cached is not None:
+        return cached
+
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+    async def send(target_type, target_key, target_model, deadline):
+        backend = get_backend(target_type)
+
+        def create():
+            return backend.acreate(target_type, target_key, target_model, messages, remaining_seconds(deadline), prompt_name=prompt_name, **params)
+
+        if not backend.rate_limited:
+            return await create(), {"queue_wait_seconds": 0.0, "retries": 0}
+        return await scheduler.acall(target_type, target_key, create, deadline)
+
+    try:
+        (response, schedule), hedge = await hedger.acall(model_type, api_key, model, send, timeout)
+    except Exception:
+        _failed_completion(model_type, model, prompt_name, started)
+        raise
+    return _finish_completion(key, model_type, model, response, schedule, hedge, cache_check, prompt_name, started)
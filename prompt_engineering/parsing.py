@@ -0,0 +1,265 @@
+import json
+import re
+import threading
+
+# Item fields of each JSON resume section, mirroring the TypeScript interfaces
+# in the section prompts ("string" or "string[]")
+SECTION_SCHEMAS = {
+    "basics": {
+        "name": "string",
+        "email": "string",
+        "phone": "string",
+        "website": "string",
+        "address": "string",
+    },
+    "education": {
+        "institution": "string",
+        "area": "string",
+        "additionalAreas": "string[]",
+        "studyType": "string",
+        "startDate": "string",
+        "endDate": "string",
+        "score": "string",
+        "location": "string",
+    },
+    "awards": {
+        "title": "string",
+        "date": "string",
+        "awarder": "string",
+        "summary": "string",
+    },
+    "projects": {
+        "name": "string",
+        "description": "string",
+        "keywords": "string[]",
+        "url": "string",
+    },
+    "skills": {
+        "name": "string",
+        "keywords": "string[]",
+    },
+    "work": {
+        "company": "string",
+        "position": "string",
+        "startDate": "string",
+        "endDate": "string",
+        "location": "string",
+        "highlights": "string[]",
+    },
+}
+
+# Sections whose value is a single object rather than a list of items
+OBJECT_SECTIONS = {"basics"}
+
+FENCE_PATTERN = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+TRAILING_COMMA_PATTERN = re.compile(r",(\s*[}\]])")
+
+
+# Repairs needed by nearly every answer, not counted as repaired output
+ROUTINE_REPAIRS = {"fences"}
+
+
+def is_repaired(repairs):
+    """Check whether repairs go beyond the routine ones"""
+    return any(repair not in ROUTINE_REPAIRS for repair in repairs)
+
+
+class SchemaError(ValueError):
+    """Raised when an LLM answer cannot be repaired into a valid section"""
+
+
+def repair_json_text(answer):
+    """Parse JSON out of an LLM answer, fixing common defects
+
+    Handles markdown fences (anywhere in the answer), prose around the JSON
+    value and trailing commas. Returns (value, repairs) where repairs lists
+    the fixes that were needed; raises SchemaError if nothing parses.
+    """
+    repairs = []
+    text = (answer or "").strip()
+
+    match = FENCE_PATTERN.search(text)
+    if match:
+        text = match.group(1).strip()
+        repairs.append("fences")
+    elif text.startswith("```"):
+        # Unterminated fence from a truncated answer
+        text = text.lstrip("`").strip()
+        if text[:4].lower() == "json":
+            text = text[4:].strip()
+        repairs.append("fences")
+
+    try:
+        return json.loads(text), repairs
+    except ValueError:
+        pass
+
+    starts = [index for index in (text.find("{"), text.find("[")) if index >= 0]
+    if starts:
+        start = min(starts)
+        end = max(text.rfind("}"), text.rfind("]"))
+        if end > start and (start > 0 or end < len(text) - 1):
+            text = text[start:end + 1]
+            repairs.append("surrounding_text")
+
+    fixed = TRAILING_COMMA_PATTERN.sub(r"\1", text)
+    if fixed != text:
+        text = fixed
+        repairs.append("trailing_commas")
+
+    try:
+        return json.loads(text), repairs
+    except ValueError as e:
+        raise SchemaError(f"Answer is not valid JSON: {e}")
+
+
+def _coerce_field(value, kind):
+    """Return (value, changed) with value coerced to a schema field type"""
+    if kind == "string":
+        if isinstance(value, str):
+            return value, False
+        if value is None:
+            return "", True
+        if isinstance(value, list):
+            return ", ".join(str(item) for item in value if item is not None), True
+        if isinstance(value, dict):
+            return json.dumps(value, ensure_ascii=False), True
+        return str(value), True
+
+    if isinstance(value, list):
+        items = [item if isinstance(item, str) else str(item) for item in value if item is not None]
+        return items, items != value
+    if value is None:
+        return [], True
+    if isinstance(value, str):
+        # Bulleted or line-separated text instead of a list
+        items = [item.strip(" •-*\t") for item in value.splitlines()]
+        return [item for item in items if item], True
+    return [str(value)], True
+
+
+def _coerce_item(section_key, item):
+    """Return (item, changed) with the item's known fields coerced to their schema types"""
+    schema = SECTION_SCHEMAS[section_key]
+    changed = False
+    item = dict(item)
+    for field, kind in schema.items():
+        if field in item:
+            item[field], field_changed = _coerce_field(item[field], kind)
+            changed = changed or field_changed
+    return item, changed
+
+
+def normalize_section(section_key, value):
+    """Validate a parsed answer against a section schema, unwrapping and coercing where possible
+
+    Accepts {section_key: value}, the bare value (e.g. a basics object without
+    the "basics" key, or a single item instead of a list) and single-key
+    wrappers such as {"resume": {"work": [...]}}. Returns
+    ({section_key: value}, repairs); raises SchemaError when the value does
+    not have the section's shape.
+    """
+    repairs = []
+    schema = SECTION_SCHEMAS[section_key]
+
+    if isinstance(value, dict) and section_key not in value and len(value) == 1:
+        inner = next(iter(value.values()))
+        if isinstance(inner, dict) and section_key in inner:
+            value = inner
+            repairs.append("wrapped")
+    if isinstance(value, dict) and section_key in value:
+        value = value[section_key]
+    elif isinstance(value, dict) and any(field in value for field in schema):
+        # The bare section object, e.g. basics without its "basics" key
+        repairs.append("wrapped")
+        if section_key not in OBJECT_SECTIONS:
+            value = [value]
+
+    if section_key in OBJECT_SECTIONS:
+        if isinstance(value, list) and len(value) == 1 and isinstance(value[0], dict):
+            value = value[0]
+            repairs.append("wrapped")
+        if not isinstance(value, dict) or not value:
+            raise SchemaError(f"{section_key} must be a non-empty object")
+        if not any(field in value for field in schema):
+            raise SchemaError(f"{section_key} has none of the fields {list(schema)}")
+        value, changed = _coerce_item(section_key, value)
+        if changed:
+            repairs.append("coerced")
+        return {section_key: value}, repairs
+
+    if not isinstance(value, list):
+        raise SchemaError(f"{section_key} must be a list, got {type(value).__name__}")
+
+    items = []
+    for item in value:
+        if not isinstance(item, dict):
+            if "dropped_items" not in repairs:
+                repairs.append("dropped_items")
+            continue
+        item, changed = _coerce_item(section_key, item)
+        if changed and "coerced" not in repairs:
+            repairs.append("coerced")
+        items.append(item)
+    if value and not items:
+        raise SchemaError(f"{section_key} has no object items")
+    return {section_key: items}, repairs
+
+
+def parse_section(section_key, answer):
+    """Parse and validate an LLM answer for one section; returns (section, repairs)"""
+    value, repairs = repair_json_text(answer)
+    section, section_repairs = normalize_section(section_key, value)
+    return section, repairs + section_repairs
+
+
+def schema_interface(section_key):
+    """Render a section schema as the TypeScript interfaces used in the prompts"""
+    name = section_key.capitalize()
+    fields = "\n".join(f"    {field}: {kind};" for field, kind in SECTION_SCHEMAS[section_key].items())
+    if section_key in OBJECT_SECTIONS:
+        return f"interface {name} {{\n{fields}\n}}"
+    return (
+        f"interface {name}Item {{\n{fields}\n}}\n\n"
+        f"interface {name} {{\n    {section_key}: {name}Item[];\n}}"
+    )
+
+
+def is_valid_section_answer(section_key, answer):
+    """Check whether an answer can be parsed into a valid section"""
+    try:
+        parse_section(section_key, answer)
+        return True
+    except SchemaError:
+        return False
+
+
+class ParseStats:
+    """Thread-safe counters of section parses, repairs and targeted retries"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {
+            "sections": 0,
+            "repaired": 0,
+            "retried": 0,
+            "retry_succeeded": 0,
+            "failed": 0,
+        }
+
+    def record(self, **counts):
+        with self._lock:
+            for stat, amount in counts.items():
+                self._stats[stat] += amount
+
+    def stats(self):
+        """Return the counters with repair, retry and failure rates"""
+        with self._lock:
+            stats = dict(self._stats)
+        sections = stats["sections"]
+        for stat in ("repaired", "retried", "failed"):
+            stats[f"{stat}_rate"] = round(stats[stat] / sections, 4) if sections else 0.0
+        return stats
+
+
+parse_stats = ParseStats()
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import os
+import time
+
+from openai.types import CompletionUsage
+from openai.types.chat import ChatCompletion, ChatCompletionMessage
+from openai.types.chat.chat_completion import Choice
+
+from .clients import DEFAULT_MODEL, DEFAULT_MODEL_TYPE, PROVIDER_BASE_URLS, get_async_client, get_client
+from .parsing import OBJECT_SECTIONS, SECTION_SCHEMAS
+
+# Seconds every mock completion takes, overridable through the environment
+MOCK_LATENCY_SECONDS = float(os.environ.get("MOCK_LLM_LATENCY_SECONDS", 0.0))
+
+
+class ProviderBackend:
+    """Sends chat completions for one model_type
+
+    ``create`` and ``acreate`` return an OpenAI ChatCompletion. ``json_mode``
+    says whether the backend accepts response_format={"type": "json_object"},
+    and ``rate_limited`` whether its calls go through the per-key scheduler.
+    """
+
+    json_mode = False
+    rate_limited = True
+
+    def create(self, model_type, api_key, model, messages, timeout, prompt_name=None, **params):
+        raise NotImplementedError
+
+    async def acreate(self, model_type, api_key, model, messages, timeout, prompt_name=None, **params):
+        raise NotImplementedError
+
+
+class OpenAICompatibleBackend(ProviderBackend):
+    """A provider reached through an OpenAI-compatible endpoint with the pooled clients"""
+
+    def __init__(self, json_mode=True):
+        self.json_mode = json_mode
+
+    def create(self, model_type, api_key, model, messages, timeout, prompt_name=None, **params):
+        client = get_client(model_type, api_key)
+        return client.chat.completions.create(model=model, messages=messages, timeout=timeout, **params)
+
+    async def acreate(self, model_type, api_key, model, messages, timeout, prompt_name=None, **params):
+        client = get_async_client(model_type, api_key)
+        return await client.chat.completions.create(model=model, messages=messages, timeout=timeout, **params)
+
+
+def mock_section(section_key):
+    """Return a schema-valid placeholder value for one JSON resume section"""
+    item = {
+        field: [f"Mock {field} {index}" for index in (1, 2)] if kind == "string[]" else f"Mock {field}"
+        for field, kind in SECTION_SCHEMAS[section_key].items()
+    }
+    if section_key == "basics":
+        item.update(name="Jane Mock", email="jane.mock@example.com", phone="+1 555 010 0000")
+    return item if section_key in OBJECT_SECTIONS else [item]
+
+
+MOCK_ANALYSIS = {
+    "match_score": 72,
+    "strengths": ["Relevant experience", "Matching core skills", "Clear impact statements"],
+    "gaps": ["No cloud certification", "Limited leadership examples"],
+    "suggestions": ["Quantify results", "Mention the job's main tools", "Lead with the most relevant role"],
+    "keyword_analysis": {
+        "missing_keywords": ["Kubernetes"],
+        "present_keywords": ["Python", "SQL"],
+        "keyword_density_score": 64,
+    },
+    "section_recommendations": {
+        "skills": "Group skills by the job's requirements",
+        "experience": "Add metrics to each bullet",
+        "education": "Keep as is",
+    },
+}
+
+MOCK_ENHANCEMENT = {
+    "enhanced_summary": "Engineer with a record of shipping reliable services.",
+    "enhanced_skills": ["Python", "SQL", "Docker"],
+    "enhanced_experience_bullets": [
+        "Cut API latency by 40% by caching hot queries",
+        "Shipped a billing service used by 2M customers",
+        "Mentored three engineers through their first releases",
+    ],
+    "cover_letter_outline": {
+        "opening": "Why this role and company",
+        "body": "Most relevant experience and results",
+        "closing": "Call to action",
+    },
+}
+
+MOCK_JOB_ANALYSIS = {
+    "title": "Backend Engineer",
+    "company": "Mock Corp",
+    "seniority": "senior",
+    "required_skills": ["Python", "SQL", "Docker"],
+    "preferred_skills": ["Kubernetes"],
+    "keywords": ["APIs", "microservices", "PostgreSQL"],
+    "responsibilities": ["Build and run backend services", "Review code and mentor engineers"],
+}
+
+MOCK_COVER_LETTER = "\n\n".join([
+    "I am excited to apply for this position, which matches the work I have been doing for the past years.",
+    "In my current role I have delivered projects end to end, working closely with product and engineering teams.",
+    "I would welcome the opportunity to discuss how my experience can help your team reach its goals.",
+])
+
+
+class MockBackend(ProviderBackend):
+    """In-process backend answering with canned, schema-valid content after a fixed latency
+
+    The answer depends only on ``prompt_name`` (see chat_completion), so runs
+    are deterministic and need neither a network nor a valid API key. Calls
+    skip the scheduler, which only exists to respect real providers' limits.
+    """
+
+    json_mode = True
+    rate_limited = False
+
+    def __init__(self, latency=MOCK_LATENCY_SECONDS):
+        self.latency = latency
+
+    def answer(self, prompt_name, user_prompt):
+        """Return the canned answer for a prompt"""
+        kind, _, section_key = (prompt_name or "").partition(":")
+        if section_key in SECTION_SCHEMAS:
+            return json.dumps({section_key: mock_section(section_key)})
+        if section_key == "combined":
+            return json.dumps({key: mock_section(key) for key in SECTION_SCHEMAS})
+        if prompt_name == "tailor:text":
+            return user_prompt
+        if prompt_name == "cover_letter":
+            return MOCK_COVER_LETTER
+        if prompt_name == "ai_analysis":
+            return json.dumps(MOCK_ANALYSIS)
+        if prompt_name == "ai_enhancement":
+            return json.dumps(MOCK_ENHANCEMENT)
+        if prompt_name == "job_analysis":
+            return json.dumps(MOCK_JOB_ANALYSIS)
+        if prompt_name == "ai_combined":
+            return json.dumps({"analysis": MOCK_ANALYSIS, "enhancements": MOCK_ENHANCEMENT})
+        return "{}"
+
+    def completion(self, model, messages, prompt_name):
+        user_prompt = messages[-1]["content"]
+        answer = self.answer(prompt_name, user_prompt)
+        prompt_tokens = sum(len(message["content"]) for message in messages) // 4
+        completion_tokens = len(answer) // 4
+        return ChatCompletion(
+            id=f"mock-{prompt_name or 'completion'}",
+            object="chat.completion",
+            created=0,
+            model=model,
+            choices=[Choice(
+                index=0, finish_reason="stop",
+                message=ChatCompletionMessage(role="assistant", content=answer),
+            )],
+            usage=CompletionUsage(
+                prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ),
+        )
+
+    def create(self, model_type, api_key, model, messages, timeout, prompt_name=None, **params):
+        if self.latency:
+            time.sleep(min(self.latency, timeout))
+        return self.completion(model, messages, prompt_name)
+
+    async def acreate(self, model_type, api_key, model, messages, timeout, prompt_name=None, **params):
+        if self.latency:
+            await asyncio.sleep(min(self.latency, timeout))
+        return self.completion(model, messages, prompt_name)
+
+
+BACKENDS = {}
+
+
+def register_backend(model_type, backend):
+    """Make ``backend`` serve requests for ``model_type``"""
+    BACKENDS[model_type] = backend
+
+
+def get_backend(model_type):
+    """Return the backend registered for model_type"""
+    try:
+        return BACKENDS[model_type]
+    except KeyError:
+        raise ValueError(f"No provider backend registered for model type '{model_type}'")
+
+
+def supports_json_mode(model_type):
+    """Check whether model_type accepts response_format={"type": "json_object"}"""
+    backend = BACKENDS.get(model_type)
+    return backend is not None and backend.json_mode
+
+
+def resolve_model(model_type, model):
+    """Return (model_type, model), falling back to DeepSeek for unsupported providers"""
+    if model_type not in BACKENDS:
+        print(f"DEBUG: Unsupported model type: {model_type}, falling back to {DEFAULT_MODEL_TYPE}")
+        return DEFAULT_MODEL_TYPE, DEFAULT_MODEL
+    return model_type, model
+
+
+for _model_type in PROVIDER_BASE_URLS:
+    register_backend(_model_type, OpenAICompatibleBackend())
+register_backend("Mock", MockBackend())
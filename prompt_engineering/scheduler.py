@@ -0,0 +1,452 @@
+import asyncio
+from collections import OrderedDict, deque
+import os
+import random
+import threading
+import time
+
+import openai
+
+# Per (model_type, api_key) limits, overridable through the environment
+RATE_LIMIT_PER_MINUTE = float(os.environ.get("LLM_RATE_LIMIT_PER_MINUTE", 120))
+RATE_LIMIT_BURST = int(os.environ.get("LLM_RATE_LIMIT_BURST", 12))
+MAX_CONCURRENT_CALLS = int(os.environ.get("LLM_MAX_CONCURRENT_CALLS", 8))
+
+# Retry policy for rate limits, timeouts and provider-side errors
+MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 4))
+BACKOFF_BASE_SECONDS = float(os.environ.get("LLM_BACKOFF_BASE_SECONDS", 1.0))
+BACKOFF_MAX_SECONDS = float(os.environ.get("LLM_BACKOFF_MAX_SECONDS", 30.0))
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def remaining_seconds(deadline):
+    """Return the seconds left before a time.monotonic() deadline, raising TimeoutError once it has passed"""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("LLM call deadline passed before the call could be sent")
+    return remaining
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at ``rate`` tokens per second up to ``capacity``
+
+    ``pause`` empties the bucket until a given time, which is how a provider's
+    Retry-After is applied to every caller sharing the key.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def try_acquire(self):
+        """Take a token if one is available; returns 0.0, or the seconds until one may be"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def _next_delay(self, deadline):
+        delay = self.try_acquire()
+        if delay and deadline is not None and time.monotonic() + delay >= deadline:
+            raise TimeoutError("LLM call deadline passed while waiting for the rate limit")
+        return delay
+
+    def acquire(self, deadline=None):
+        """Block until a token is available and take it; returns the seconds spent waiting
+
+        Raises TimeoutError when no token frees up before ``deadline``
+        (a time.monotonic() time).
+        """
+        started = time.monotonic()
+        while True:
+            delay = self._next_delay(deadline)
+            if not delay:
+                return time.monotonic() - started
+            time.sleep(delay)
+
+    async def acquire_async(self, deadline=None):
+        """Wait on the event loop until a token is available and take it"""
+        started = time.monotonic()
+        while True:
+            delay = self._next_delay(deadline)
+            if not delay:
+                return time.monotonic() - started
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds):
+        """Hand out no tokens for the next ``seconds``"""
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 0.0
+            self._updated = self._paused_until
+
+
+def _grant(slots, future):
+    """Hand a released slot to a waiting coroutine, passing it on if the coroutine gave up"""
+    if future.done():
+        slots.release()
+    else:
+        future.set_result(True)
+
+
+class Slots:
+    """Counting semaphore shared by worker threads and coroutines, served in FIFO order
+
+    Limits shared between threads and coroutines (possibly on different event
+    loops) cannot use an asyncio semaphore. Here a release hands the slot
+    straight to the oldest waiter: a thread is woken through its Event, a
+    coroutine through a future its loop resolves, so waiting coroutines
+    neither poll nor hold a thread.
+    """
+
+    def __init__(self, value):
+        self._value = value
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def _try_acquire(self, waiter):
+        """Take a free slot, or queue ``waiter``; returns True when a slot was taken"""
+        with self._lock:
+            if self._value > 0 and not self._waiters:
+                self._value -= 1
+                return True
+            self._waiters.append(waiter)
+            return False
+
+    def _withdraw(self, waiter):
+        """Take ``waiter`` out of the queue; returns False if a slot was already handed to it"""
+        with self._lock:
+            try:
+                self._waiters.remove(waiter)
+                return True
+            except ValueError:
+                return False
+
+    def acquire(self, timeout=None):
+        """Block until a slot is free and take it; returns False if ``timeout`` seconds pass first"""
+        event = threading.Event()
+        if self._try_acquire(event):
+            return True
+        if event.wait(timeout) or not self._withdraw(event):
+            return True
+        return False
+
+    async def acquire_async(self, deadline=None):
+        """Wait on the event loop for a slot and take it
+
+        Raises TimeoutError when ``deadline`` (a time.monotonic() time)
+        passes first.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if self._try_acquire((loop, future)):
+            return
+        try:
+            if deadline is None:
+                await future
+            else:
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), max(deadline - time.monotonic(), 0.0))
+                except asyncio.TimeoutError:
+                    raise TimeoutError("LLM call deadline passed while waiting for a free slot") from None
+        except BaseException:
+            if not self._withdraw((loop, future)):
+                # A slot was handed over while this coroutine was giving up
+                if future.done() and not future.cancelled():
+                    self.release()
+                else:
+                    # _grant passes it on
+                    future.cancel()
+            raise
+
+    def release(self):
+        with self._lock:
+            if not self._waiters:
+                self._value += 1
+                return
+            waiter = self._waiters.popleft()
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+            return
+        loop, future = waiter
+        try:
+            loop.call_soon_threadsafe(_grant, self, future)
+        except RuntimeError:
+            # The waiter's loop is closed; give the slot to the next one
+            self.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+# Limiters of keys with no call for this long are dropped; a dropped key
+# starts again with a full bucket, which an idle key has anyway
+LIMITER_IDLE_SECONDS = float(os.environ.get("LLM_LIMITER_IDLE_SECONDS", 600))
+
+
+class KeyLimiter:
+    """Rate and concurrency limits for one (model_type, api_key)"""
+
+    def __init__(self, rate_per_minute, burst, max_concurrent):
+        self.bucket = TokenBucket(rate_per_minute / 60.0, burst)
+        self.slots = Slots(max_concurrent)
+        # Calls using the limiter and when it was last picked up, guarded by the scheduler's lock
+        self.active = 0
+        self.last_used = time.monotonic()
+
+
+def get_retry_after(error):
+    """Return the delay a provider asked for in its Retry-After headers, or None"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        # HTTP-date Retry-After values fall back to the regular backoff
+        return None
+    return None
+
+
+def is_retryable(error):
+    """Check whether a provider error is worth retrying"""
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+
+class LLMScheduler:
+    """Queue LLM calls behind a token bucket and a concurrency cap per (model_type, api_key)
+
+    Users sharing one provider key share its limiter, so bursts are spread out
+    instead of turning into 429s. Retryable failures are retried with
+    full-jitter exponential backoff, or after the provider's Retry-After when it
+    sends one; a 429 also pauses the key's bucket for every other caller.
+    Limiters of keys left idle for ``idle_seconds`` are dropped, so one-off
+    keys don't pile up.
+    """
+
+    def __init__(self, rate_per_minute=RATE_LIMIT_PER_MINUTE, burst=RATE_LIMIT_BURST,
+                 max_concurrent=MAX_CONCURRENT_CALLS, max_retries=MAX_RETRIES,
+                 backoff_base=BACKOFF_BASE_SECONDS, backoff_max=BACKOFF_MAX_SECONDS,
+                 idle_seconds=LIMITER_IDLE_SECONDS):
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.idle_seconds = idle_seconds
+        # Least recently used first
+        self._limiters = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "calls": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "failures": 0,
+            "deadline_exceeded": 0,
+            "queue_wait_seconds": 0.0,
+            "max_queue_wait_seconds": 0.0,
+        }
+
+    def _expire_idle(self, now):
+        """Drop the limiters idle for longer than idle_seconds; the caller holds the lock"""
+        while self._limiters:
+            key, limiter = next(iter(self._limiters.items()))
+            if limiter.active or now - limiter.last_used < self.idle_seconds:
+                return
+            del self._limiters[key]
+
+    def _checkout(self, key):
+        """Return the key's limiter, marked as in use until ``_checkin``"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire_idle(now)
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = KeyLimiter(self.rate_per_minute, self.burst, self.max_concurrent)
+                self._limiters[key] = limiter
+            self._limiters.move_to_end(key)
+            limiter.active += 1
+            limiter.last_used = now
+            return limiter
+
+    def _checkin(self, key, limiter):
+        with self._lock:
+            limiter.active -= 1
+            limiter.last_used = time.monotonic()
+            if self._limiters.get(key) is limiter:
+                self._limiters.move_to_end(key)
+
+    def _record(self, **counts):
+        with self._lock:
+            for stat, amount in counts.items():
+                self._stats[stat] += amount
+
+    def backoff(self, attempt):
+        """Return a full-jitter exponential backoff delay for a 0-based retry attempt"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _record_wait(self, waited):
+        with self._lock:
+            self._stats["queue_wait_seconds"] += waited
+            self._stats["max_queue_wait_seconds"] = max(self._stats["max_queue_wait_seconds"], waited)
+
+    def _retry_delay(self, model_type, limiter, error, attempt, deadline=None):
+        """Return how long to wait before retrying, pausing the key's bucket on a 429
+
+        Returns None when the retry could not start before ``deadline``.
+        """
+        delay = get_retry_after(error)
+        if getattr(error, "status_code", None) == 429:
+            self._record(rate_limited=1)
+            limiter.bucket.pause(delay if delay is not None else self.backoff(attempt))
+        if delay is None:
+            delay = self.backoff(attempt)
+        delay = min(delay, self.backoff_max)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            print(f"DEBUG: {model_type} call failed ({type(error).__name__}), no time left to retry before the deadline")
+            self._record(calls=1, failures=1, deadline_exceeded=1)
+            return None
+        print(f"DEBUG: {model_type} call failed ({type(error).__name__}), retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+        self._record(retries=1)
+        return delay
+
+    def _queue_timeout(self, model_type):
+        print(f"DEBUG: {model_type} call queued past its deadline")
+        self._record(failures=1, deadline_exceeded=1)
+
+    def call(self, model_type, api_key, func, deadline=None):
+        """Run func() under the key's limits, retrying retryable provider errors
+
+        Returns (result, stats) where stats holds the seconds spent queued
+        and the number of retries. The last error is raised once retries run
+        out or the next retry could not start before ``deadline`` (a
+        time.monotonic() time), and TimeoutError when the call is still queued
+        at the deadline.
+        """
+        key = (model_type, api_key)
+        limiter = self._checkout(key)
+        try:
+            return self._call(model_type, limiter, func, deadline)
+        finally:
+            self._checkin(key, limiter)
+
+    def _call(self, model_type, limiter, func, deadline):
+        queue_wait = 0.0
+        attempt = 0
+        while True:
+            try:
+                waited = limiter.bucket.acquire(deadline)
+                started = time.monotonic()
+                if not limiter.slots.acquire(timeout=None if deadline is None else remaining_seconds(deadline)):
+                    raise TimeoutError("LLM call deadline passed while waiting for a free slot")
+            except TimeoutError:
+                self._queue_timeout(model_type)
+                raise
+            try:
+                waited += time.monotonic() - started
+                queue_wait += waited
+                self._record_wait(waited)
+                try:
+                    result = func()
+                    self._record(calls=1)
+                    return result, {"queue_wait_seconds": queue_wait, "retries": attempt}
+                except Exception as e:
+                    if not is_retryable(e) or attempt >= self.max_retries:
+                        self._record(calls=1, failures=1)
+                        raise
+                    error = e
+            finally:
+                limiter.slots.release()
+
+            delay = self._retry_delay(model_type, limiter, error, attempt, deadline)
+            if delay is None:
+                raise error
+            time.sleep(delay)
+            attempt += 1
+
+    async def acall(self, model_type, api_key, func, deadline=None):
+        """Await func() under the key's limits; the coroutine counterpart of ``call``
+
+        ``func`` returns an awaitable. Limits are shared with threaded callers
+        of the same key.
+        """
+        key = (model_type, api_key)
+        limiter = self._checkout(key)
+        try:
+            return await self._acall(model_type, limiter, func, deadline)
+        finally:
+            self._checkin(key, limiter)
+
+    async def _acall(self, model_type, limiter, func, deadline):
+        queue_wait = 0.0
+        attempt = 0
+        while True:
+            try:
+                waited = await limiter.bucket.acquire_async(deadline)
+                started = time.monotonic()
+                await limiter.slots.acquire_async(deadline)
+            except TimeoutError:
+                self._queue_timeout(model_type)
+                raise
+            try:
+                waited += time.monotonic() - started
+                queue_wait += waited
+                self._record_wait(waited)
+                try:
+                    result = await func()
+                    self._record(calls=1)
+                    return result, {"queue_wait_seconds": queue_wait, "retries": attempt}
+                except Exception as e:
+                    if not is_retryable(e) or attempt >= self.max_retries:
+                        self._record(calls=1, failures=1)
+                        raise
+                    error = e
+            finally:
+                limiter.slots.release()
+
+            delay = self._retry_delay(model_type, limiter, error, attempt, deadline)
+            if delay is None:
+                raise error
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stats(self):
+        """Return call, retry and queue-wait counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["limited_keys"] = len(self._limiters)
+        stats["queue_wait_seconds"] = round(stats["queue_wait_seconds"], 3)
+        stats["max_queue_wait_seconds"] = round(stats["max_queue_wait_seconds"], 3)
+        return stats
+
+
+scheduler = LLMScheduler()
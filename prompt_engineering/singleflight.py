@@ -0,0 +1,127 @@
+import asyncio
+import threading
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+        # (loop, future) of each following coroutine, resolved when the leader lands
+        self.waiters = []
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is running (followers) block until it finishes and get the
+    same result, or the same exception. Nothing is kept once the leader is
+    done, so later calls run again (the LLM response cache covers repeats).
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "leaders": 0,
+            "coalesced": 0,
+            "errors": 0,
+        }
+
+    def _join(self, key, waiter=None):
+        """Return (flight, leader) for key, registering a new flight if none is running
+
+        A following coroutine passes its (loop, future) as ``waiter`` so the
+        leader can wake it without a blocked thread.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = _Flight()
+                self._flights[key] = flight
+                self._stats["leaders"] += 1
+                leader = True
+            else:
+                flight.followers += 1
+                if waiter is not None:
+                    flight.waiters.append(waiter)
+                self._stats["coalesced"] += 1
+                leader = False
+        return flight, leader
+
+    def _land(self, key, flight):
+        with self._lock:
+            del self._flights[key]
+        flight.done.set()
+        for loop, future in flight.waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                # The follower's loop is closed; nobody is waiting anymore
+                pass
+
+    def do(self, key, func):
+        """Return (func() result, coalesced) where coalesced is True for followers"""
+        flight, leader = self._join(key)
+        if not leader:
+            print(f"DEBUG: Coalescing with in-flight call {key[:12]}")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = func()
+            return flight.result, False
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        finally:
+            self._land(key, flight)
+
+    async def ado(self, key, func):
+        """Coroutine version of ``do`` where func() returns an awaitable
+
+        Flights are shared with threaded callers, so a coroutine can follow a
+        call led by a worker thread and the other way around; a following
+        coroutine awaits a future on its own loop that the leader resolves
+        with ``call_soon_threadsafe``, so it holds no thread while it waits.
+        """
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        flight, leader = self._join(key, (loop, waiter))
+        if not leader:
+            print(f"DEBUG: Coalescing with in-flight call {key[:12]}")
+            await waiter
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = await func()
+            return flight.result, False
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        finally:
+            self._land(key, flight)
+
+    def stats(self):
+        """Return leader/follower counters and the number of calls in flight"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._flights)
+        calls = stats["leaders"] + stats["coalesced"]
+        stats["coalesced_ratio"] = round(stats["coalesced"] / calls, 4) if calls else 0.0
+        return stats
@@ -0,0 +1,201 @@
+import contextvars
+import json
+import math
+import os
+import threading
+
+# Endpoint the current LLM calls are made for; set per request by the app
+current_endpoint = contextvars.ContextVar("llm_endpoint", default="none")
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+# USD per million (input, cached input, output) tokens; list prices at the
+# time of writing, overridable with LLM_PRICES_JSON='{"model": [in, cached, out]}'
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "deepseek-chat": (0.27, 0.07, 1.10),
+    "deepseek-reasoner": (0.55, 0.14, 2.19),
+    "gemini-1.5-flash": (0.075, 0.01875, 0.30),
+    "gemini-1.5-pro": (1.25, 0.3125, 5.00),
+    "gemini-2.0-flash": (0.10, 0.025, 0.40),
+}
+MODEL_PRICES.update({model: tuple(prices) for model, prices in json.loads(os.environ.get("LLM_PRICES_JSON", "{}")).items()})
+
+# Labels a call is recorded under, in the order group_by accepts them
+TELEMETRY_LABELS = ("endpoint", "model_type", "model", "prompt_name")
+
+
+def call_cost(model, usage):
+    """Return the USD cost of a call's tokens, or None when the model has no known price"""
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return None
+    input_price, cached_price, output_price = prices
+    cached = usage.get("cached_tokens", 0)
+    return (
+        (usage.get("prompt_tokens", 0) - cached) * input_price
+        + cached * cached_price
+        + usage.get("completion_tokens", 0) * output_price
+    ) / 1_000_000
+
+
+class Histogram:
+    """Fixed-bucket histogram (per-bucket, not cumulative, counts) with count, sum, min and max"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+        return self
+
+    def quantile(self, q):
+        """Return the upper bound of the bucket holding quantile q (the max for the last bucket)"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                if index < len(self.buckets):
+                    return min(self.buckets[index], self.max)
+                return self.max
+        return self.max
+
+    def to_dict(self, digits=3):
+        def rounded(value):
+            return None if value is None else round(value, digits)
+
+        return {
+            "count": self.count,
+            "sum": rounded(self.sum),
+            "mean": rounded(self.sum / self.count) if self.count else None,
+            "min": rounded(self.min),
+            "max": rounded(self.max),
+            "p50": rounded(self.quantile(0.5)),
+            "p95": rounded(self.quantile(0.95)),
+            "p99": rounded(self.quantile(0.99)),
+            "buckets": [
+                {"le": bound, "count": count}
+                for bound, count in zip(self.buckets + ("+Inf",), self.counts)
+            ],
+        }
+
+
+class CallSeries:
+    """Counters and histograms of the calls sharing one set of labels"""
+
+    COUNTERS = ("calls", "errors", "cache_hits", "retries", "hedged", "prompt_tokens", "completion_tokens",
+                "cached_tokens", "unpriced_calls")
+
+    def __init__(self):
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.cost_usd = 0.0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.prompt_tokens = Histogram(TOKEN_BUCKETS)
+        self.completion_tokens = Histogram(TOKEN_BUCKETS)
+
+    def merge(self, other):
+        for counter, value in other.counters.items():
+            self.counters[counter] += value
+        self.cost_usd += other.cost_usd
+        self.latency.merge(other.latency)
+        self.prompt_tokens.merge(other.prompt_tokens)
+        self.completion_tokens.merge(other.completion_tokens)
+        return self
+
+    def to_dict(self):
+        stats = dict(self.counters)
+        stats["cost_usd"] = round(self.cost_usd, 6)
+        stats["cache_hit_ratio"] = round(stats["cache_hits"] / stats["calls"], 4) if stats["calls"] else 0.0
+        stats["latency_seconds"] = self.latency.to_dict()
+        stats["prompt_tokens_histogram"] = self.prompt_tokens.to_dict(digits=0)
+        stats["completion_tokens_histogram"] = self.completion_tokens.to_dict(digits=0)
+        return stats
+
+
+class LLMTelemetry:
+    """Per-call LLM telemetry aggregated by (endpoint, model_type, model, prompt_name)
+
+    Every provider call and cache hit made through chat_completion is
+    recorded with its latency, tokens, cost, retries and hedging. The
+    endpoint comes from ``current_endpoint``, so work handed to threads must
+    run in a copy of the caller's context (see contextvars.copy_context).
+    """
+
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def record(self, model_type, model, prompt_name, seconds, usage=None, error=False):
+        labels = (current_endpoint.get(), model_type, model, prompt_name or "unnamed")
+        usage = usage or {}
+        cost = None if error or usage.get("cache_hits") else call_cost(model, usage)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = CallSeries()
+            counters = series.counters
+            counters["calls"] += 1
+            counters["errors"] += int(error)
+            for counter in ("cache_hits", "retries", "hedged", "prompt_tokens", "completion_tokens", "cached_tokens"):
+                counters[counter] += usage.get(counter, 0)
+            series.latency.observe(seconds)
+            if not error and not usage.get("cache_hits"):
+                series.prompt_tokens.observe(usage.get("prompt_tokens", 0))
+                series.completion_tokens.observe(usage.get("completion_tokens", 0))
+                if cost is None:
+                    counters["unpriced_calls"] += 1
+                else:
+                    series.cost_usd += cost
+
+    def stats(self, group_by=("endpoint", "model"), **filters):
+        """Return the series merged by the ``group_by`` labels, keeping those matching ``filters``
+
+        Keys of the result are the group's label values joined with "|"
+        (or "all" when group_by is empty).
+        """
+        unknown = [label for label in list(group_by) + list(filters) if label not in TELEMETRY_LABELS]
+        if unknown:
+            raise ValueError(f"Unknown telemetry labels {unknown}. Available labels: {list(TELEMETRY_LABELS)}")
+
+        groups = {}
+        with self._lock:
+            for labels, series in self._series.items():
+                values = dict(zip(TELEMETRY_LABELS, labels))
+                if any(values[label] != value for label, value in filters.items() if value is not None):
+                    continue
+                key = "|".join(values[label] for label in group_by) or "all"
+                groups.setdefault(key, CallSeries()).merge(series)
+        return {key: series.to_dict() for key, series in sorted(groups.items())}
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+telemetry = LLMTelemetry()
@@ -95,6 +95,31 @@ def test_get_templates():
         record_test_result("Get Templates", False, str(e))
         return None
 
+def test_llm_metrics():
+    """Test LLM call telemetry endpoint"""
+    print_test("Testing LLM Call Telemetry")
+    
+    try:
+        response = requests.get(f"{BASE_URL}/api/metrics/llm", params={'group_by': 'endpoint,prompt_name'})
+        print(f"Status Code: {response.status_code}")
+        
+        if response.status_code == 200:
+            series = response.json().get('series', {})
+            print(f"✓ LLM telemetry retrieved successfully")
+            for name, stats in series.items():
+                latency = stats.get('latency_seconds', {})
+                print(f"  {name}: {stats.get('calls')} calls, p95 {latency.get('p95')}s, ${stats.get('cost_usd')}")
+            record_test_result("LLM Telemetry", True)
+            return series
+        else:
+            print(f"✗ LLM telemetry retrieval failed")
+            record_test_result("LLM Telemetry", False, f"Status code: {response.status_code}")
+            return None
+    except Exception as e:
+        print(f"✗ LLM telemetry error: {str(e)}")
+        record_test_result("LLM Telemetry", False, str(e))
+        return None
+
 def test_extract_resume_json(file_path):
     """Test resume JSON extraction with file_id"""
     print_test("Testing Extract Resume JSON")
@@ -155,6 +180,127 @@ def test_extract_resume_json(file_path):
         record_test_result("Extract Resume JSON", False, str(e))
         return None, None
 
+def test_extract_resume_json_stream(file_path):
+    """Test streaming resume JSON extraction (NDJSON events)"""
+    print_test("Testing Extract Resume JSON Stream")
+    
+    file_id = generate_file_id()
+    print(f"Generated File ID: {file_id}")
+    
+    if not Path(file_path).exists():
+        print(f"✗ Test file not found: {file_path}")
+        record_test_result("Extract Resume JSON Stream", False, f"File not found: {file_path}")
+        return None
+    
+    try:
+        with open(file_path, 'rb') as file:
+            files = {'file': file}
+            data = {
+                'file_id': file_id,
+                'api_key': API_KEY,
+                'model_type': DEFAULT_MODEL_TYPE,
+                'model': DEFAULT_MODEL
+            }
+            
+            start_time = time.time()
+            first_section_time = None
+            sections = []
+            final_event = None
+            response = requests.post(f"{BASE_URL}/api/extract-resume-json/stream", files=files, data=data, stream=True)
+            print(f"Status Code: {response.status_code}")
+            
+            if response.status_code != 200:
+                error_msg = response.json().get('error', 'Unknown error')
+                print(f"✗ Streaming extraction failed: {error_msg}")
+                record_test_result("Extract Resume JSON Stream", False, error_msg)
+                return None
+            
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event['event'] == 'section':
+                    if first_section_time is None:
+                        first_section_time = time.time() - start_time
+                    sections.append(event['section'])
+                    print(f"  Section received: {event['section']} after {event['elapsed_seconds']}s")
+                elif event['event'] == 'section_failed':
+                    print(f"  Section failed: {event['section']}")
+                elif event['event'] in ('complete', 'error'):
+                    final_event = event
+        
+        total_time = time.time() - start_time
+        if final_event and final_event['event'] == 'complete':
+            print(f"✓ Streaming extraction successful")
+            print(f"  Sections streamed: {sections}")
+            print(f"  Time to first section: {first_section_time:.2f}s" if first_section_time else "  No sections streamed")
+            print(f"  Total time: {total_time:.2f}s")
+            print(f"  Final resume JSON keys: {list(final_event['resume_json'].keys())}")
+            record_test_result("Extract Resume JSON Stream", True)
+            return final_event
+        else:
+            error_msg = final_event.get('error', 'Stream ended without a final event') if final_event else 'Stream ended without a final event'
+            print(f"✗ Streaming extraction failed: {error_msg}")
+            record_test_result("Extract Resume JSON Stream", False, error_msg)
+            return None
+    except Exception as e:
+        print(f"✗ Streaming extraction error: {str(e)}")
+        record_test_result("Extract Resume JSON Stream", False, str(e))
+        return None
+
+def test_extract_resume_json_batch(file_path, copies=3):
+    """Test batch extraction of several resumes in one request (mock provider)"""
+    print_test("Testing Extract Resume JSON Batch")
+    
+    if not Path(file_path).exists():
+        print(f"✗ Test file not found: {file_path}")
+        record_test_result("Extract Resume JSON Batch", False, f"File not found: {file_path}")
+        return None
+    
+    file_ids = [generate_file_id() for _ in range(copies)]
+    content = Path(file_path).read_bytes()
+    files = [('files', (Path(file_path).name, content, 'application/pdf')) for _ in range(copies)]
+    data = {
+        'file_ids': ','.join(file_ids),
+        'api_key': 'mock',
+        'model_type': 'Mock',
+        'model': 'mock',
+        'concurrency': 2
+    }
+    
+    try:
+        response = requests.post(f"{BASE_URL}/api/extract-resume-json/batch", files=files, data=data)
+        print(f"Status Code: {response.status_code}")
+        result = response.json()
+        
+        if response.status_code != 200:
+            error_msg = result.get('error', 'Unknown error')
+            print(f"✗ Batch extraction failed: {error_msg}")
+            record_test_result("Extract Resume JSON Batch", False, error_msg)
+            return None
+        
+        stats = result.get('stats', {})
+        returned_ids = [item['file_id'] for item in result.get('results', [])]
+        print(f"  Batch ID: {result.get('batch_id')}")
+        print(f"  Succeeded: {stats.get('succeeded')}/{stats.get('items')} in {stats.get('elapsed_seconds')}s ({stats.get('items_per_second')} items/s)")
+        for item in result.get('results', []):
+            if not item['success']:
+                print(f"  {item['file_id']} failed: {item.get('error')}")
+        
+        if result.get('success') and returned_ids == file_ids:
+            print(f"✓ Batch extraction successful")
+            record_test_result("Extract Resume JSON Batch", True)
+            return result
+        
+        error_msg = f"{stats.get('failed')} items failed" if returned_ids == file_ids else "File IDs do not match the upload order"
+        print(f"✗ Batch extraction failed: {error_msg}")
+        record_test_result("Extract Resume JSON Batch", False, error_msg)
+        return None
+    except Exception as e:
+        print(f"✗ Batch extraction error: {str(e)}")
+        record_test_result("Extract Resume JSON Batch", False, str(e))
+        return None
+
 def test_ai_enhance_with_json(resume_json, job_description):
     """Test AI enhancement with JSON input"""
     print_test("Testing AI Enhancement with JSON Input")
@@ -218,6 +364,316 @@ def test_ai_enhance_with_json(resume_json, job_description):
         record_test_result("AI Enhancement", False, str(e))
         return None
 
+def test_ai_enhance_with_mock_backend(resume_json, job_description):
+    """Test AI enhancement against the offline mock provider (no API key needed)"""
+    print_test("Testing AI Enhancement with Mock Backend")
+    
+    file_id = generate_file_id()
+    data = {
+        'file_id': file_id,
+        'resume_json': resume_json,
+        'job_description': job_description,
+        'api_key': 'mock',
+        'model_type': 'Mock',
+        'model': 'mock'
+    }
+    
+    try:
+        response = requests.post(f"{BASE_URL}/api/ai-enhance", json=data)
+        print(f"Status Code: {response.status_code}")
+        result = response.json()
+        
+        if response.status_code == 200 and result.get('success'):
+            analysis = result.get('analysis', {})
+            print(f"✓ Mock AI enhancement completed")
+            print(f"  Match score: {analysis.get('match_score', 'N/A')}")
+            print(f"  Enhancement sections: {list(result.get('enhancements', {}).keys())}")
+            record_test_result("AI Enhancement (Mock)", True)
+            return result
+        
+        error_msg = result.get('error', 'Unknown error')
+        print(f"✗ Mock AI enhancement failed: {error_msg}")
+        record_test_result("AI Enhancement (Mock)", False, error_msg)
+        return None
+    except Exception as e:
+        print(f"✗ Mock AI enhancement error: {str(e)}")
+        record_test_result("AI Enhancement (Mock)", False, str(e))
+        return None
+
+def test_ai_enhance_combined_call(resume_json, job_description):
+    """Test AI enhancement with the analysis and enhancement in one call (mock provider)"""
+    print_test("Testing AI Enhancement with a Combined Call")
+    
+    data = {
+        'file_id': generate_file_id(),
+        'resume_json': resume_json,
+        'job_description': job_description,
+        'api_key': 'mock',
+        'model_type': 'Mock',
+        'model': 'mock',
+        'combined': True
+    }
+    
+    try:
+        response = requests.post(f"{BASE_URL}/api/ai-enhance", json=data)
+        print(f"Status Code: {response.status_code}")
+        result = response.json()
+        
+        if response.status_code == 200 and result.get('success') and not result.get('partial'):
+            print(f"✓ Combined AI enhancement completed")
+            print(f"  Combined call: {result.get('metadata', {}).get('combined_call')}")
+            print(f"  Match score: {result.get('analysis', {}).get('match_score', 'N/A')}")
+            print(f"  Enhancement sections: {list(result.get('enhancements', {}).keys())}")
+            record_test_result("AI Enhancement (Combined)", True)
+            return result
+        
+        error_msg = result.get('error') or f"Partial result: {result.get('errors')}"
+        print(f"✗ Combined AI enhancement failed: {error_msg}")
+        record_test_result("AI Enhancement (Combined)", False, error_msg)
+        return None
+    except Exception as e:
+        print(f"✗ Combined AI enhancement error: {str(e)}")
+        record_test_result("AI Enhancement (Combined)", False, str(e))
+        return None
+
+def test_job_description_analysis(resume_json, job_description):
+    """Test that a long posting is analyzed once and the cached analysis is reused (mock provider)"""
+    print_test("Testing Shared Job Description Analysis")
+    
+    # Repeat the posting past the length below which it is sent as is
+    long_description = "\n\n".join([job_description] * (1200 // max(len(job_description), 1) + 2))
+    data = {
+        'resume_json': resume_json,
+        'job_description': long_description,
+        'api_key': 'mock',
+        'model_type': 'Mock',
+        'model': 'mock'
+    }
+    
+    try:
+        results = []
+        for _ in range(2):
+            response = requests.post(f"{BASE_URL}/api/ai-enhance", json=dict(data, file_id=generate_file_id()))
+            print(f"Status Code: {response.status_code}")
+            results.append(response.json())
+        
+        reports = [result.get('job_analysis') or {} for result in results]
+        if all(result.get('success') for result in results) and all(report.get('used') for report in reports):
+            print(f"✓ Job description analyzed")
+            print(f"  Posting length: {reports[0].get('job_description_chars')} chars")
+            print(f"  Context length: {reports[0].get('context_chars')} chars")
+            print(f"  Title: {reports[0].get('analysis', {}).get('title')}")
+            print(f"  Second request used the cache: {reports[1].get('cached')}")
+            if not reports[1].get('cached'):
+                record_test_result("Job Description Analysis", False, "Second request did not reuse the cached analysis")
+                return None
+            record_test_result("Job Description Analysis", True)
+            return reports[0]
+        
+        error_msg = results[-1].get('error') or f"Analysis not used: {reports}"
+        print(f"✗ Job description analysis failed: {error_msg}")
+        record_test_result("Job Description Analysis", False, error_msg)
+        return None
+    except Exception as e:
+        print(f"✗ Job description analysis error: {str(e)}")
+        record_test_result("Job Description Analysis", False, str(e))
+        return None
+
+def test_near_duplicate_posting(resume_json, job_description):
+    """Test result reuse for reposts, and no reuse for changed requirements or another resume (mock provider)"""
+    print_test("Testing Near-Duplicate Posting Reuse")
+    
+    # A realistic posting, the same ad reposted with a new date and requisition id,
+    # and the same ad asking for more years of experience
+    posting = f"""{job_description}
+    About the role: you will design, build and operate the backend services behind our customer platform.
+    You will own features from the first design document to production monitoring and on-call support.
+    What you will do: write clean, tested Python code for our REST and GraphQL APIs.
+    Model data in PostgreSQL and tune slow queries together with the data engineering group.
+    Package services with Docker and deploy them to Kubernetes through our continuous delivery pipeline.
+    Review pull requests, mentor junior engineers and share knowledge in weekly architecture sessions.
+    What we are looking for: solid knowledge of Python, SQL and web application security.
+    Familiarity with message queues such as RabbitMQ or Kafka and with caching layers like Redis.
+    Clear written communication and comfort working with product managers and designers.
+    Requires 5+ years of professional experience."""
+    repost = f"Posted 2025-03-14. Requisition 48213.\n\n{posting}\n\nApply before 2025-04-30."
+    senior_posting = posting.replace("5+ years", "10+ years")
+    other_resume = dict(resume_json, basics=dict(resume_json.get('basics', {}), name="Another Candidate"))
+    data = {
+        'api_key': 'mock',
+        'model_type': 'Mock',
+        'model': 'mock'
+    }
+    requests_to_send = [
+        ("first posting", resume_json, posting),
+        ("repost", resume_json, repost),
+        ("10+ years", resume_json, senior_posting),
+        ("other resume", other_resume, repost),
+    ]
+    
+    try:
+        results = {}
+        for label, resume, text in requests_to_send:
+            response = requests.post(f"{BASE_URL}/api/ai-enhance", json=dict(
+                data, file_id=generate_file_id(), resume_json=resume, job_description=text
+            ))
+            print(f"Status Code ({label}): {response.status_code}")
+            results[label] = response.json()
+        
+        reports = {label: result.get('near_duplicate') or {} for label, result in results.items()}
+        if not all(result.get('success') for result in results.values()):
+            error_msg = next(result.get('error') for result in results.values() if not result.get('success'))
+            print(f"✗ Near-duplicate posting failed: {error_msg}")
+            record_test_result("Near-Duplicate Posting", False, error_msg)
+            return None
+        
+        print(f"  Repost: {reports['repost']}")
+        print(f"  10+ years: {reports['10+ years']}")
+        print(f"  Other resume: {reports['other resume']}")
+        failures = []
+        if not reports['repost'].get('matched'):
+            failures.append("repost was not matched")
+        elif results['repost'].get('enhancements') != results['first posting'].get('enhancements'):
+            failures.append("repost did not reuse the earlier result")
+        if reports['10+ years'].get('matched'):
+            failures.append("posting with different numeric requirements was matched")
+        if reports['other resume'].get('matched'):
+            failures.append("result was reused for another resume")
+        
+        if failures:
+            print(f"✗ Near-duplicate posting failed: {'; '.join(failures)}")
+            record_test_result("Near-Duplicate Posting", False, "; ".join(failures))
+            return None
+        print(f"✓ Repost reused the earlier result (similarity {reports['repost'].get('similarity')})")
+        record_test_result("Near-Duplicate Posting", True)
+        return reports['repost']
+    except Exception as e:
+        print(f"✗ Near-duplicate posting error: {str(e)}")
+        record_test_result("Near-Duplicate Posting", False, str(e))
+        return None
+
+def test_match_score(resume_json, job_description):
+    """Test local (non-LLM) match scoring"""
+    print_test("Testing Local Match Score")
+    
+    data = {
+        'resume_json': resume_json,
+        'job_description': job_description
+    }
+    
+    try:
+        responses = [requests.post(f"{BASE_URL}/api/match-score", json=data) for _ in range(2)]
+        print(f"Status Codes: {[response.status_code for response in responses]}")
+        results = [response.json() for response in responses]
+        
+        if all(response.status_code == 200 for response in responses) and results[0].get('success'):
+            result = results[0]
+            print(f"✓ Match score computed in {result.get('elapsed_ms')}ms")
+            print(f"  Match score: {result.get('match_score')}")
+            print(f"  Keyword density score: {result.get('keyword_density_score')}")
+            print(f"  Missing keywords: {result.get('missing_keywords')}")
+            if results[0]['match_score'] != results[1]['match_score']:
+                record_test_result("Local Match Score", False, "Scores differ between identical requests")
+                return None
+            record_test_result("Local Match Score", True)
+            return result
+        
+        error_msg = results[0].get('error', 'Unknown error')
+        print(f"✗ Match scoring failed: {error_msg}")
+        record_test_result("Local Match Score", False, error_msg)
+        return None
+    except Exception as e:
+        print(f"✗ Match scoring error: {str(e)}")
+        record_test_result("Local Match Score", False, str(e))
+        return None
+
+def test_rank_jobs(resume_json, postings=2000):
+    """Test ranking many job descriptions for one resume, then re-ranking by postings_key"""
+    print_test("Testing Rank Jobs")
+    
+    roles = [
+        "Python developer with React and REST API experience",
+        "Java Spring Boot backend engineer",
+        "Registered nurse for the ICU night shift",
+        "Data engineer with Python, SQL and Airflow",
+    ]
+    job_descriptions = [{"id": f"posting-{index}", "job_description": roles[index % len(roles)]} for index in range(postings)]
+    
+    try:
+        response = requests.post(f"{BASE_URL}/api/rank-jobs", json={
+            'resume_json': resume_json,
+            'job_descriptions': job_descriptions,
+            'top_k': 5
+        })
+        print(f"Status Code: {response.status_code}")
+        result = response.json()
+        if response.status_code != 200:
+            error_msg = result.get('error', 'Unknown error')
+            print(f"✗ Ranking failed: {error_msg}")
+            record_test_result("Rank Jobs", False, error_msg)
+            return None
+        
+        stats = result['stats']
+        print(f"  Ranked {stats['postings']} postings in {stats['elapsed_ms']}ms ({stats['postings_per_second']} postings/s)")
+        print(f"  Top postings: {[(posting['id'], posting['score']) for posting in result['results']]}")
+        
+        response = requests.post(f"{BASE_URL}/api/rank-jobs", json={
+            'resume_json': resume_json,
+            'postings_key': result['postings_key'],
+            'top_k': 5
+        })
+        cached = response.json()
+        if response.status_code == 200 and cached['results'] == result['results']:
+            print(f"✓ Re-ranked by postings_key in {cached['stats']['elapsed_ms']}ms (matrix cached: {cached['stats']['matrix_cached']})")
+            record_test_result("Rank Jobs", True)
+            return result
+        
+        error_msg = cached.get('error', 'Ranking by postings_key differs')
+        print(f"✗ Re-ranking failed: {error_msg}")
+        record_test_result("Rank Jobs", False, error_msg)
+        return None
+    except Exception as e:
+        print(f"✗ Ranking error: {str(e)}")
+        record_test_result("Rank Jobs", False, str(e))
+        return None
+
+def test_search_resumes(file_id, job_description):
+    """Test searching the stored resumes for a job description"""
+    print_test("Testing Search Resumes")
+    
+    try:
+        response = requests.post(f"{BASE_URL}/api/search-resumes", json={
+            'job_description': job_description,
+            'top_k': 20
+        })
+        print(f"Status Code: {response.status_code}")
+        result = response.json()
+        
+        if response.status_code != 200:
+            error_msg = result.get('error', 'Unknown error')
+            print(f"✗ Resume search failed: {error_msg}")
+            record_test_result("Search Resumes", False, error_msg)
+            return None
+        
+        stats = result.get('stats', {})
+        found = [item['file_id'] for item in result.get('results', [])]
+        print(f"  Searched {stats.get('resumes')} indexed resumes in {stats.get('elapsed_ms')}ms")
+        print(f"  Top results: {[(item['file_id'], item['score']) for item in result.get('results', [])[:5]]}")
+        
+        if file_id in found:
+            print(f"✓ Stored resume {file_id} found by search")
+            record_test_result("Search Resumes", True)
+            return result
+        
+        error_msg = f"Stored resume {file_id} not in the results"
+        print(f"✗ {error_msg}")
+        record_test_result("Search Resumes", False, error_msg)
+        return None
+    except Exception as e:
+        print(f"✗ Resume search error: {str(e)}")
+        record_test_result("Search Resumes", False, str(e))
+        return None
+
 def test_optimize_resume_with_file_id(file_id, job_description, template="Simple"):
     """Test resume optimization using file_id (no resume_json required)"""
     print_test(f"Testing Resume Optimization with File ID (Template: {template})")
@@ -699,6 +1155,592 @@ def create_sample_resume_json():
         "skills": ["Python", "JavaScript", "React", "Node.js", "SQL"]
     }
 
+def layout_line(text, x0, x1, top, size=10, page=0):
+    """Build one PDF layout line as extract_text_and_layout_from_pdf returns it"""
+    return {"text": text, "page": page, "top": top, "x0": x0, "x1": x1, "size": size, "bold": False}
+
+def test_segmentation_fallbacks():
+    """Test section segmentation on two-column layouts and its full-text fallbacks (local, no server)"""
+    print_test("Testing Section Segmentation (Local)")
+    
+    from doc_utils import segment_resume_text
+    from prompt_engineering import build_section_texts
+    
+    # Skills and Education on the left, two jobs on the right, name across the top
+    two_columns = [
+        layout_line("Jane Example", 200, 330, 760, size=20),
+        layout_line("jane@example.com | (415) 555-0100", 180, 400, 740),
+        layout_line("Skills", 40, 85, 700, size=14),
+        layout_line("Python, SQL, Docker", 40, 140, 682),
+        layout_line("Kubernetes, Terraform", 40, 150, 664),
+        layout_line("Education", 40, 110, 628, size=14),
+        layout_line("MIT - BSc Computer Science", 40, 175, 610),
+        layout_line("Experience", 260, 340, 700, size=14),
+        layout_line("Senior Engineer - Acme Corp", 260, 400, 682),
+        layout_line("- Built the billing platform", 260, 400, 664),
+        layout_line("Engineer - Globex", 260, 350, 646),
+        layout_line("- Shipped the mobile checkout flow", 260, 440, 628),
+        layout_line("- Migrated services to Kubernetes", 260, 440, 610),
+    ]
+    # The same page with a paragraph running across both columns in the middle
+    blocked = two_columns + [layout_line("A summary running across the full width of both columns", 40, 560, 646)]
+    
+    try:
+        failures = []
+        segments = segment_resume_text("", two_columns)
+        work = segments["sections"].get("work", "")
+        print(f"  Two columns: columns {segments['columns']}, confidence {segments['confidence']}, sections {list(segments['sections'])}")
+        if "Globex" not in work or "Kubernetes, Terraform" in work:
+            failures.append("two-column work segment mixes columns or misses a job")
+        if "Python" not in segments["sections"].get("skills", ""):
+            failures.append("two-column skills segment missing")
+        if "Jane Example" not in segments["header"]:
+            failures.append("full-width name not kept in the header")
+        
+        blocked_segments = segment_resume_text("", blocked)
+        print(f"  Unsplittable columns: confidence {blocked_segments['confidence']}")
+        texts = build_section_texts("FULL TEXT", blocked_segments)
+        if blocked_segments["confidence"] != 0 or any(text != "FULL TEXT" for text in texts.values()):
+            failures.append("multi-column page without a clean gutter did not fall back to the full text")
+        
+        no_headings = segment_resume_text("Jane Example\nPython developer with ten years of backend work")
+        print(f"  No headings: confidence {no_headings['confidence']}")
+        if no_headings["confidence"] != 0:
+            failures.append("text without headings was segmented")
+        
+        if failures:
+            print(f"✗ Segmentation failed: {'; '.join(failures)}")
+            record_test_result("Section Segmentation (Local)", False, "; ".join(failures))
+            return False
+        print(f"✓ Segmentation reads columns in order and falls back to the full text")
+        record_test_result("Section Segmentation (Local)", True)
+        return True
+    except Exception as e:
+        print(f"✗ Segmentation error: {str(e)}")
+        record_test_result("Section Segmentation (Local)", False, str(e))
+        return False
+
+def test_text_compaction(sample_file="sample/resume.pdf"):
+    """Test text compaction on the sample resume and on a noisy copy of it (local, no server)"""
+    print_test("Testing Text Compaction (Local)")
+    
+    from doc_utils import compact_text, extract_text_from_pdf
+    
+    if not Path(sample_file).exists():
+        print(f"⚠️  Sample file not found: {sample_file}")
+        return False
+    
+    try:
+        failures = []
+        clean_text = extract_text_from_pdf(sample_file)
+        compacted, stats = compact_text(clean_text)
+        print(f"  Sample: {stats['original_tokens_estimate']} -> {stats['compacted_tokens_estimate']} tokens")
+        if stats["compacted_tokens_estimate"] > stats["original_tokens_estimate"]:
+            failures.append("compaction grew the sample")
+        if compact_text(compacted)[0] != compacted:
+            failures.append("compaction is not idempotent")
+        
+        # The sample split over two pages with a repeated header, page numbers,
+        # ligatures and (cid:N) glyphs, as pdfminer returns some PDFs
+        lines = [line for line in clean_text.splitlines() if line.strip()]
+        header, middle = lines[0], len(lines) // 2
+        pages = [
+            [header] + lines[1:middle] + ["Page 1 of 2"],
+            [header] + lines[middle:] + ["Page 2 of 2"],
+        ]
+        noisy_text = "\f".join("\n".join(page) for page in pages)
+        noisy_text = noisy_text.replace("fi", "\ufb01").replace("\n•", "\n(cid:127)•")
+        noisy_compacted, noisy_stats = compact_text(noisy_text)
+        print(f"  Noisy copy: {noisy_stats['original_tokens_estimate']} -> {noisy_stats['compacted_tokens_estimate']} tokens, {noisy_stats['removed_lines']} lines removed")
+        if noisy_stats["compacted_tokens_estimate"] >= noisy_stats["original_tokens_estimate"]:
+            failures.append("noisy copy was not reduced")
+        if "(cid:" in noisy_compacted or "\ufb01" in noisy_compacted or "Page 2 of 2" in noisy_compacted:
+            failures.append("noise left in the compacted text")
+        if noisy_compacted.count(header) != 1:
+            failures.append("repeated header not kept exactly once")
+        
+        hyphenated, _ = compact_text("Full-\nstack developer who led the develop-\nment of real-\ntime APIs")
+        print(f"  Line-break hyphens: {hyphenated!r}")
+        if "Full-stack" not in hyphenated or "real-time" not in hyphenated or "development" not in hyphenated:
+            failures.append("line-break hyphens joined a compound or kept a hyphenation split")
+        
+        if failures:
+            print(f"✗ Text compaction failed: {'; '.join(failures)}")
+            record_test_result("Text Compaction (Local)", False, "; ".join(failures))
+            return False
+        print(f"✓ Text compaction drops layout noise and keeps compounds")
+        record_test_result("Text Compaction (Local)", True)
+        return True
+    except Exception as e:
+        print(f"✗ Text compaction error: {str(e)}")
+        record_test_result("Text Compaction (Local)", False, str(e))
+        return False
+
+def test_contact_extraction_fallbacks():
+    """Test local contact extraction on titles, job titles and date runs (local, no server)"""
+    print_test("Testing Contact Extraction (Local)")
+    
+    from doc_utils import extract_contact_info
+    from prompt_engineering import BASICS_LOCAL_MIN_CONFIDENCE
+    
+    try:
+        failures = []
+        basics, confidence = extract_contact_info("CURRICULUM VITAE\nJohn Smith\njohn@x.com\n(415) 555-0100")
+        print(f"  Document title first: name {basics['name']!r}, confidence {confidence}")
+        if basics["name"] != "John Smith":
+            failures.append(f"document title taken as the name ({basics['name']!r})")
+        
+        basics, confidence = extract_contact_info("Senior Software Engineer\ncoder@x.com\n(415) 555-0100")
+        print(f"  Job title first: name {basics['name']!r}, confidence {confidence}")
+        if basics["name"]:
+            failures.append(f"job title taken as the name ({basics['name']!r})")
+        if confidence >= BASICS_LOCAL_MIN_CONFIDENCE:
+            failures.append("job title header would skip the basics LLM call")
+        
+        basics, confidence = extract_contact_info("Senior Software Engineer\nJohn Smith\ncoder@x.com\n(415) 555-0100")
+        print(f"  Name not confirmed by position or email: confidence {confidence}")
+        if confidence >= BASICS_LOCAL_MIN_CONFIDENCE:
+            failures.append("unconfirmed name alone would skip the basics LLM call")
+        
+        basics, confidence = extract_contact_info("Jane Doe\njd@x.com\nAcme Corp 2019 - 2023 0100")
+        print(f"  Date run: phone {basics['phone']!r}")
+        if basics["phone"]:
+            failures.append(f"date run taken as a phone number ({basics['phone']!r})")
+        
+        if failures:
+            print(f"✗ Contact extraction failed: {'; '.join(failures)}")
+            record_test_result("Contact Extraction (Local)", False, "; ".join(failures))
+            return False
+        print(f"✓ Contact extraction skips titles and date runs and defers weak names to the LLM")
+        record_test_result("Contact Extraction (Local)", True)
+        return True
+    except Exception as e:
+        print(f"✗ Contact extraction error: {str(e)}")
+        record_test_result("Contact Extraction (Local)", False, str(e))
+        return False
+
+def test_section_merge_order():
+    """Test that concurrently extracted sections merge in a fixed order whatever order they finish in (mock backend, no server)"""
+    print_test("Testing Section Merge Order (Mock)")
+    
+    import asyncio
+    from prompt_engineering import SECTION_KEYS, SECTION_PROMPTS, agenerate_json_resume, generate_json_resume
+    from prompt_engineering.providers import MockBackend, register_backend
+    
+    # BASICS answers last and WORK first, the reverse of SECTION_PROMPTS
+    delays = {f"extract:{SECTION_KEYS[name]}": 0.05 * (len(SECTION_PROMPTS) - i) for i, (name, _) in enumerate(SECTION_PROMPTS)}
+    
+    class ReversedMock(MockBackend):
+        def __init__(self):
+            super().__init__()
+            self.finished = []
+        
+        def create(self, model_type, api_key, model, messages, timeout, prompt_name=None, **params):
+            time.sleep(delays.get(prompt_name, 0))
+            self.finished.append(prompt_name)
+            return self.completion(model, messages, prompt_name)
+        
+        async def acreate(self, model_type, api_key, model, messages, timeout, prompt_name=None, **params):
+            await asyncio.sleep(delays.get(prompt_name, 0))
+            self.finished.append(prompt_name)
+            return self.completion(model, messages, prompt_name)
+    
+    backend = ReversedMock()
+    register_backend("MockReversed", backend)
+    expected = [SECTION_KEYS[name] for name, _ in SECTION_PROMPTS]
+    
+    try:
+        failures = []
+        started = time.monotonic()
+        resume, usage = generate_json_resume(
+            "Jane Example", "mock", "mock", "MockReversed", use_cache=False, local_basics=False, return_usage=True
+        )
+        elapsed = time.monotonic() - started
+        print(f"  Threads: finished {[name.split(':')[1] for name in backend.finished]}, merged {list(resume)} in {elapsed:.2f}s")
+        if list(resume) != expected:
+            failures.append(f"thread pool merge order {list(resume)}")
+        if backend.finished[0] == "extract:basics":
+            failures.append("sections did not run concurrently")
+        if elapsed >= sum(delays.values()):
+            failures.append(f"sections took {elapsed:.2f}s, as long as running them one after another")
+        
+        backend.finished = []
+        resume = asyncio.run(agenerate_json_resume(
+            "Jane Example", "mock", "mock", "MockReversed", use_cache=False, local_basics=False
+        ))
+        print(f"  Coroutines: finished {[name.split(':')[1] for name in backend.finished]}, merged {list(resume)}")
+        if list(resume) != expected:
+            failures.append(f"coroutine merge order {list(resume)}")
+        
+        if failures:
+            print(f"✗ Section merge order failed: {'; '.join(failures)}")
+            record_test_result("Section Merge Order (Mock)", False, "; ".join(failures))
+            return False
+        print(f"✓ Sections run concurrently and merge in SECTION_PROMPTS order")
+        record_test_result("Section Merge Order (Mock)", True)
+        return True
+    except Exception as e:
+        print(f"✗ Section merge order error: {str(e)}")
+        record_test_result("Section Merge Order (Mock)", False, str(e))
+        return False
+
+def test_combined_strategy_fallback():
+    """Test that the combined strategy re-asks only for the sections its answer missed (mock backend, no server)"""
+    print_test("Testing Combined Strategy Fallback (Mock)")
+    
+    from prompt_engineering import generate_json_resume
+    from prompt_engineering.providers import MockBackend, register_backend
+    
+    class PartialCombinedMock(MockBackend):
+        """Leaves projects out of the combined answer and sends a malformed awards section"""
+        def __init__(self):
+            super().__init__()
+            self.prompts = []
+        
+        def answer(self, prompt_name, user_prompt):
+            self.prompts.append(prompt_name)
+            if prompt_name != "extract:combined":
+                return super().answer(prompt_name, user_prompt)
+            answer = json.loads(super().answer(prompt_name, user_prompt))
+            del answer["projects"]
+            answer["awards"] = "none"
+            return json.dumps(answer)
+    
+    backend = PartialCombinedMock()
+    register_backend("MockPartialCombined", backend)
+    
+    try:
+        failures = []
+        resume, usage = generate_json_resume(
+            "Jane Example", "mock", "mock", "MockPartialCombined", strategy="combined", use_cache=False, return_usage=True
+        )
+        print(f"  Prompts sent: {backend.prompts}")
+        print(f"  Fallback sections: {usage.get('fallback_sections')}, calls {usage['calls']}")
+        if sorted(usage.get("fallback_sections", [])) != ["AWARDS", "PROJECTS"]:
+            failures.append(f"re-asked for {usage.get('fallback_sections')} instead of AWARDS and PROJECTS")
+        if backend.prompts.count("extract:combined") != 1 or len(backend.prompts) != 3:
+            failures.append(f"sent {backend.prompts}")
+        if not resume.get("projects") or not isinstance(resume.get("awards"), list):
+            failures.append("fallback sections missing from the resume")
+        if usage["failed_sections"]:
+            failures.append(f"failed sections {usage['failed_sections']}")
+        
+        if failures:
+            print(f"✗ Combined strategy fallback failed: {'; '.join(failures)}")
+            record_test_result("Combined Fallback (Mock)", False, "; ".join(failures))
+            return False
+        print(f"✓ Combined strategy re-asks only for missing and malformed sections")
+        record_test_result("Combined Fallback (Mock)", True)
+        return True
+    except Exception as e:
+        print(f"✗ Combined strategy fallback error: {str(e)}")
+        record_test_result("Combined Fallback (Mock)", False, str(e))
+        return False
+
+def test_response_cache_bypass():
+    """Test that repeated extractions are served from the response cache unless use_cache is off (mock backend, no server)"""
+    print_test("Testing Response Cache Bypass (Mock)")
+    
+    from prompt_engineering import SECTION_PROMPTS, generate_json_resume
+    from prompt_engineering.cache import response_cache
+    from prompt_engineering.providers import MockBackend, register_backend
+    
+    class CountingMock(MockBackend):
+        def __init__(self):
+            super().__init__()
+            self.prompts = []
+        
+        def completion(self, model, messages, prompt_name):
+            self.prompts.append(prompt_name)
+            return super().completion(model, messages, prompt_name)
+    
+    backend = CountingMock()
+    register_backend("MockCounting", backend)
+    # A CV text of its own so earlier runs' cache entries don't count
+    cv_text = f"Jane Example {generate_file_id()}"
+    
+    def extract(use_cache):
+        calls = len(backend.prompts)
+        _, usage = generate_json_resume(
+            cv_text, "mock", "mock", "MockCounting", use_cache=use_cache, local_basics=False, return_usage=True
+        )
+        return len(backend.prompts) - calls, usage["cache_hits"]
+    
+    try:
+        failures = []
+        sections = len(SECTION_PROMPTS)
+        first = extract(True)
+        repeated = extract(True)
+        bypassed_before = response_cache.stats()["bypassed"]
+        fresh = extract(False)
+        bypassed = response_cache.stats()["bypassed"] - bypassed_before
+        print(f"  (provider calls, cache hits): first {first}, repeated {repeated}, use_cache=false {fresh}, bypassed lookups {bypassed}")
+        if first != (sections, 0):
+            failures.append(f"first extraction made {first[0]} calls with {first[1]} cache hits")
+        if repeated != (0, sections):
+            failures.append(f"repeated extraction made {repeated[0]} calls with {repeated[1]} cache hits")
+        if fresh != (sections, 0):
+            failures.append(f"use_cache=false made {fresh[0]} calls with {fresh[1]} cache hits")
+        if bypassed != sections:
+            failures.append(f"{bypassed} bypassed lookups recorded")
+        
+        if failures:
+            print(f"✗ Response cache bypass failed: {'; '.join(failures)}")
+            record_test_result("Cache Bypass (Mock)", False, "; ".join(failures))
+            return False
+        print(f"✓ Repeated extractions hit the cache and use_cache=false bypasses it")
+        record_test_result("Cache Bypass (Mock)", True)
+        return True
+    except Exception as e:
+        print(f"✗ Response cache bypass error: {str(e)}")
+        record_test_result("Cache Bypass (Mock)", False, str(e))
+        return False
+
+def test_rate_limit_retry():
+    """Test that a 429 is retried after the provider's Retry-After (mock backend, no server)"""
+    print_test("Testing Rate Limit Retry (Mock)")
+    
+    import asyncio
+    import httpx
+    import openai
+    from prompt_engineering.llm import achat_completion, chat_completion
+    from prompt_engineering.providers import MockBackend, register_backend
+    from prompt_engineering.scheduler import scheduler
+    
+    retry_after = 0.3
+    
+    class RateLimitedMock(MockBackend):
+        """Answers every key's first call with a 429, as a provider over its limit would"""
+        rate_limited = True
+        
+        def __init__(self):
+            super().__init__()
+            self.limited_keys = set()
+        
+        def check_limit(self, api_key):
+            if api_key not in self.limited_keys:
+                self.limited_keys.add(api_key)
+                response = httpx.Response(
+                    429, headers={"retry-after": str(retry_after)}, request=httpx.Request("POST", "https://mock.invalid")
+                )
+                raise openai.RateLimitError("Rate limit reached", response=response, body=None)
+        
+        def create(self, model_type, api_key, model, messages, timeout, prompt_name=None, **params):
+            self.check_limit(api_key)
+            return super().create(model_type, api_key, model, messages, timeout, prompt_name, **params)
+        
+        async def acreate(self, model_type, api_key, model, messages, timeout, prompt_name=None, **params):
+            self.check_limit(api_key)
+            return await super().acreate(model_type, api_key, model, messages, timeout, prompt_name, **params)
+    
+    register_backend("MockRateLimited", RateLimitedMock())
+    
+    try:
+        failures = []
+        for label, complete in (("Thread", chat_completion), ("Coroutine", achat_completion)):
+            rate_limited = scheduler.stats()["rate_limited"]
+            started = time.monotonic()
+            # A key of its own, so no earlier call has paused its bucket
+            call = complete(
+                "MockRateLimited", f"key-{generate_file_id()}", "mock", "system", "user",
+                use_cache=False, prompt_name="ai_analysis"
+            )
+            answer, usage = asyncio.run(call) if asyncio.iscoroutine(call) else call
+            elapsed = time.monotonic() - started
+            print(f"  {label}: {usage['retries']} retry, answered after {elapsed:.2f}s (Retry-After {retry_after}s)")
+            if usage["retries"] != 1 or json.loads(answer).get("match_score") is None:
+                failures.append(f"{label.lower()} call made {usage['retries']} retries")
+            if elapsed < retry_after:
+                failures.append(f"{label.lower()} retry after {elapsed:.2f}s ignored Retry-After")
+            if scheduler.stats()["rate_limited"] - rate_limited != 1:
+                failures.append(f"{label.lower()} 429 not counted as rate limited")
+        
+        if failures:
+            print(f"✗ Rate limit retry failed: {'; '.join(failures)}")
+            record_test_result("Rate Limit Retry (Mock)", False, "; ".join(failures))
+            return False
+        print(f"✓ 429s are retried once Retry-After has passed")
+        record_test_result("Rate Limit Retry (Mock)", True)
+        return True
+    except Exception as e:
+        print(f"✗ Rate limit retry error: {str(e)}")
+        record_test_result("Rate Limit Retry (Mock)", False, str(e))
+        return False
+
+def test_coalesced_submits(resume_json, job_description, copies=3):
+    """Test that identical AI enhancement requests in flight together share one run (mock backend, in-process app)"""
+    print_test("Testing Coalesced Submits (Mock)")
+    
+    import threading
+    from app import app
+    from prompt_engineering.providers import MockBackend, register_backend
+    
+    # Slow enough for every copy to arrive while the first one is still running
+    register_backend("MockSlow", MockBackend(latency=0.5))
+    data = {
+        'resume_json': resume_json,
+        'job_description': f"{job_description}\nReference: {generate_file_id()}",
+        'api_key': 'mock',
+        'model_type': 'MockSlow',
+        'model': 'mock',
+        'use_cache': False
+    }
+    start = threading.Barrier(copies)
+    responses = []
+    
+    def submit():
+        start.wait()
+        with app.test_client() as client:
+            responses.append(client.post("/api/ai-enhance", json=dict(data, file_id=generate_file_id())))
+    
+    try:
+        failures = []
+        threads = [threading.Thread(target=submit) for _ in range(copies)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        coalesced = sorted(response.headers.get("X-Coalesced") for response in responses)
+        print(f"  Status codes: {[response.status_code for response in responses]}, X-Coalesced: {coalesced}")
+        if any(response.status_code != 200 for response in responses):
+            failures.append("a submit failed")
+        if coalesced != ["false"] + ["true"] * (copies - 1):
+            failures.append(f"X-Coalesced {coalesced} instead of one run shared by {copies} submits")
+        analyses = [json.dumps(response.get_json().get("analysis"), sort_keys=True) for response in responses]
+        if len(set(analyses)) != 1:
+            failures.append("coalesced submits got different results")
+        
+        if failures:
+            print(f"✗ Coalesced submits failed: {'; '.join(failures)}")
+            record_test_result("Coalesced Submits (Mock)", False, "; ".join(failures))
+            return False
+        print(f"✓ {copies} identical submits shared one run")
+        record_test_result("Coalesced Submits (Mock)", True)
+        return True
+    except Exception as e:
+        print(f"✗ Coalesced submits error: {str(e)}")
+        record_test_result("Coalesced Submits (Mock)", False, str(e))
+        return False
+
+def test_tailoring_cache_hits():
+    """Test that re-tailoring serves unchanged sections from the cache (mock backend, no server)
+
+    These are the sections /api/optimize-resume reports in X-Tailoring-Cache-Hits.
+    """
+    print_test("Testing Tailoring Cache Hits (Mock)")
+    
+    from prompt_engineering import TAILORED_SECTIONS, tailor_json_resume
+    from prompt_engineering.providers import MockBackend, mock_section, register_backend
+    
+    class CountingMock(MockBackend):
+        def __init__(self):
+            super().__init__()
+            self.prompts = []
+        
+        def completion(self, model, messages, prompt_name):
+            self.prompts.append(prompt_name)
+            return super().completion(model, messages, prompt_name)
+    
+    backend = CountingMock()
+    register_backend("MockTailoring", backend)
+    resume_json = {key: mock_section(key) for key in ("basics",) + TAILORED_SECTIONS}
+    # A posting of its own so earlier runs' cache entries don't count
+    job_description = f"Python developer position with React experience needed. Reference: {generate_file_id()}"
+    
+    def tailor(resume):
+        backend.prompts = []
+        _, usage = tailor_json_resume(resume, job_description, "mock", "mock", "MockTailoring", return_usage=True)
+        return sorted(usage["cached_sections"]), sorted(name.split(":")[1] for name in backend.prompts)
+    
+    try:
+        failures = []
+        first = tailor(resume_json)
+        repeated = tailor(resume_json)
+        changed = tailor(dict(resume_json, skills=resume_json["skills"] + [{"name": "Kubernetes", "keywords": ["Helm"]}]))
+        print(f"  (cache hits, sections tailored): first {first}, repeated {repeated}, skills changed {changed}")
+        if first != ([], sorted(TAILORED_SECTIONS)):
+            failures.append(f"first tailoring {first}")
+        if repeated != (sorted(TAILORED_SECTIONS), []):
+            failures.append(f"repeated tailoring {repeated}")
+        if changed != (sorted(set(TAILORED_SECTIONS) - {"skills"}), ["skills"]):
+            failures.append(f"tailoring with changed skills {changed}")
+        
+        if failures:
+            print(f"✗ Tailoring cache hits failed: {'; '.join(failures)}")
+            record_test_result("Tailoring Cache Hits (Mock)", False, "; ".join(failures))
+            return False
+        print(f"✓ Only sections whose content changed are tailored again")
+        record_test_result("Tailoring Cache Hits (Mock)", True)
+        return True
+    except Exception as e:
+        print(f"✗ Tailoring cache hits error: {str(e)}")
+        record_test_result("Tailoring Cache Hits (Mock)", False, str(e))
+        return False
+
+def test_sync_views_overlap(file_path="sample/resume.pdf", copies=3):
+    """Test that sync views served over ASGI run side by side instead of queuing (mock backend, in-process ASGI app)"""
+    print_test("Testing Concurrent Sync Views over ASGI (Mock)")
+    
+    import asyncio
+    import httpx
+    from asgi import application
+    from prompt_engineering.providers import MockBackend, register_backend
+    
+    if not Path(file_path).exists():
+        print(f"⚠️  Sample file not found: {file_path}")
+        return False
+    
+    register_backend("MockSlow", MockBackend(latency=0.5))
+    pdf = Path(file_path).read_bytes()
+    data = {'api_key': 'mock', 'model_type': 'MockSlow', 'model': 'mock', 'use_cache': 'false'}
+    
+    async def run():
+        transport = httpx.ASGITransport(app=application)
+        async with httpx.AsyncClient(transport=transport, base_url="http://asgi", timeout=60) as client:
+            async def stream():
+                response = await client.post(
+                    "/api/extract-resume-json/stream", data=data, files={'file': ("resume.pdf", pdf, "application/pdf")}
+                )
+                return response.status_code
+            
+            started = time.monotonic()
+            await stream()
+            single = time.monotonic() - started
+            
+            started = time.monotonic()
+            streams = [asyncio.ensure_future(stream()) for _ in range(copies)]
+            await asyncio.sleep(0.1)
+            health_started = time.monotonic()
+            health = await client.get("/api/health")
+            health_seconds = time.monotonic() - health_started
+            statuses = await asyncio.gather(*streams)
+            return single, time.monotonic() - started, health.status_code, health_seconds, statuses
+    
+    try:
+        failures = []
+        single, together, health_status, health_seconds, statuses = asyncio.run(run())
+        print(f"  One streamed extraction: {single:.2f}s, {copies} at once: {together:.2f}s")
+        print(f"  Health check during the extractions: {health_status} in {health_seconds:.2f}s")
+        if any(status != 200 for status in statuses) or health_status != 200:
+            failures.append(f"status codes {statuses}, health {health_status}")
+        if together >= single * 2:
+            failures.append(f"{copies} streamed extractions queued ({together:.2f}s vs {single:.2f}s for one)")
+        if health_seconds >= single / 2:
+            failures.append(f"health check waited {health_seconds:.2f}s behind the extractions")
+        
+        if failures:
+            print(f"✗ Concurrent sync views failed: {'; '.join(failures)}")
+            record_test_result("Concurrent Sync Views (Mock)", False, "; ".join(failures))
+            return False
+        print(f"✓ Sync views run concurrently over ASGI")
+        record_test_result("Concurrent Sync Views (Mock)", True)
+        return True
+    except Exception as e:
+        print(f"✗ Concurrent sync views error: {str(e)}")
+        record_test_result("Concurrent Sync Views (Mock)", False, str(e))
+        return False
+
 def check_api_key():
     """Check if a real API key is being used"""
     if API_KEY == 'your-openai-api-key-here':
@@ -763,6 +1805,19 @@ def main():
     # Check API key
     has_real_key = check_api_key()
     
+    # Local checks of the text pipeline, and of the LLM layer on mock backends (no server needed)
+    print_section("Local Checks")
+    test_text_compaction()
+    test_segmentation_fallbacks()
+    test_contact_extraction_fallbacks()
+    test_section_merge_order()
+    test_combined_strategy_fallback()
+    test_response_cache_bypass()
+    test_rate_limit_retry()
+    test_tailoring_cache_hits()
+    test_coalesced_submits(create_sample_resume_json(), "Software developer position requiring Python skills.")
+    test_sync_views_overlap()
+    
     # Test basic endpoints (no API key required)
     health_ok = test_health_check()
     templates_ok = test_get_templates()
@@ -775,6 +1830,12 @@ def main():
     # Test the complete file storage workflow
     workflow_file_id = test_workflow_with_file_storage()
     
+    # Test streaming extraction
+    test_extract_resume_json_stream("sample/resume.pdf")
+    
+    # Test batch extraction
+    test_extract_resume_json_batch("sample/resume.pdf")
+    
     # Test file ID consistency with different endpoints
     if workflow_file_id:
         print(f"\n--- Testing Multiple Operations with Same File ID ---")
@@ -783,6 +1844,7 @@ def main():
         # Test multiple operations with same file_id
         test_ai_enhance_with_file_id(workflow_file_id, job_description)
         test_optimize_resume_with_file_id(workflow_file_id, job_description, "Simple")
+        test_search_resumes(workflow_file_id, job_description)
     
     # Test original workflow with JSON input (as fallback)
     print(f"\n--- Fallback: Testing with Direct JSON Input ---")
@@ -831,12 +1893,21 @@ def main():
     
     # Original tests with JSON input using new structure
     test_ai_enhance_with_json(sample_resume, job_description)
+    test_ai_enhance_with_mock_backend(sample_resume, job_description)
+    test_ai_enhance_combined_call(sample_resume, job_description)
+    test_job_description_analysis(sample_resume, job_description)
+    test_near_duplicate_posting(sample_resume, job_description)
+    test_match_score(sample_resume, job_description)
+    test_rank_jobs(sample_resume)
     test_optimize_resume(sample_resume, job_description, "Awesome")
     test_generate_cover_letter(sample_resume, job_info)
     
     # Test file ID consistency
     test_file_id_consistency()
     
+    # LLM call telemetry collected by the tests above
+    test_llm_metrics()
+    
     # Print final summary
     print_final_summary()
     